@@ -3,25 +3,214 @@
 """
 Brave Search API 客户端
 简单的命令行搜索工具
+
+- 复用 requests.Session 连接池（keep-alive），对 429 / 5xx 自动退避重试
+- 响应缓存在磁盘上，以查询参数为键，带有效期，按条数与总大小做 LRU 淘汰
+- search_many() 以线程池并发查询，按令牌桶限速（缓存命中不计入）
 """
 
 import requests
+import concurrent.futures
+import hashlib
 import json
 import os
 import sys
+import threading
+import time
 import urllib.parse
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/brave_search")
+
+
+class ResponseCache:
+    """
+    磁盘响应缓存：每个键一个 JSON 文件，内存中保存按最近使用排序的索引
+
+    Args:
+        directory: 缓存目录
+        ttl: 有效期（秒），过期条目视为未命中并删除
+        max_entries: 最多条目数
+        max_bytes: 缓存文件总大小上限
+    """
+
+    def __init__(self, directory, ttl=24 * 3600, max_entries=1000, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()     # 键 -> 文件大小，最近使用的在末尾
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(url, params):
+        """以 URL 与排序后的查询参数生成键"""
+        canonical = json.dumps([url, sorted(params.items())], ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _load_index(self):
+        """按文件访问时间恢复 LRU 顺序"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        with self._lock:
+            self._evict()
+
+    def get(self, key):
+        """返回缓存的响应，未命中或已过期时返回 None"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            if time.time() - entry.get("time", 0) > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+            self.hits += 1
+            return entry["data"]
+
+    def put(self, key, data):
+        payload = json.dumps({"time": time.time(), "data": data}, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            tmp = self._path(key) + f".{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                return
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = len(payload)
+            self._bytes += len(payload)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def __len__(self):
+        return len(self._index)
+
+    def _remove(self, key):
+        self._bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到条数与大小都在上限内"""
+        while self._index and (len(self._index) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._index)))
+
+
+class RateLimiter:
+    """令牌桶限速（线程安全）：平均每秒 rate 次，允许 burst 次突发"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
 
 
 class BraveSearch:
-    """Brave Search 客户端"""
-    
+    """
+    Brave Search 客户端
+
+    Args:
+        api_key: API Key（默认从密钥文件或 BRAVE_API_KEY 读取）
+        base_url: 接口地址（测试时可指向本地桩服务器）
+        timeout: (连接, 读取) 超时秒数
+        pool_size: 连接池大小（不小于并发数）
+        retries: 连接错误与 429 / 5xx 的重试次数
+        cache_dir: 响应缓存目录，None 表示不缓存
+        cache_ttl: 缓存有效期（秒）
+        cache_max_entries / cache_max_bytes: 缓存条数与大小上限
+        rate_limit: 每秒请求数上限（0 不限）
+        max_workers: search_many 的并发数
+    """
+
     BASE_URL = "https://api.search.brave.com/res/v1/web/search"
-    
-    def __init__(self, api_key=None):
+
+    def __init__(self, api_key=None, base_url=None, timeout=(5, 15), pool_size=8, retries=2,
+                 cache_dir=DEFAULT_CACHE_DIR, cache_ttl=24 * 3600, cache_max_entries=1000,
+                 cache_max_bytes=50 * 1024 * 1024, rate_limit=1.0, max_workers=4):
         self.api_key = api_key or self._load_key()
         if not self.api_key:
             raise ValueError("API Key not found")
-    
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ResponseCache(cache_dir, cache_ttl, cache_max_entries, cache_max_bytes)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-Subscription-Token": self.api_key,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip"
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, max_workers), max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
     def _load_key(self):
         """加载 API Key"""
         key_file = os.path.expanduser("~/.openclaw/workspace/.brave_key")
@@ -29,23 +218,28 @@ class BraveSearch:
             with open(key_file, 'r') as f:
                 return f.read().strip()
         return os.environ.get("BRAVE_API_KEY")
-    
-    def search(self, query, count=10, offset=0, country="us", language="en"):
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, query, count=10, offset=0, country="us", language="en", use_cache=True):
         """
         执行搜索
-        
+
         Args:
             query: 搜索关键词
             count: 返回结果数量 (1-20)
             offset: 结果偏移量（分页）
             country: 国家代码
             language: 语言代码
+            use_cache: 是否读取缓存（成功的响应总会写入缓存）
         """
-        headers = {
-            "X-Subscription-Token": self.api_key,
-            "Accept": "application/json"
-        }
-        
         params = {
             "q": query,
             "count": min(count, 20),
@@ -53,43 +247,68 @@ class BraveSearch:
             "country": country,
             "search_lang": language
         }
-        
+
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.make_key(self.base_url, params)
+            if use_cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+
+        self.rate_limiter.wait()
         try:
-            response = requests.get(
-                self.BASE_URL,
-                headers=headers,
+            response = self.session.get(
+                self.base_url,
                 params=params,
-                timeout=30
+                timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {"error": str(e)}
-    
+
+        if key is not None:
+            self.cache.put(key, data)
+        return data
+
+    def search_many(self, queries, **kwargs):
+        """
+        并发执行多个搜索，按 queries 的顺序返回结果
+
+        相同的查询只请求一次；网络请求受 rate_limit 限速，缓存命中不受限。
+        其余参数同 search()。
+        """
+        queries = list(queries)
+        unique = list(dict.fromkeys(queries))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = dict(zip(unique, pool.map(lambda q: self.search(q, **kwargs), unique)))
+        return [results[q] for q in queries]
+
     def print_results(self, data):
         """格式化打印结果"""
         if "error" in data:
             print(f"❌ 错误: {data['error']}")
             return
-        
+
         query_info = data.get("query", {})
         web_results = data.get("web", {}).get("results", [])
-        
+
         print("\n" + "="*60)
         print(f"🔍 Brave Search: {query_info.get('original', 'Unknown')}")
         print("="*60)
-        
+
         if not web_results:
             print("\n未找到结果")
             return
-        
+
         print(f"\n找到 {len(web_results)} 条结果:\n")
-        
+
         for i, result in enumerate(web_results, 1):
             title = result.get("title", "无标题")
             url = result.get("url", "")
             desc = result.get("description", "")[:200]
-            
+
             print(f"  {i}. {title}")
             print(f"     🔗 {url}")
             if desc:
@@ -104,9 +323,9 @@ def main():
         print("Usage: python3 brave_search.py <查询>")
         print("Example: python3 brave_search.py 'Python 3.12 新特性'")
         sys.exit(1)
-    
+
     query = " ".join(sys.argv[1:])
-    
+
     try:
         client = BraveSearch()
         print(f"搜索: {query}")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+独立采集进程
+每台仪器一个子进程，独占 VISA 会话并把样本写入共享内存环形缓冲区；
+界面进程只映射缓冲区读取数据，驱动崩溃不会带垮界面。
+本模块不依赖 Qt，子进程以 spawn 方式启动。
+子进程不共享界面进程安装的时钟（clock 模块），计时与时间戳直接使用系统时间。
+"""
+
+import multiprocessing
+import queue
+import time
+
+from replay import is_replay_resource
+from serial_backend import SerialResourceManager, is_serial_resource
+from shm_ring import SharedRing
+
+
+def open_resource_manager(resource_name):
+    """子进程中创建资源管理器：MOCK / REPLAY 资源用模拟器，SERIAL 资源直接打开串口，其余用 pyvisa"""
+    if is_serial_resource(resource_name):
+        return SerialResourceManager()
+    if "MOCK" in resource_name.upper() or is_replay_resource(resource_name):
+        from mock_visa import MockResourceManager
+        return MockResourceManager('@py')
+    import pyvisa
+    return pyvisa.ResourceManager('@py')
+
+
+# 等待下一个采样时刻时检查停止标志的最长间隔 (s)
+STOP_CHECK_INTERVAL = 0.05
+
+
+def acquisition_main(resource_name, command, interval_ms, start_time, ring_name, status_queue):
+    """子进程入口：按采样间隔查询仪器并写入共享环形缓冲区，直到缓冲区头部的停止标志被置位"""
+    ring = SharedRing.attach(ring_name)
+    rm = None
+    instrument = None
+    try:
+        rm = open_resource_manager(resource_name)
+        instrument = rm.open_resource(resource_name, timeout=5000)
+        instrument.timeout = 5000
+        instrument.read_termination = '\n'
+        instrument.write_termination = '\n'
+        status_queue.put(('started', resource_name))
+
+        if getattr(instrument, 'continuous', False):
+            stream_loop(instrument, start_time, ring, status_queue)
+            return
+
+        interval = interval_ms / 1000.0
+        next_due = time.monotonic()
+        while not ring.stop_requested:
+            try:
+                value = float(instrument.query(command).strip())
+                ring.write(time.time() - start_time, value)
+            except ValueError as e:
+                status_queue.put(('error', f"数据格式错误: {e}"))
+            except Exception as e:
+                status_queue.put(('error', f"读取错误: {getattr(e, 'abbreviation', '') or e}"))
+
+            next_due += interval
+            delay = next_due - time.monotonic()
+            while delay > 0 and not ring.stop_requested:
+                time.sleep(min(delay, STOP_CHECK_INTERVAL))
+                delay = next_due - time.monotonic()
+            if delay < -interval:
+                next_due = time.monotonic()
+    except Exception as e:
+        status_queue.put(('fatal', f"{type(e).__name__}: {e}"))
+    finally:
+        if instrument is not None:
+            try:
+                instrument.close()
+            except Exception:
+                pass
+        if rm is not None:
+            try:
+                rm.close()
+            except Exception:
+                pass
+        ring.close()
+
+
+def stream_loop(instrument, start_time, ring, status_queue):
+    """连续输出的仪表：不轮询，成批读到的数值直接写入环形缓冲区"""
+    errors = 0
+    while not ring.stop_requested:
+        times, values = instrument.read_values()
+        if len(values):
+            ring.write_many(times - start_time, values)
+        if instrument.parse_errors != errors:
+            status_queue.put(('error', f"数据格式错误: 共 {instrument.parse_errors} 行无法解析"))
+            errors = instrument.parse_errors
+
+
+class AcquisitionProcess:
+    """
+    采集进程句柄（界面进程一侧）
+
+    创建共享环形缓冲区、启动子进程，并提供非阻塞的 poll() 读取新样本和状态消息。
+    """
+
+    def __init__(self, resource_name, command, interval_ms, start_time, capacity=65536):
+        self.resource_name = resource_name
+        self.command = command
+        self.interval_ms = interval_ms
+        self.start_time = start_time
+        self.capacity = capacity
+        self.read_seq = 0
+        self.lost = 0
+        self.ring = None
+        self.process = None
+        self._ctx = multiprocessing.get_context('spawn')
+        self._status = None
+
+    def start(self):
+        """创建缓冲区并启动子进程"""
+        self.ring = SharedRing.create(self.capacity)
+        self.read_seq = 0
+        self._status = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=acquisition_main,
+            args=(self.resource_name, self.command, self.interval_ms, self.start_time,
+                  self.ring.name, self._status),
+            name=f"acq-{self.resource_name}",
+            daemon=True,
+        )
+        self.process.start()
+
+    def poll(self, max_items=None):
+        """
+        读取新样本与状态消息（不阻塞）
+
+        Returns:
+            (times, values, messages)：messages 为 [(kind, text), ...]
+        """
+        times, values, self.read_seq, lost = self.ring.read(self.read_seq, max_items)
+        if lost:
+            self.lost += lost
+        messages = []
+        while True:
+            try:
+                messages.append(self._status.get_nowait())
+            except queue.Empty:
+                break
+        if lost:
+            messages.append(('error', f"界面读取落后，丢失 {lost} 个样本"))
+        return times, values, messages
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def exitcode(self):
+        return None if self.process is None else self.process.exitcode
+
+    def stop(self, timeout=5.0):
+        """通知子进程退出并等待（缓冲区保留，可继续 poll() 取走剩余样本）"""
+        if self.process is not None:
+            self.ring.request_stop()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(1.0)
+
+    def close(self):
+        """释放共享内存与状态队列"""
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self._status is not None:
+            self._status.close()
+            self._status = None
+        self.process = None
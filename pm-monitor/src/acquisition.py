@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集线程
+按采样间隔查询仪器，在采集线程内逐点运行处理阶段（报警等），
+再把样本与事件分批送回界面线程，界面刷新不再决定采样节奏；
+也可改为独立采集进程 + 共享内存传输（ProcessAcquisitionWorker）
+或订阅远程采集代理的数据流（RemoteAcquisitionWorker）、回放录制数据（ReplayWorker），接口相同
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+import clock
+from acq_process import AcquisitionProcess
+from drivers import SingleQuery
+from replay import ReplayFinished
+from remote_agent import AgentClient
+
+try:
+    import pyvisa
+    HAS_PYVISA = True
+except ImportError:
+    HAS_PYVISA = False
+
+
+def _apply_resets(resets):
+    """在处理线程中执行界面线程请求的阶段重置（list.append / pop 为原子操作，无需加锁）"""
+    while resets:
+        resets.pop(0).reset()
+
+
+class AcquisitionWorker(QThread):
+    """
+    采集线程
+
+    处理阶段需实现 process(t, value)，返回本样本产生的事件列表（或 None），
+    在采集线程中调用，必须保持每样本 O(1) 且不阻塞。
+    控制器需实现 control(instrument, t)，在每次查询前调用，可向仪器下发命令（如测试配置序列）。
+    strategy 为 drivers 中的采集方式，默认按 command 单次查询；批量读取时一次得到多个读数，
+    按仪器采样周期倒推各读数的时间。
+    reset_stage() 请求在处理线程中、下一个样本之前调用阶段的 reset()（界面线程重置数据时使用）。
+    """
+
+    samples_ready = pyqtSignal(object)   # [(t, value), ...]
+    events_ready = pyqtSignal(object)    # [event, ...]
+    read_error = pyqtSignal(str)
+
+    virtual_clock = True    # 可由 clock.VirtualClock 按虚拟时间调用 poll() / flush() 驱动
+
+    def __init__(self, instrument, command, interval_ms, start_time, emit_interval=0.033,
+                 strategy=None, parent=None):
+        super().__init__(parent)
+        self.instrument = instrument
+        self.command = command
+        self.strategy = strategy or SingleQuery(command)
+        self.interval = max(interval_ms / 1000.0, self.strategy.poll_interval)
+        self.start_time = start_time
+        self.emit_interval = emit_interval
+        self.stages = []
+        self.controllers = []
+        self._resets = []
+        self._running = False
+        self._samples = []
+        self._events = []
+
+    def add_stage(self, stage):
+        """添加逐点处理阶段"""
+        self.stages.append(stage)
+
+    def reset_stage(self, stage):
+        """请求在处理线程中重置阶段状态"""
+        self._resets.append(stage)
+
+    def add_controller(self, controller):
+        """添加仪器控制器"""
+        self.controllers.append(controller)
+
+    def acquire_once(self):
+        """读取并处理一批读数（单次查询时为一个），返回读数个数"""
+        for controller in self.controllers:
+            controller.control(self.instrument, clock.now() - self.start_time)
+
+        values = self.strategy.read(self.instrument)
+        times = self.strategy.timestamps(len(values), clock.now() - self.start_time)
+        for t, value in zip(times, values):
+            self.process_sample(t, value)
+        return len(values)
+
+    def process_sample(self, t, value):
+        """对一个样本运行处理阶段并放入待发送批次"""
+        _apply_resets(self._resets)
+        for stage in self.stages:
+            events = stage.process(t, value)
+            if events:
+                self._events.extend(events)
+        self._samples.append((t, value))
+
+    def flush(self):
+        """把已积累的样本和事件送往界面线程"""
+        if self._samples:
+            samples, self._samples = self._samples, []
+            self.samples_ready.emit(samples)
+        if self._events:
+            events, self._events = self._events, []
+            self.events_ready.emit(events)
+
+    def poll(self):
+        """读取一次，错误通过 read_error 报告（虚拟时钟下由调度器按采样间隔调用）"""
+        try:
+            self.acquire_once()
+        except ValueError as e:
+            self.read_error.emit(f"数据格式错误: {e}")
+        except Exception as e:
+            if HAS_PYVISA and isinstance(e, pyvisa.Error):
+                self.read_error.emit(f"读取错误: {e.abbreviation}")
+            else:
+                self.read_error.emit(f"读取错误: {e}")
+
+    def run(self):
+        self._running = True
+        next_due = clock.monotonic()
+        last_emit = next_due
+        while self._running:
+            self.poll()
+
+            now = clock.monotonic()
+            if now - last_emit >= self.emit_interval:
+                self.flush()
+                last_emit = now
+
+            # 按固定节拍调度；落后超过一个周期时不追赶，直接从当前时刻重新计时
+            next_due += self.interval
+            delay = next_due - clock.monotonic()
+            if delay > 0:
+                clock.sleep(delay)
+            elif delay < -self.interval:
+                next_due = clock.monotonic()
+        self.flush()
+
+    def stop(self):
+        """停止采集并等待线程退出"""
+        self._running = False
+        self.wait()
+
+
+class ProcessAcquisitionWorker(QObject):
+    """
+    独立采集进程的界面端
+
+    与 AcquisitionWorker 信号和接口一致；仪器在子进程中查询，
+    这里按 poll_interval_ms 定时读取共享内存环形缓冲区并运行处理阶段。
+    子进程不共享本进程安装的时钟，时间戳始终为系统时间，因此不支持虚拟时钟。
+    """
+
+    samples_ready = pyqtSignal(object)
+    events_ready = pyqtSignal(object)
+    read_error = pyqtSignal(str)
+
+    virtual_clock = False
+
+    def __init__(self, resource_name, command, interval_ms, start_time, poll_interval_ms=30, parent=None):
+        super().__init__(parent)
+        self.process = AcquisitionProcess(resource_name, command, interval_ms, start_time)
+        self.start_time = start_time
+        self.stages = []
+        self._resets = []
+        self._timer = QTimer(self)
+        self._timer.setInterval(poll_interval_ms)
+        self._timer.timeout.connect(self.poll)
+
+    def add_stage(self, stage):
+        """添加逐点处理阶段（在界面进程中按批运行）"""
+        self.stages.append(stage)
+
+    def reset_stage(self, stage):
+        self._resets.append(stage)
+
+    def start(self):
+        self.process.start()
+        self._timer.start()
+
+    def poll(self):
+        """读取共享缓冲区中的新样本"""
+        times, values, messages = self.process.poll()
+        for kind, text in messages:
+            if kind in ('error', 'fatal'):
+                self.read_error.emit(text)
+
+        if len(times):
+            # 子进程时间戳相对启动时的零点；界面端重置零点后需要平移
+            offset = self.process.start_time - self.start_time
+            samples = []
+            events = []
+            _apply_resets(self._resets)
+            for t, value in zip((times + offset).tolist(), values.tolist()):
+                for stage in self.stages:
+                    result = stage.process(t, value)
+                    if result:
+                        events.extend(result)
+                samples.append((t, value))
+            self.samples_ready.emit(samples)
+            if events:
+                self.events_ready.emit(events)
+
+        if self._timer.isActive() and not self.process.alive:
+            self._timer.stop()
+            self.read_error.emit(f"采集进程异常退出 (exit code {self.process.exitcode})")
+
+    def stop(self):
+        """停止子进程，取走剩余样本后释放共享内存"""
+        self._timer.stop()
+        self.process.stop()
+        if self.process.ring is not None:
+            self.poll()
+            self.process.close()
+
+
+class RemoteAcquisitionWorker(QThread):
+    """
+    远程采集代理的订阅端
+
+    与 AcquisitionWorker 信号和接口一致；样本由代理按批推送，
+    代理时间戳为绝对时间，这里减去 start_time 换算到界面时间轴（两端时钟需已同步），因此不支持虚拟时钟。
+    """
+
+    samples_ready = pyqtSignal(object)
+    events_ready = pyqtSignal(object)
+    read_error = pyqtSignal(str)
+
+    virtual_clock = False
+
+    def __init__(self, host, port, channel, start_time, history=0.0, decimate=1, parent=None):
+        super().__init__(parent)
+        self.host = host
+        self.port = port
+        self.channel = channel
+        self.start_time = start_time
+        self.history = history
+        self.decimate = decimate
+        self.stages = []
+        self._resets = []
+        self._running = False
+        self._client = None
+
+    def add_stage(self, stage):
+        """添加逐点处理阶段"""
+        self.stages.append(stage)
+
+    def reset_stage(self, stage):
+        """请求在处理线程中重置阶段状态"""
+        self._resets.append(stage)
+
+    def run(self):
+        self._running = True
+        try:
+            self._client = AgentClient(self.host, self.port)
+            self._client.subscribe([self.channel], self.decimate, self.history)
+            while self._running:
+                _, times, values = self._client.read_samples()
+                samples = []
+                events = []
+                _apply_resets(self._resets)
+                for t, value in zip((times - self.start_time).tolist(), values.tolist()):
+                    for stage in self.stages:
+                        result = stage.process(t, value)
+                        if result:
+                            events.extend(result)
+                    samples.append((t, value))
+                self.samples_ready.emit(samples)
+                if events:
+                    self.events_ready.emit(events)
+        except (ConnectionError, OSError) as e:
+            if self._running:
+                self.read_error.emit(f"代理连接错误: {e}")
+        finally:
+            if self._client is not None:
+                self._client.close()
+
+    def stop(self):
+        """断开连接并等待线程退出"""
+        self._running = False
+        if self._client is not None:
+            self._client.close()
+        self.wait()
+
+
+class ReplayWorker(AcquisitionWorker):
+    """
+    录制数据回放线程
+
+    样本时间使用录制时间戳（与回放速度无关，报警持续时间等按原始时间判定），
+    按 instrument.speed 倍速释放样本；speed 为 None 时尽快回放，
+    此时界面线程最多积压 max_in_flight 批，回放速度即整条处理链路的吞吐。
+    结束时发出 ReplayFinished 事件（样本数与耗时）。
+    回放节奏由 run() 控制，不能由虚拟时钟逐次 poll() 驱动。
+    """
+
+    virtual_clock = False
+
+    def __init__(self, instrument, start_time, emit_interval=0.033, fast_batch=2000, max_in_flight=2, parent=None):
+        super().__init__(instrument, '', 0, start_time, emit_interval, parent=parent)
+        self.fast_batch = fast_batch
+        self.fast = instrument.speed is None
+        self._credits = threading.Semaphore(max_in_flight)
+        if self.fast:
+            # 本对象属于界面线程，界面线程处理到该批次时才归还额度
+            self.samples_ready.connect(self._release)
+
+    def _release(self, _samples):
+        self._credits.release()
+
+    def flush(self):
+        if self.fast and self._samples:
+            while self._running and not self._credits.acquire(timeout=0.1):
+                pass
+        super().flush()
+
+    def run(self):
+        self._running = True
+        count = 0
+        speed = self.instrument.speed
+        wall_start = clock.monotonic()
+        replay_start = self.instrument.next_time()
+        while self._running and not self.instrument.exhausted:
+            for controller in self.controllers:
+                controller.control(self.instrument, self.instrument.next_time())
+
+            if self.fast:
+                times, values = self.instrument.take(self.fast_batch)
+            else:
+                times, values = self.instrument.take_until(replay_start + (clock.monotonic() - wall_start) * speed)
+            for t, value in zip(times.tolist(), values.tolist()):
+                self.process_sample(t, value)
+            count += len(times)
+            self.flush()
+
+            if not self.fast and not self.instrument.exhausted:
+                wait = (self.instrument.next_time() - replay_start) / speed - (clock.monotonic() - wall_start)
+                if wait > 0:
+                    clock.sleep(min(wait, self.emit_interval))
+        self.flush()
+
+        if self.instrument.exhausted:
+            self.events_ready.emit([ReplayFinished(self.instrument.path, count, clock.monotonic() - wall_start)])
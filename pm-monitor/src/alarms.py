@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阈值与报警引擎
+规则逐点增量评估（每条规则 O(1) 状态），支持阈值、回差、持续时间窗口和变化率；
+报警事件由独立的分发线程写日志、调用 Webhook 或外部命令，不阻塞采样循环
+"""
+
+import collections
+import json
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import urllib.request
+
+
+# 报警事件：kind 为 'raise'（触发）或 'clear'（恢复）
+AlarmEvent = collections.namedtuple('AlarmEvent', 't value rule kind message')
+
+
+class Rule:
+    """
+    规则基类
+
+    子类实现 measure()，返回被判定的量；超过 level 且持续 duration 秒后触发，
+    回落到 level - hysteresis 以下（下限规则为 level + hysteresis 以上）时恢复。
+    """
+
+    def __init__(self, name, level, direction='above', hysteresis=0.0, duration=0.0):
+        if direction not in ('above', 'below'):
+            raise ValueError(f"未知方向: {direction}")
+        self.name = name
+        self.level = level
+        self.direction = direction
+        self.hysteresis = abs(hysteresis)
+        self.duration = duration
+        self.reset()
+
+    def reset(self):
+        """清除状态"""
+        self.active = False
+        self._pending_since = None
+
+    def measure(self, t, value):
+        """返回被判定的量；无法判定时返回 None"""
+        raise NotImplementedError
+
+    def describe(self, quantity):
+        """事件说明文字"""
+        op = '>' if self.direction == 'above' else '<'
+        return f"{self.name}: {quantity:.3f} {op} {self.level:g}"
+
+    def update(self, t, value):
+        """评估一个样本，状态变化时返回 AlarmEvent"""
+        q = self.measure(t, value)
+        if q is None:
+            return None
+
+        if self.direction == 'above':
+            over = q > self.level
+            cleared = q < self.level - self.hysteresis
+        else:
+            over = q < self.level
+            cleared = q > self.level + self.hysteresis
+
+        if not self.active:
+            if not over:
+                self._pending_since = None
+                return None
+            if self._pending_since is None:
+                self._pending_since = t
+            if t - self._pending_since >= self.duration:
+                self.active = True
+                self._pending_since = None
+                return AlarmEvent(t, value, self.name, 'raise', self.describe(q))
+            return None
+
+        if cleared:
+            self.active = False
+            return AlarmEvent(t, value, self.name, 'clear', f"{self.name}: 已恢复 ({q:.3f})")
+        return None
+
+
+class ThresholdRule(Rule):
+    """功率阈值规则"""
+
+    def measure(self, t, value):
+        return value
+
+
+class RateOfChangeRule(Rule):
+    """变化率规则（W/s，按相邻样本的实际时间差计算，取绝对值）"""
+
+    def reset(self):
+        super().reset()
+        self._prev = None
+
+    def measure(self, t, value):
+        prev = self._prev
+        self._prev = (t, value)
+        if prev is None or t <= prev[0]:
+            return None
+        return abs(value - prev[1]) / (t - prev[0])
+
+    def describe(self, quantity):
+        return f"{self.name}: {quantity:.3f} W/s > {self.level:g} W/s"
+
+
+class LogSink:
+    """报警日志文件"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, event, context):
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"{stamp}\t{context.get('resource', '')}\t{event.t:.3f}\t{event.kind}\t"
+                    f"{event.value:.4f}\t{event.message}\n")
+
+
+class WebhookSink:
+    """以 JSON POST 报警事件到本地 Webhook"""
+
+    def __init__(self, url, timeout=3.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, event, context):
+        body = dict(event._asdict(), **context)
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class CommandSink:
+    """
+    执行外部命令，事件内容通过环境变量 PM_ALARM_* 传入
+
+    命令按 shell 语法拆分为参数列表后直接执行，不经过 shell（不展开变量、管道与重定向）；
+    需要这些功能时显式写成 sh -c '...'。引号不配对时抛出 ValueError
+    """
+
+    def __init__(self, command):
+        self.command = command
+        # Windows 上命令行原样交给 CreateProcess，同样不经过 shell
+        self.argv = command if os.name == 'nt' else shlex.split(command)
+        if not self.argv:
+            raise ValueError("命令为空")
+
+    def __call__(self, event, context):
+        env = dict(os.environ)
+        env.update({
+            'PM_ALARM_RULE': event.rule,
+            'PM_ALARM_KIND': event.kind,
+            'PM_ALARM_VALUE': f"{event.value:.4f}",
+            'PM_ALARM_TIME': f"{event.t:.3f}",
+            'PM_ALARM_MESSAGE': event.message,
+            'PM_ALARM_RESOURCE': context.get('resource', ''),
+        })
+        subprocess.Popen(self.argv, env=env)
+
+
+def make_hook(target):
+    """根据配置字符串创建钩子：http(s):// 开头为 Webhook，否则视为命令"""
+    target = target.strip()
+    if not target:
+        return None
+    if target.startswith(('http://', 'https://')):
+        return WebhookSink(target)
+    return CommandSink(target)
+
+
+class AlarmEngine:
+    """
+    报警引擎
+
+    process() 在采集线程中逐点调用，只做规则评估与入队；
+    日志、Webhook、命令等耗时输出由后台分发线程处理。
+    """
+
+    def __init__(self, rules=None, sinks=None, context=None):
+        self.rules = list(rules or [])
+        self.sinks = list(sinks or [])
+        self.context = dict(context or {})
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def active(self):
+        """当前处于报警状态的规则名"""
+        return [rule.name for rule in self.rules if rule.active]
+
+    def process(self, t, value):
+        """评估一个样本，返回本次产生的事件列表"""
+        events = []
+        for rule in self.rules:
+            event = rule.update(t, value)
+            if event is not None:
+                events.append(event)
+        if events and self.sinks:
+            self._ensure_dispatcher()
+            for event in events:
+                self._queue.put(event)
+        return events
+
+    def reset(self):
+        """清除全部规则状态"""
+        for rule in self.rules:
+            rule.reset()
+
+    def close(self, timeout=None):
+        """
+        结束分发线程，已入队的事件仍会分发完毕
+
+        timeout 为 None 时不等待（界面线程调用：Webhook / 命令可能很慢，分发线程作为守护线程在后台排空队列）；
+        否则最多等待 timeout 秒。返回是否已分发完毕
+        """
+        thread = self._thread
+        if thread is None:
+            return True
+        self._queue.put(None)
+        # 之后的事件交给新的分发线程与新队列，不与正在排空的线程争用
+        self._queue = queue.Queue()
+        self._thread = None
+        if timeout is not None:
+            thread.join(timeout)
+        return not thread.is_alive()
+
+    def _ensure_dispatcher(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, args=(self._queue,), name="AlarmDispatcher",
+                                            daemon=True)
+            self._thread.start()
+
+    def _dispatch(self, events):
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            for sink in self.sinks:
+                try:
+                    sink(event, self.context)
+                except Exception as e:
+                    print(f"报警输出失败 ({type(sink).__name__}): {e}")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多表时间对齐
+各功率计的采样时刻互不相同且有抖动，这里把每个通道的样本流增量地重采样到统一的时间网格
+（线性插值或零阶保持），再在对齐后的网格上计算派生通道（总和、差值、比值/效率等，表达式见 expressions.py）。
+等待最慢通道的时间不超过 max_latency，超时的通道按最后一个值保持。
+"""
+
+import math
+
+import numpy as np
+
+
+METHOD_LINEAR = 'linear'
+METHOD_ZOH = 'zoh'
+
+ALIGN_METHODS = {
+    METHOD_LINEAR: "线性插值",
+    METHOD_ZOH: "零阶保持",
+}
+
+# 派生通道预设：键 -> 显示名称（差值与比值使用前两个通道 A、B）
+DERIVED_OPS = {
+    'sum': "总和 ΣP",
+    'difference': "差值 A−B",
+    'ratio': "比值 A/B (效率)",
+}
+
+
+def preset_definition(op, channels):
+    """
+    派生通道预设对应的表达式定义（见 expressions.py）
+
+    Args:
+        op: DERIVED_OPS 中的键
+        channels: 通道名列表（A, B, ...）
+    """
+    if op == 'sum':
+        return "Total = " + " + ".join(channels)
+    if len(channels) < 2:
+        raise ValueError(f"{DERIVED_OPS[op]} 需要至少两个通道")
+    a, b = channels[0], channels[1]
+    if op == 'difference':
+        return f"Diff = {a} - {b}"
+    if op == 'ratio':
+        return f"Eff = {a} / {b}"
+    raise ValueError(f"未知派生运算: {op}")
+
+
+class StreamAligner:
+    """
+    增量时间对齐
+
+    add() 按批追加各通道样本（时间单调），align() 输出自上次以来已可确定的网格点，
+    每次只保留插值所需的尾部样本，内存与运行时长无关。
+    """
+
+    def __init__(self, channels, period, method=METHOD_LINEAR, max_latency=0.5):
+        if method not in ALIGN_METHODS:
+            raise ValueError(f"未知插值方式: {method}")
+        self.channels = list(channels)
+        self.period = float(period)
+        self.method = method
+        self.max_latency = max_latency
+        self.next_t = None
+        self._t = {c: np.zeros(0) for c in self.channels}
+        self._v = {c: np.zeros(0) for c in self.channels}
+
+    def add(self, channel, times, values):
+        """追加某通道的一批样本"""
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) == 0:
+            return
+        self._t[channel] = np.concatenate((self._t[channel], times))
+        self._v[channel] = np.concatenate((self._v[channel], np.asarray(values, dtype=np.float64)))
+
+    def reset(self):
+        self.next_t = None
+        for c in self.channels:
+            self._t[c] = np.zeros(0)
+            self._v[c] = np.zeros(0)
+
+    def _limit(self, now):
+        """本次可输出到的最晚网格时间"""
+        lasts = [self._t[c][-1] for c in self.channels if len(self._t[c])]
+        if not lasts:
+            return None
+        limit = min(lasts) if len(lasts) == len(self.channels) else -math.inf
+        if now is not None:
+            # 慢通道最多等待 max_latency
+            limit = max(limit, now - self.max_latency)
+        return min(limit, max(lasts))
+
+    def _resample(self, channel, grid):
+        t = self._t[channel]
+        v = self._v[channel]
+        if len(t) == 0:
+            return np.full(len(grid), np.nan)
+        if self.method == METHOD_LINEAR:
+            # 两端之外按端点值保持
+            out = np.interp(grid, t, v)
+        else:
+            idx = np.searchsorted(t, grid, side='right') - 1
+            out = v[np.maximum(idx, 0)]
+        out[grid < t[0]] = np.nan
+        return out
+
+    def align(self, now=None):
+        """
+        输出新的对齐网格点
+
+        Args:
+            now: 当前时间（与样本同一时间轴），给定时启用 max_latency 超时
+
+        Returns:
+            (grid, columns)：网格时间数组与各通道对齐值数组的列表；无新点时 grid 为空
+        """
+        limit = self._limit(now)
+        if limit is None:
+            return np.zeros(0), [np.zeros(0) for _ in self.channels]
+        if self.next_t is None:
+            firsts = [self._t[c][0] for c in self.channels if len(self._t[c])]
+            self.next_t = math.ceil(max(firsts) / self.period) * self.period
+        if limit < self.next_t:
+            return np.zeros(0), [np.zeros(0) for _ in self.channels]
+
+        count = int(math.floor((limit - self.next_t) / self.period + 1e-9)) + 1
+        grid = self.next_t + np.arange(count) * self.period
+        columns = [self._resample(c, grid) for c in self.channels]
+        self.next_t = grid[-1] + self.period
+
+        # 只保留下一个网格点之前的最后一个样本及其后的样本
+        for c in self.channels:
+            keep = max(int(np.searchsorted(self._t[c], self.next_t, side='right')) - 1, 0)
+            if keep:
+                self._t[c] = self._t[c][keep:]
+                self._v[c] = self._v[c][keep:]
+        return grid, columns
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+长期归档格式 (.pmarc)
+时间戳量化为整数刻度后做二阶差分（delta-of-delta）+ zigzag，功率值与前一个值按位异或（Gorilla XOR），
+两列各自按字节重排（shuffle）后用 zstd（未安装时用 zlib）压缩；编码与解码全部为 numpy 向量运算。
+数据按固定样本数分块，文件末尾为块索引，读取时间范围只解压涉及的块。
+
+文件结构：
+    文件头  MAGIC | 编码器 | 时间分辨率 | 元数据 JSON
+    数据块  块头 (样本数, 时间段长度, 数值段长度, 起止时间) | 时间段 | 数值段
+    ...
+    块索引  结构化数组（每块一行）
+    文件尾  索引偏移 | 块数 | FOOTER_MAGIC
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+MAGIC = b'PMARC\x01'
+FOOTER_MAGIC = b'PMARCIDX'
+
+HEADER = struct.Struct('<6sBdI')        # magic, codec, resolution, metadata 长度
+CHUNK_HEADER = struct.Struct('<IIIdd')  # count, t_len, v_len, t_first, t_last
+FOOTER = struct.Struct('<QQ8s')         # index_offset, chunk_count, magic
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+INDEX_DTYPE = np.dtype([
+    ('t_first', '<f8'), ('t_last', '<f8'), ('offset', '<u8'), ('count', '<u4'),
+])
+
+# 默认每块样本数与时间分辨率 (s)
+DEFAULT_CHUNK_SIZE = 16384
+DEFAULT_RESOLUTION = 1e-6
+
+
+def _compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == CODEC_ZSTD:
+        if not HAS_ZSTD:
+            raise RuntimeError("该归档使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _shuffle(words):
+    """uint64 数组按字节重排：所有第 0 字节、所有第 1 字节……"""
+    return np.ascontiguousarray(words.astype('<u8').view(np.uint8).reshape(-1, 8).T).tobytes()
+
+
+def _unshuffle(data, count):
+    return np.frombuffer(data, dtype=np.uint8).reshape(8, count).T.copy().view('<u8').ravel()
+
+
+def encode_times(times, resolution=DEFAULT_RESOLUTION):
+    """时间戳 -> 二阶差分 + zigzag 的 uint64（量化到 resolution）"""
+    ticks = np.rint(np.asarray(times, dtype=np.float64) / resolution).astype(np.int64)
+    dod = np.diff(np.diff(ticks, prepend=0), prepend=0)
+    return ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+
+
+def decode_times(words, resolution=DEFAULT_RESOLUTION):
+    words = words.view(np.int64)
+    dod = (words >> 1 & 0x7FFFFFFFFFFFFFFF) ^ -(words & 1)
+    return np.cumsum(np.cumsum(dod)) * resolution
+
+
+def encode_values(values):
+    """功率值 -> 与前一值按位异或的 uint64（无损）"""
+    bits = np.ascontiguousarray(values, dtype='<f8').view(np.uint64)
+    xor = bits.copy()
+    xor[1:] ^= bits[:-1]
+    return xor
+
+
+def decode_values(words):
+    return np.bitwise_xor.accumulate(words).view(np.float64)
+
+
+class ArchiveWriter:
+    """
+    归档写入
+
+    append() 可以在记录过程中反复调用，攒满 chunk_size 个样本即编码写出一块；
+    close() 写出剩余样本、块索引和文件尾。
+    """
+
+    def __init__(self, path, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 resolution=DEFAULT_RESOLUTION, codec=None):
+        self.path = path
+        self.chunk_size = int(chunk_size)
+        self.resolution = resolution
+        self.codec = codec or (CODEC_ZSTD if HAS_ZSTD else CODEC_ZLIB)
+        self.count = 0
+        self._index = []
+        self._pending_t = []
+        self._pending_v = []
+        self._pending = 0
+
+        self._file = open(path, 'wb')
+        meta = json.dumps(metadata or {}, ensure_ascii=False).encode('utf-8')
+        self._file.write(HEADER.pack(MAGIC, self.codec, resolution, len(meta)) + meta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, times, values):
+        """追加一批样本（时间需单调不减）"""
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times) == 0:
+            return
+        self._pending_t.append(times)
+        self._pending_v.append(values)
+        self._pending += len(times)
+        if self._pending >= self.chunk_size:
+            self._write_pending(final=False)
+
+    def _write_pending(self, final):
+        times = np.concatenate(self._pending_t)
+        values = np.concatenate(self._pending_v)
+        full = len(times) if final else len(times) - len(times) % self.chunk_size
+        for start in range(0, full, self.chunk_size):
+            stop = min(start + self.chunk_size, full)
+            self._write_chunk(times[start:stop], values[start:stop])
+        self._pending_t = [times[full:]]
+        self._pending_v = [values[full:]]
+        self._pending = len(times) - full
+
+    def _write_chunk(self, times, values):
+        t_data = _compress(self.codec, _shuffle(encode_times(times, self.resolution)))
+        v_data = _compress(self.codec, _shuffle(encode_values(values)))
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(len(times), len(t_data), len(v_data), times[0], times[-1]))
+        self._file.write(t_data)
+        self._file.write(v_data)
+        self._index.append((times[0], times[-1], offset, len(times)))
+        self.count += len(times)
+
+    def close(self):
+        """写出剩余样本与块索引"""
+        if self._file is None:
+            return
+        if self._pending:
+            self._write_pending(final=True)
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=INDEX_DTYPE).tobytes())
+        self._file.write(FOOTER.pack(index_offset, len(self._index), FOOTER_MAGIC))
+        self._file.close()
+        self._file = None
+
+    @property
+    def compressed_bytes(self):
+        """已写入的字节数"""
+        return self._file.tell() if self._file is not None else os.path.getsize(self.path)
+
+
+class ArchiveReader:
+    """归档读取：按块索引定位，只解压与时间范围相交的块"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, self.codec, self.resolution, meta_len = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是 PM-Monitor 归档文件")
+        self.metadata = json.loads(self._file.read(meta_len).decode('utf-8'))
+        self._data_start = self._file.tell()
+        self.index = self._read_index()
+
+    def _read_index(self):
+        size = os.path.getsize(self.path)
+        if size >= self._data_start + FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, chunk_count, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic == FOOTER_MAGIC:
+                self._file.seek(index_offset)
+                return np.frombuffer(self._file.read(chunk_count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+        # 写入中断（没有文件尾）：顺序扫描块头重建索引
+        return self._scan_chunks(size)
+
+    def _scan_chunks(self, size):
+        entries = []
+        offset = self._data_start
+        while offset + CHUNK_HEADER.size <= size:
+            self._file.seek(offset)
+            count, t_len, v_len, t_first, t_last = CHUNK_HEADER.unpack(self._file.read(CHUNK_HEADER.size))
+            end = offset + CHUNK_HEADER.size + t_len + v_len
+            if end > size:
+                break
+            entries.append((t_first, t_last, offset, count))
+            offset = end
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def count(self):
+        return int(self.index['count'].sum())
+
+    @property
+    def time_span(self):
+        """(最早, 最晚) 时间，空归档为 (None, None)"""
+        if len(self.index) == 0:
+            return None, None
+        return float(self.index['t_first'][0]), float(self.index['t_last'][-1])
+
+    def read_chunk(self, i):
+        """解码第 i 块，返回 (times, values)"""
+        self._file.seek(int(self.index['offset'][i]))
+        count, t_len, v_len, _, _ = CHUNK_HEADER.unpack(self._file.read(CHUNK_HEADER.size))
+        t_words = _unshuffle(_decompress(self.codec, self._file.read(t_len)), count)
+        v_words = _unshuffle(_decompress(self.codec, self._file.read(v_len)), count)
+        return decode_times(t_words, self.resolution), decode_values(v_words)
+
+    def read_range(self, t0=None, t1=None):
+        """读取 [t0, t1] 内的样本，返回 (times, values)"""
+        lo = 0 if t0 is None else int(np.searchsorted(self.index['t_last'], t0, side='left'))
+        hi = len(self.index) if t1 is None else int(np.searchsorted(self.index['t_first'], t1, side='right'))
+        if hi <= lo:
+            return np.zeros(0), np.zeros(0)
+        chunks = [self.read_chunk(i) for i in range(lo, hi)]
+        times = np.concatenate([c[0] for c in chunks])
+        values = np.concatenate([c[1] for c in chunks])
+        mask = np.ones(len(times), dtype=bool)
+        if t0 is not None:
+            mask &= times >= t0
+        if t1 is not None:
+            mask &= times <= t1
+        return times[mask], values[mask]
+
+    def close(self):
+        self._file.close()
+
+
+def write_archive(path, times, values, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """一次性写出归档，返回压缩后字节数"""
+    with ArchiveWriter(path, metadata, chunk_size) as writer:
+        writer.append(times, values)
+    return os.path.getsize(path)
+
+
+def archive_session(db, session_id, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    把会话数据库中的一个会话流式写入归档
+
+    Returns:
+        (样本数, 压缩后字节数)
+    """
+    session = next((s for s in db.list_sessions() if s['id'] == session_id), None)
+    if session is None:
+        raise ValueError(f"会话 #{session_id} 不存在")
+    with ArchiveWriter(path, session, chunk_size) as writer:
+        for times, values in db.iter_samples(session_id, chunk_size):
+            writer.append(times, values)
+    return writer.count, os.path.getsize(path)
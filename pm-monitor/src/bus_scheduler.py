@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享总线调度
+GPIB 与串口 (ASRL) 上的多台仪器共用一条物理总线，同一时刻只能有一个事务；
+每台仪器各开一个线程只会在驱动层互相阻塞、节拍不可控。
+这里按总线分组，每条总线一个调度线程，按轮询或优先级交错查询，
+GPIB 上所有仪器都支持组触发 (GET) 时一次触发、依次读取，各表读数为同一时刻的测量值。
+LAN / USB 等独立连接的仪器不经过调度器，仍各自一个采集线程并行采集。
+"""
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+import clock
+
+try:
+    import pyvisa
+    HAS_PYVISA = True
+except ImportError:
+    HAS_PYVISA = False
+
+
+SCHEDULE_ROUND_ROBIN = 'round_robin'
+SCHEDULE_PRIORITY = 'priority'
+
+SCHEDULE_MODES = {
+    SCHEDULE_ROUND_ROBIN: "轮询",
+    SCHEDULE_PRIORITY: "优先级",
+}
+
+# 吞吐统计的上报间隔 (s)
+REPORT_INTERVAL = 1.0
+
+
+def bus_key(resource_name):
+    """
+    资源所在的共享总线
+
+    Returns:
+        总线名（GPIB0 / ASRL3 ...），LAN / USB 等独立连接返回 None
+    """
+    for part in resource_name.strip().upper().split('::'):
+        if part == 'GPIB':
+            return 'GPIB0'
+        if part.startswith('GPIB') and part[4:].isdigit():
+            return part
+        if part.startswith('ASRL') and len(part) > 4:
+            return part
+    return None
+
+
+def group_by_bus(resources):
+    """
+    按总线分组
+
+    Returns:
+        (buses, parallel)：buses 为 总线名 -> [资源序号, ...]，parallel 为独立连接的资源序号列表
+    """
+    buses = {}
+    parallel = []
+    for i, resource in enumerate(resources):
+        bus = bus_key(resource)
+        if bus is None:
+            parallel.append(i)
+        else:
+            buses.setdefault(bus, []).append(i)
+    return buses, parallel
+
+
+def open_group_trigger(rm, bus):
+    """打开 GPIB 接口会话（GPIBn::INTFC）用于组触发，不支持时返回 None"""
+    if not bus.startswith('GPIB'):
+        return None
+    try:
+        interface = rm.open_resource(f"{bus}::INTFC")
+    except Exception:
+        return None
+    if not hasattr(interface, 'group_execute_trigger'):
+        interface.close()
+        return None
+    return interface
+
+
+class BusMember:
+    """
+    总线上的一台仪器
+
+    Args:
+        channel: 通道序号（回传给界面）
+        instrument: 已打开的仪器
+        strategy: drivers 中的采集方式
+        interval: 采样周期 (s)
+        priority: 优先级，数值越小越优先
+        trigger_fetch: 组触发后读取测量值的命令（不支持组触发时为 None）
+    """
+
+    def __init__(self, channel, instrument, strategy, interval, priority=0, trigger_fetch=None):
+        self.channel = channel
+        self.instrument = instrument
+        self.strategy = strategy
+        self.interval = max(interval, strategy.poll_interval)
+        self.priority = priority
+        self.trigger_fetch = trigger_fetch
+        self.next_due = 0.0
+
+
+class BusScheduler(QThread):
+    """
+    一条总线的调度线程
+
+    轮询模式按固定顺序轮流服务到期的仪器，总线饱和时各表等比例降速；
+    优先级模式总是先服务到期仪器中优先级最高的，总线饱和时低优先级仪器降速。
+    每 REPORT_INTERVAL 上报实际总采样率与按实测事务耗时估算的可达总采样率。
+    时间取自 clock 模块；调度循环在 run() 中，不支持虚拟时钟驱动。
+    """
+
+    channel_samples = pyqtSignal(int, object)        # 通道序号, [(t, value), ...]
+    rate_report = pyqtSignal(str, float, float)      # 总线名, 实际 Sa/s, 可达 Sa/s
+    read_error = pyqtSignal(str)
+
+    virtual_clock = False
+
+    def __init__(self, bus, members, start_time, mode=SCHEDULE_ROUND_ROBIN, trigger=None,
+                 emit_interval=0.033, parent=None):
+        super().__init__(parent)
+        if mode not in SCHEDULE_MODES:
+            raise ValueError(f"未知调度方式: {mode}")
+        self.bus = bus
+        self.members = list(members)
+        self.start_time = start_time
+        self.mode = mode
+        self.emit_interval = emit_interval
+        # 只有全部仪器都支持组触发时才使用
+        self.trigger = trigger if all(m.trigger_fetch for m in self.members) else None
+        self._running = False
+        self._cursor = 0
+        self._pending = {}
+        self._report_count = 0
+        self._report_busy = 0.0
+
+    @property
+    def instruments(self):
+        """本调度器使用的全部会话（停止后由调用方关闭）"""
+        return [m.instrument for m in self.members] + ([self.trigger] if self.trigger is not None else [])
+
+    @property
+    def group_triggered(self):
+        return self.trigger is not None
+
+    def _next_member(self, now):
+        """选出下一台要服务的到期仪器，没有到期的返回 None"""
+        n = len(self.members)
+        due = [(k, self.members[(self._cursor + k) % n]) for k in range(n)]
+        due = [(k, m) for k, m in due if m.next_due <= now]
+        if not due:
+            return None
+        if self.mode == SCHEDULE_PRIORITY:
+            k, member = min(due, key=lambda item: (item[1].priority, item[0]))
+        else:
+            k, member = due[0]
+        self._cursor = (self._cursor + k + 1) % n
+        return member
+
+    @staticmethod
+    def _reschedule(member, now):
+        # 与 AcquisitionWorker 相同：落后超过一个周期时不追赶
+        member.next_due += member.interval
+        if member.next_due < now - member.interval:
+            member.next_due = now
+
+    def _read_member(self, member):
+        values = member.strategy.read(member.instrument)
+        times = member.strategy.timestamps(len(values), clock.now() - self.start_time)
+        self._pending.setdefault(member.channel, []).extend(zip(times, values))
+        return len(values)
+
+    def _poll(self, now):
+        """按调度方式服务一台仪器；返回 (样本数, 下一次需要醒来的时刻)"""
+        member = self._next_member(now)
+        if member is None:
+            return 0, min(m.next_due for m in self.members)
+        count = self._read_member(member)
+        self._reschedule(member, clock.monotonic())
+        return count, now
+
+    def _poll_triggered(self, now):
+        """组触发：一次 GET 后按调度顺序逐台读取该次测量值"""
+        lead = self.members[0]
+        if lead.next_due > now:
+            return 0, lead.next_due
+        self.trigger.group_execute_trigger(*[getattr(m.instrument, 'instrument', m.instrument)
+                                             for m in self.members])
+        t = clock.now() - self.start_time
+        order = sorted(self.members, key=lambda m: m.priority) if self.mode == SCHEDULE_PRIORITY else self.members
+        for member in order:
+            value = float(member.instrument.query(member.trigger_fetch).strip())
+            self._pending.setdefault(member.channel, []).append((t, value))
+        self._reschedule(lead, clock.monotonic())
+        return len(self.members), now
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        for channel, samples in pending.items():
+            if samples:
+                self.channel_samples.emit(channel, samples)
+
+    def run(self):
+        self._running = True
+        now = clock.monotonic()
+        for member in self.members:
+            member.next_due = now
+        if self.trigger is not None:
+            # 组触发按最慢仪器的周期整体进行
+            self.members[0].interval = max(m.interval for m in self.members)
+        last_emit = last_report = now
+        while self._running:
+            begin = clock.monotonic()
+            try:
+                if self.trigger is not None:
+                    count, wake = self._poll_triggered(begin)
+                else:
+                    count, wake = self._poll(begin)
+            except ValueError as e:
+                count, wake = 0, begin
+                self.read_error.emit(f"{self.bus} 数据格式错误: {e}")
+            except Exception as e:
+                count, wake = 0, begin
+                if HAS_PYVISA and isinstance(e, pyvisa.Error):
+                    self.read_error.emit(f"{self.bus} 读取错误: {e.abbreviation}")
+                else:
+                    self.read_error.emit(f"{self.bus} 读取错误: {e}")
+                # 出错的事务也占用了总线时间，避免忙等
+                for member in self.members:
+                    if member.next_due <= begin:
+                        self._reschedule(member, begin)
+            end = clock.monotonic()
+            if count:
+                self._report_count += count
+                self._report_busy += end - begin
+
+            if end - last_emit >= self.emit_interval:
+                self.flush()
+                last_emit = end
+            if end - last_report >= REPORT_INTERVAL:
+                self._report(end - last_report)
+                last_report = end
+
+            delay = wake - clock.monotonic()
+            if delay > 0:
+                clock.sleep(min(delay, 0.05))
+        self.flush()
+
+    def _report(self, elapsed):
+        """上报实际总采样率与可达总采样率（总线一直忙碌时的采样率）"""
+        achieved = self._report_count / elapsed
+        capacity = self._report_count / self._report_busy if self._report_busy > 0 else 0.0
+        self.rate_report.emit(self.bus, achieved, capacity)
+        self._report_count = 0
+        self._report_busy = 0.0
+
+    def stop(self):
+        """停止调度并等待线程退出"""
+        self._running = False
+        self.wait()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瞬态事件捕获（类似示波器触发）
+在采集线程中持续维护预触发环形缓冲区，电平或斜率触发后保存
+N 个预触发样本和 M 个后触发样本为一条独立的事件记录
+"""
+
+import collections
+
+import numpy as np
+
+
+# 触发方式
+TRIGGER_RISING = 'rising'     # 电平上升沿穿越
+TRIGGER_FALLING = 'falling'   # 电平下降沿穿越
+TRIGGER_SLOPE = 'slope'       # |dP/dt| 超过阈值 (W/s)
+
+TRIGGER_MODES = {
+    TRIGGER_RISING: "电平上升沿",
+    TRIGGER_FALLING: "电平下降沿",
+    TRIGGER_SLOPE: "斜率 (W/s)",
+}
+
+# 捕获到的事件：times/values 含预触发与后触发样本，pre_count 为触发点下标
+CaptureEvent = collections.namedtuple('CaptureEvent', 'index trigger_time mode level times values pre_count')
+
+
+class TriggerCapture:
+    """
+    触发捕获处理阶段
+
+    process() 每样本只写一次预触发环形缓冲区并做一次比较（O(1)）；
+    触发时把预触发缓冲区按时间顺序拷贝一次，之后逐点填充后触发数组。
+    """
+
+    def __init__(self, mode=TRIGGER_RISING, level=60.0, pre_samples=100, post_samples=200, holdoff=0.0):
+        if mode not in TRIGGER_MODES:
+            raise ValueError(f"未知触发方式: {mode}")
+        self.mode = mode
+        self.level = level
+        self.pre_samples = max(1, int(pre_samples))
+        self.post_samples = max(1, int(post_samples))
+        self.holdoff = holdoff
+        self.event_count = 0
+
+        self._pre_t = np.zeros(self.pre_samples)
+        self._pre_v = np.zeros(self.pre_samples)
+        self._pre_head = 0
+        self._pre_size = 0
+        self._prev = None
+        self._rearm_at = None
+        self._capture = None   # 正在进行的捕获
+
+    def _fired(self, t, value):
+        """判断当前样本是否满足触发条件"""
+        prev = self._prev
+        if prev is None:
+            return False
+        pt, pv = prev
+        if self.mode == TRIGGER_RISING:
+            return pv < self.level <= value
+        if self.mode == TRIGGER_FALLING:
+            return pv > self.level >= value
+        return t > pt and abs(value - pv) / (t - pt) >= self.level
+
+    def process(self, t, value):
+        """处理一个样本，事件捕获完成时返回 [CaptureEvent]"""
+        result = None
+        if self._capture is not None:
+            result = self._fill(t, value)
+        elif (self._rearm_at is None or t >= self._rearm_at) and self._fired(t, value):
+            result = self._start_capture(t, value)
+
+        self._prev = (t, value)
+        self._push_pre(t, value)
+        return result
+
+    def _push_pre(self, t, value):
+        i = self._pre_head
+        self._pre_t[i] = t
+        self._pre_v[i] = value
+        self._pre_head = (i + 1) % self.pre_samples
+        if self._pre_size < self.pre_samples:
+            self._pre_size += 1
+
+    def _start_capture(self, t, value):
+        """触发：按时间顺序拷贝预触发样本，触发样本作为后触发段的第一个点"""
+        n = self._pre_size
+        if n < self.pre_samples:
+            order = np.arange(n)
+        else:
+            order = np.r_[self._pre_head:self.pre_samples, 0:self._pre_head]
+
+        times = np.empty(n + self.post_samples)
+        values = np.empty(n + self.post_samples)
+        times[:n] = self._pre_t[order]
+        values[:n] = self._pre_v[order]
+
+        self.event_count += 1
+        self._capture = {
+            'index': self.event_count,
+            'trigger_time': t,
+            'times': times,
+            'values': values,
+            'pre_count': n,
+            'filled': n,
+        }
+        return self._fill(t, value)
+
+    def _fill(self, t, value):
+        """后触发阶段逐点填充，填满后返回 [CaptureEvent]"""
+        cap = self._capture
+        i = cap['filled']
+        cap['times'][i] = t
+        cap['values'][i] = value
+        cap['filled'] = i + 1
+        if cap['filled'] < len(cap['times']):
+            return None
+
+        self._capture = None
+        self._rearm_at = t + self.holdoff
+        return [CaptureEvent(
+            cap['index'], cap['trigger_time'], self.mode, self.level,
+            cap['times'], cap['values'], cap['pre_count']
+        )]
+
+    def reset(self):
+        """清空缓冲区与进行中的捕获，事件编号从 1 重新开始"""
+        self.event_count = 0
+        self._pre_head = 0
+        self._pre_size = 0
+        self._prev = None
+        self._rearm_at = None
+        self._capture = None
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时钟与调度
+本进程内的采集线程、总线调度、回放、模拟仪器与界面计时通过本模块取时间、休眠和启动采集线程，默认为系统时钟。
+长时间行为测试安装 VirtualClock：时间只在调度器推进时前进，采集线程不真正启动，
+而是由调度器按虚拟时间依次调用其 poll() / flush()，24 小时的会话可在几十秒内跑完（见 simulate.py）。
+
+虚拟时钟只能驱动声明 virtual_clock = True 的本地采集线程（AcquisitionWorker）；
+采集子进程（acq_process、串口连续输出）不共享本进程安装的时钟，始终使用系统时间，
+总线调度、回放与远程代理订阅的节奏在各自的 run() 中，这些线程交给 VirtualClock.start_worker() 会被拒绝。
+"""
+
+import heapq
+import itertools
+import time as _time
+
+
+class SystemClock:
+    """系统时钟：真实时间，采集线程正常启动"""
+
+    def time(self):
+        return _time.time()
+
+    def monotonic(self):
+        return _time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            _time.sleep(seconds)
+
+    def start_worker(self, worker):
+        worker.start()
+
+
+class VirtualClock:
+    """
+    虚拟时钟与离散事件调度器
+
+    time() / monotonic() 返回虚拟时间，sleep() 直接推进虚拟时间；
+    start_worker() 把采集线程的 poll() 与 flush() 注册为按虚拟时间触发的周期任务，
+    run_until() 按到期顺序执行任务并推进时间。所有任务在调用 run_until() 的线程中执行，
+    信号为直接连接，结果与执行顺序完全确定。
+
+    Args:
+        epoch: time() 在虚拟时间 0 时的值（默认当前系统时间）
+        flush_interval: 采集线程向界面送样本的虚拟间隔 (s)，默认与线程的 emit_interval 相同；
+            取大一些可减少界面刷新次数，加快模拟
+    """
+
+    def __init__(self, epoch=None, flush_interval=None):
+        self.epoch = _time.time() if epoch is None else epoch
+        self.flush_interval = flush_interval
+        self.now = 0.0
+        self.executed = 0
+        self._tasks = []
+        self._seq = itertools.count()
+
+    def time(self):
+        return self.epoch + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def every(self, interval, callback, delay=None):
+        """
+        注册周期任务，首次在 delay（默认一个周期）后执行；
+        callback 返回 False 时不再执行
+        """
+        if interval <= 0:
+            raise ValueError("周期必须为正数")
+        due = self.now + (interval if delay is None else delay)
+        heapq.heappush(self._tasks, (due, next(self._seq), interval, callback))
+
+    def start_worker(self, worker):
+        """按虚拟时间驱动采集线程（不启动线程）；线程 stop() 后送出剩余样本并注销"""
+        if not getattr(worker, 'virtual_clock', False):
+            raise ValueError(f"虚拟时钟无法驱动 {type(worker).__name__}（仅支持本地采集线程）")
+        worker._running = True
+
+        def poll():
+            if not worker._running:
+                return False
+            worker.poll()
+
+        def flush():
+            worker.flush()
+            return worker._running
+
+        self.every(worker.interval, poll, delay=0.0)
+        self.every(self.flush_interval or worker.emit_interval, flush)
+
+    def run_until(self, t_end):
+        """按到期顺序执行任务，直到虚拟时间 t_end；返回执行的任务数"""
+        count = 0
+        while self._tasks and self._tasks[0][0] <= t_end:
+            due, seq, interval, callback = heapq.heappop(self._tasks)
+            self.now = max(self.now, due)
+            if callback() is not False:
+                heapq.heappush(self._tasks, (due + interval, seq, interval, callback))
+            count += 1
+        self.now = max(self.now, t_end)
+        self.executed += count
+        return count
+
+    def run_for(self, seconds):
+        return self.run_until(self.now + seconds)
+
+
+_clock = SystemClock()
+
+
+def install(clock):
+    """安装时钟（测试用），返回该时钟"""
+    global _clock
+    _clock = clock
+    return clock
+
+
+def current():
+    return _clock
+
+
+def now():
+    """当前时间戳 (s)，对应 time.time()"""
+    return _clock.time()
+
+
+def monotonic():
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+
+def start_worker(worker):
+    """启动采集线程（虚拟时钟下改由调度器驱动）"""
+    _clock.start_worker(worker)
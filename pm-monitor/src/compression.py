@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有损有界压缩
+稳态负载下连续几小时的平直曲线不必逐点保存。两种算法都保证由保存的点重建的曲线
+与原始样本的误差不超过容差：
+    - 死区 (deadband)：数值偏离上一个保存值超过容差时才保存，按零阶保持重建
+    - 旋转门 (swinging door)：只要一条直线能在容差内穿过自上一个保存点以来的全部样本就不保存，
+      按线性插值重建；保存点取在门内直线上，数值与原始样本的差也不超过容差
+最后一个样本在 flush() 时总会保存，重建的时间范围与原始数据相同。
+"""
+
+import math
+
+import numpy as np
+
+
+METHOD_DEADBAND = 'deadband'
+METHOD_SWINGING_DOOR = 'swinging_door'
+
+COMPRESSION_METHODS = {
+    METHOD_DEADBAND: "死区",
+    METHOD_SWINGING_DOOR: "旋转门",
+}
+
+
+class Compressor:
+    """
+    逐点压缩
+
+    add() 每输入一个样本返回需要保存的点（0 至 2 个），结束时调用 flush() 取出最后一点；
+    received / kept 为累计输入与保存的点数。
+    """
+
+    def __init__(self, method=METHOD_SWINGING_DOOR, tolerance=0.1):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"未知压缩方式: {method}")
+        if tolerance < 0:
+            raise ValueError("压缩容差不能为负数")
+        self.method = method
+        self.tolerance = float(tolerance)
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.kept = 0
+        self._anchor = None     # 上一个保存点 (t, v, 序号)
+        self._last = None       # 上一个未保存的样本
+        self._low = -math.inf   # 旋转门：下门斜率（只增）
+        self._up = math.inf     # 旋转门：上门斜率（只减）
+
+    @property
+    def ratio(self):
+        """压缩比：输入点数 / 保存点数"""
+        return self.received / self.kept if self.kept else 1.0
+
+    def add(self, t, value):
+        """输入一个样本，返回需要保存的 [(t, value), ...]"""
+        return [(pt, pv) for pt, pv, _ in self._push(t, value)]
+
+    def flush(self):
+        """保存最后一个未保存的样本（结束录制或导出时调用）"""
+        return [(pt, pv) for pt, pv, _ in self._flush()]
+
+    def _push(self, t, value):
+        index = self.received
+        self.received += 1
+        if self._anchor is None:
+            return self._archive(t, value, index)
+        if self.method == METHOD_DEADBAND:
+            if abs(value - self._anchor[1]) > self.tolerance:
+                return self._archive(t, value, index)
+            self._last = (t, value, index)
+            return []
+        return self._swing(t, value, index)
+
+    def _flush(self):
+        if self._last is None:
+            return []
+        if self.method == METHOD_DEADBAND:
+            return self._archive(*self._last)
+        return self._close_door()
+
+    def _archive(self, t, value, index):
+        self._anchor = (t, value, index)
+        self._last = None
+        self._low = -math.inf
+        self._up = math.inf
+        self.kept += 1
+        return [self._anchor]
+
+    def _swing(self, t, value, index):
+        t0, v0, _ = self._anchor
+        dt = t - t0
+        if dt <= 0:
+            # 时间戳不递增时斜率无定义，先结束当前段再直接保存
+            return self._flush() + self._archive(t, value, index)
+        low = max(self._low, (value - self.tolerance - v0) / dt)
+        up = min(self._up, (value + self.tolerance - v0) / dt)
+        if low <= up:
+            self._low, self._up = low, up
+            self._last = (t, value, index)
+            return []
+        # 门已关闭：在上一个样本处保存，当前样本作为新一段的第一点
+        return self._close_door() + self._swing(t, value, index)
+
+    def _close_door(self):
+        """在上一个样本时刻取门内直线上的点保存，作为下一段的起点"""
+        tl, vl, index = self._last
+        t0, v0, _ = self._anchor
+        slope = min(max((vl - v0) / (tl - t0), self._low), self._up)
+        return self._archive(tl, v0 + slope * (tl - t0), index)
+
+
+def compress(times, values, method=METHOD_SWINGING_DOOR, tolerance=0.1):
+    """
+    压缩整段数据
+
+    Returns:
+        (indices, kept_values)：保存点在原数组中的序号与保存的数值
+        （死区为原始值，旋转门为门内直线上的值）
+    """
+    compressor = Compressor(method, tolerance)
+    push = compressor._push
+    kept = []
+    for t, v in zip(np.asarray(times, dtype=np.float64).tolist(), np.asarray(values, dtype=np.float64).tolist()):
+        kept.extend(push(t, v))
+    kept.extend(compressor._flush())
+    indices = np.fromiter((i for _, _, i in kept), dtype=np.int64, count=len(kept))
+    kept_values = np.fromiter((v for _, v, _ in kept), dtype=np.float64, count=len(kept))
+    return indices, kept_values
+
+
+def reconstruct(kept_times, kept_values, times, method=METHOD_SWINGING_DOOR):
+    """由保存的点重建 times 时刻的数值（死区零阶保持，旋转门线性插值）"""
+    kept_times = np.asarray(kept_times, dtype=np.float64)
+    kept_values = np.asarray(kept_values, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    if method == METHOD_DEADBAND:
+        idx = np.searchsorted(kept_times, times, side='right') - 1
+        return kept_values[np.maximum(idx, 0)]
+    return np.interp(times, kept_times, kept_values)
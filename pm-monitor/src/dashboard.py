@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多表仪表盘
+每台功率计一个紧凑磁贴（当前值、窗口统计、采样率与迷你曲线），可选叠加总图。
+采集线程只把样本写入各磁贴的环形缓冲；全部磁贴由一个共享的帧定时器统一刷新，
+没有新数据或不可见（滚动区域外、窗口最小化）的磁贴不重绘。
+可用时曲线由 OpenGL 绘制，16 台 × 100 Sa/s 的渲染开销保持在一个核心以内。
+"""
+
+import math
+import time
+
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QGridLayout, QLabel, QPushButton, QComboBox,
+    QSpinBox, QPlainTextEdit, QCheckBox, QFrame, QScrollArea, QWidget, QMessageBox
+)
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QOpenGLContext
+
+import numpy as np
+import pyqtgraph as pg
+
+import bus_scheduler
+import clock
+from multimeter import MultiMeterDialog, open_workers, close_workers
+
+
+# 共享帧定时器周期 (ms)
+FRAME_INTERVAL_MS = 40
+
+_opengl_available = None
+
+
+def opengl_available():
+    """当前平台能否创建 OpenGL 上下文（结果缓存）"""
+    global _opengl_available
+    if _opengl_available is None:
+        try:
+            _opengl_available = bool(QOpenGLContext().create())
+        except Exception:
+            _opengl_available = False
+    return _opengl_available
+
+
+class MeterTile(QFrame):
+    """
+    一台仪表的磁贴
+
+    append() 只写环形缓冲并标记有新数据，refresh() 由帧定时器调用，
+    仅在有新数据且磁贴可见时更新文字与曲线。
+    """
+
+    SPARK_POINTS = 1000
+
+    def __init__(self, name, resource, color, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.StyledPanel)
+        self.setMinimumSize(220, 130)
+        self.name = name
+        self.resource = resource
+        self.color = color
+        self._t = np.zeros(self.SPARK_POINTS)
+        self._v = np.zeros(self.SPARK_POINTS)
+        self._head = 0              # 下一个写入位置
+        self._count = 0
+        self.version = 0            # 每次 append 递增，叠加总图据此判断是否需要重绘
+        self._drawn_version = 0
+        self._rate_count = 0
+        self._rate_start = clock.monotonic()
+        self.rate = 0.0
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 4, 6, 4)
+        layout.setSpacing(2)
+        header = QHBoxLayout()
+        lbl_name = QLabel(f"<b>{name}</b>")
+        lbl_name.setToolTip(resource)
+        lbl_name.setStyleSheet(f"color: {color};")
+        header.addWidget(lbl_name)
+        self.lbl_value = QLabel("--")
+        self.lbl_value.setStyleSheet("font-size: 16px; font-weight: bold;")
+        header.addWidget(self.lbl_value, 1)
+        layout.addLayout(header)
+        self.lbl_stats = QLabel("")
+        self.lbl_stats.setStyleSheet("color: #666; font-size: 10px;")
+        layout.addWidget(self.lbl_stats)
+
+        self.plot = pg.PlotWidget()
+        self.plot.setBackground('#F5F5F5')
+        self.plot.hideAxis('left')
+        self.plot.hideAxis('bottom')
+        self.plot.hideButtons()
+        self.plot.setMenuEnabled(False)
+        self.plot.setMouseEnabled(x=False, y=False)
+        self.plot.setMinimumHeight(50)
+        self.curve = self.plot.plot(pen=pg.mkPen(color, width=1))
+        self.curve.setDownsampling(auto=True, method='peak')
+        self.curve.setClipToView(True)
+        layout.addWidget(self.plot, 1)
+
+    def append(self, samples):
+        """写入一批 (t, value) 样本"""
+        if not samples:
+            return
+        data = np.asarray(samples, dtype=np.float64)[-self.SPARK_POINTS:]
+        n = len(data)
+        end = self._head + n
+        if end <= self.SPARK_POINTS:
+            self._t[self._head:end] = data[:, 0]
+            self._v[self._head:end] = data[:, 1]
+        else:
+            split = self.SPARK_POINTS - self._head
+            self._t[self._head:] = data[:split, 0]
+            self._v[self._head:] = data[:split, 1]
+            self._t[:end - self.SPARK_POINTS] = data[split:, 0]
+            self._v[:end - self.SPARK_POINTS] = data[split:, 1]
+        self._head = end % self.SPARK_POINTS
+        self._count = min(self._count + n, self.SPARK_POINTS)
+        self._rate_count += len(samples)
+        self.version += 1
+
+    def data(self):
+        """按时间顺序返回缓冲中的 (t, values)"""
+        if self._count < self.SPARK_POINTS:
+            return self._t[:self._count], self._v[:self._count]
+        return (np.concatenate((self._t[self._head:], self._t[:self._head])),
+                np.concatenate((self._v[self._head:], self._v[:self._head])))
+
+    def is_shown(self):
+        """磁贴是否有部分在屏幕上可见"""
+        return self.isVisible() and not self.visibleRegion().isEmpty()
+
+    def refresh(self):
+        """有新数据且可见时重绘；返回是否重绘"""
+        now = clock.monotonic()
+        if now - self._rate_start >= 1.0:
+            self.rate = self._rate_count / (now - self._rate_start)
+            self._rate_count = 0
+            self._rate_start = now
+        if self.version == self._drawn_version or self._count == 0 or not self.is_shown():
+            return False
+        self._drawn_version = self.version
+        t, v = self.data()
+        self.curve.setData(t, v)
+        self._set_text(self.lbl_value, f"{v[-1]:.4f} W")
+        self._set_text(self.lbl_stats, f"均值 {v.mean():.3f}  最小 {v.min():.3f}  "
+                                       f"最大 {v.max():.3f}  {self.rate:.0f} Sa/s")
+        return True
+
+    @staticmethod
+    def _set_text(label, text):
+        # 文字不变时不触发重新布局
+        if label.text() != text:
+            label.setText(text)
+
+
+class DashboardDialog(QDialog):
+    """多表仪表盘"""
+
+    COLORS = MultiMeterDialog.COLORS
+
+    def __init__(self, command="MEAS:POW?", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("仪表盘")
+        self.resize(1100, 720)
+        self.workers = []
+        self.tiles = []
+        self.overlay_curves = []
+        self._overlay_versions = []
+        self.generation = 0   # 每次开始递增，丢弃上一轮线程仍在队列中的样本
+        self.frame_count = 0
+        self.frame_time = 0.0       # 最近一段时间内平均每帧耗时 (s)
+
+        layout = QHBoxLayout(self)
+
+        controls = QGridLayout()
+        controls.addWidget(QLabel("VISA 资源（每行一台）："), 0, 0, 1, 2)
+        self.edit_resources = QPlainTextEdit(
+            "\n".join(f"MOCK::PowerMeter::{i}" for i in range(1, 5))
+        )
+        controls.addWidget(self.edit_resources, 1, 0, 1, 2)
+
+        controls.addWidget(QLabel("查询命令："), 2, 0)
+        self.combo_command = QComboBox()
+        self.combo_command.setEditable(True)
+        self.combo_command.addItems(['MEAS:POW?', ':MEAS:POW?', 'FETC?', 'MEASure:POWer?'])
+        self.combo_command.setEditText(command)
+        controls.addWidget(self.combo_command, 2, 1)
+
+        controls.addWidget(QLabel("采样间隔："), 3, 0)
+        self.spin_interval = QSpinBox()
+        self.spin_interval.setRange(1, 5000)
+        self.spin_interval.setValue(10)
+        self.spin_interval.setSuffix(" ms")
+        controls.addWidget(self.spin_interval, 3, 1)
+
+        controls.addWidget(QLabel("总线调度："), 4, 0)
+        self.combo_schedule = QComboBox()
+        for key, label in bus_scheduler.SCHEDULE_MODES.items():
+            self.combo_schedule.addItem(label, key)
+        controls.addWidget(self.combo_schedule, 4, 1)
+        self.chk_group_trigger = QCheckBox("GPIB 组触发（驱动支持时）")
+        self.chk_group_trigger.setChecked(True)
+        controls.addWidget(self.chk_group_trigger, 5, 0, 1, 2)
+
+        self.chk_overlay = QCheckBox("叠加总图")
+        self.chk_overlay.toggled.connect(self.set_overlay)
+        controls.addWidget(self.chk_overlay, 6, 0, 1, 2)
+        self.chk_opengl = QCheckBox("OpenGL 绘图")
+        if opengl_available():
+            self.chk_opengl.setChecked(True)
+        else:
+            self.chk_opengl.setEnabled(False)
+            self.chk_opengl.setToolTip("当前平台不支持 OpenGL")
+        self.chk_opengl.toggled.connect(self.set_opengl)
+        controls.addWidget(self.chk_opengl, 7, 0, 1, 2)
+
+        self.btn_start = QPushButton("开始")
+        self.btn_start.clicked.connect(self.start)
+        controls.addWidget(self.btn_start, 8, 0)
+        self.btn_stop = QPushButton("停止")
+        self.btn_stop.clicked.connect(self.stop)
+        self.btn_stop.setEnabled(False)
+        controls.addWidget(self.btn_stop, 8, 1)
+
+        self.lbl_status = QLabel("")
+        self.lbl_status.setWordWrap(True)
+        controls.addWidget(self.lbl_status, 9, 0, 1, 2)
+        self.lbl_frame = QLabel("")
+        self.lbl_frame.setStyleSheet("color: #666;")
+        controls.addWidget(self.lbl_frame, 10, 0, 1, 2)
+        controls.setRowStretch(11, 1)
+        layout.addLayout(controls, 1)
+
+        right = QVBoxLayout()
+        self.tile_area = QScrollArea()
+        self.tile_area.setWidgetResizable(True)
+        self.tile_container = QWidget()
+        self.tile_grid = QGridLayout(self.tile_container)
+        self.tile_grid.setSpacing(4)
+        self.tile_area.setWidget(self.tile_container)
+        right.addWidget(self.tile_area, 3)
+
+        self.plot_overlay = pg.PlotWidget()
+        self.plot_overlay.setLabel('left', '功率', units='W')
+        self.plot_overlay.setLabel('bottom', '时间', units='s')
+        self.plot_overlay.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_overlay.setBackground('#F5F5F5')
+        self.legend = self.plot_overlay.addLegend()
+        self.plot_overlay.setVisible(False)
+        right.addWidget(self.plot_overlay, 2)
+        layout.addLayout(right, 4)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.render_frame)
+
+    def _resources(self):
+        return [line.strip() for line in self.edit_resources.toPlainText().splitlines() if line.strip()]
+
+    def _build_tiles(self, resources):
+        """按资源数重建磁贴网格（ceil(sqrt(n)) 列）"""
+        for tile in self.tiles:
+            self.tile_grid.removeWidget(tile)
+            tile.deleteLater()
+        names = MultiMeterDialog.channel_names(len(resources))
+        columns = max(1, math.ceil(math.sqrt(len(resources))))
+        self.tiles = []
+        for i, (name, resource) in enumerate(zip(names, resources)):
+            tile = MeterTile(name, resource, self.COLORS[i % len(self.COLORS)])
+            self.tile_grid.addWidget(tile, i // columns, i % columns)
+            self.tiles.append(tile)
+
+        self.plot_overlay.clear()
+        self.legend.clear()
+        self.overlay_curves = []
+        for tile in self.tiles:
+            curve = self.plot_overlay.plot(pen=pg.mkPen(tile.color, width=1), name=f"{tile.name}: {tile.resource}")
+            curve.setDownsampling(auto=True, method='peak')
+            curve.setClipToView(True)
+            self.overlay_curves.append(curve)
+        self._overlay_versions = [-1] * len(self.tiles)
+        if self.chk_opengl.isChecked():
+            self.set_opengl(True)
+
+    def set_opengl(self, enabled):
+        """切换全部曲线的 OpenGL 绘制"""
+        enabled = enabled and opengl_available()
+        for plot in [tile.plot for tile in self.tiles] + [self.plot_overlay]:
+            plot.useOpenGL(enabled)
+
+    def set_overlay(self, enabled):
+        self.plot_overlay.setVisible(enabled)
+        self._overlay_versions = [-1] * len(self.tiles)
+
+    def start(self):
+        """为每个资源启动采集线程，开始按帧刷新"""
+        resources = self._resources()
+        if not resources:
+            QMessageBox.warning(self, "警告", "请至少输入一个 VISA 资源！")
+            return
+        self.generation += 1
+        self._build_tiles(resources)
+        try:
+            self.workers = open_workers(
+                resources, self.combo_command.currentText().strip(), self.spin_interval.value(), clock.now(),
+                lambda ch, samples, gen=self.generation: self.on_samples(gen, ch, samples),
+                self.combo_schedule.currentData(), self.chk_group_trigger.isChecked(), self
+            )
+        except ConnectionError as e:
+            QMessageBox.critical(self, "连接失败", str(e))
+            return
+        for worker in self.workers:
+            worker.read_error.connect(self.lbl_status.setText)
+            clock.start_worker(worker)
+        self.frame_count = 0
+        self.frame_time = 0.0
+        self.timer.start(FRAME_INTERVAL_MS)
+        self.btn_start.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.lbl_status.setText(f"采集 {len(resources)} 台仪表")
+
+    def on_samples(self, generation, channel, samples):
+        """样本只写入磁贴缓冲，绘制留给帧定时器"""
+        if generation == self.generation and channel < len(self.tiles):
+            self.tiles[channel].append(samples)
+
+    def render_frame(self):
+        """共享帧：刷新有新数据的可见磁贴与叠加总图"""
+        if self.isMinimized() or not self.isVisible():
+            return
+        begin = time.perf_counter()
+        drawn = sum(tile.refresh() for tile in self.tiles)
+        if self.plot_overlay.isVisible():
+            for i, (tile, curve) in enumerate(zip(self.tiles, self.overlay_curves)):
+                if tile.version != self._overlay_versions[i]:
+                    self._overlay_versions[i] = tile.version
+                    curve.setData(*tile.data())
+        self.frame_time += time.perf_counter() - begin
+        self.frame_count += 1
+        if self.frame_count * FRAME_INTERVAL_MS >= 1000:
+            per_frame = self.frame_time / self.frame_count
+            self.lbl_frame.setText(f"每帧 {per_frame * 1000:.1f} ms（刷新 {drawn}/{len(self.tiles)} 个磁贴）")
+            self.frame_count = 0
+            self.frame_time = 0.0
+
+    def stop(self):
+        """停止全部采集线程"""
+        self.timer.stop()
+        close_workers(self.workers)
+        self.workers = []
+        self.btn_start.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.stop()
+        event.accept()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+变化点与异常检测
+作为采集线程的处理阶段逐点运行，每个样本 O(1) 时间与内存：
+    - Page-Hinkley 检验（双侧）检测均值阶跃与漂移起点，事件时间为累计统计量开始偏离的时刻
+    - 滑动窗口 z 分数检测离群点，窗口均值与方差按 Welford 公式增量加入 / 移出
+检测到均值变化后两个检测器都从新的电平重新学习。
+"""
+
+import collections
+import math
+
+import numpy as np
+
+
+# 检测事件：kind 为 'shift_up' / 'shift_down'（均值变化）或 'outlier'（离群点）
+DetectionEvent = collections.namedtuple('DetectionEvent', 't value kind message')
+
+DETECTION_KINDS = {
+    'shift_up': "均值上移",
+    'shift_down': "均值下移",
+    'outlier': "离群点",
+}
+
+# 导出列中各事件的编码（0 为无事件）
+DETECTION_CODES = {'shift_up': 1, 'shift_down': -1, 'outlier': 2}
+
+
+class PageHinkley:
+    """
+    双侧 Page-Hinkley 检验
+
+    Args:
+        delta: 允许的均值波动 (W)，小于此幅度的变化不累计
+        threshold: 报警阈值 λ (W·样本)，越大误报越少、检测延迟越长
+        min_samples: 重新学习电平时至少需要的样本数
+    """
+
+    def __init__(self, delta=0.5, threshold=50.0, min_samples=30):
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._up = 0.0          # 上移累计量 m_T - min(m_t)
+        self._down = 0.0
+        self._up_start = None   # 累计量从 0 开始增长的时刻（变化点估计）
+        self._down_start = None
+
+    def update(self, t, value):
+        """加入一个样本，检测到变化时返回 (kind, 变化起点时刻)"""
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        # 累计量只记录相对最小值的增量，等价于 m_T - min m_t，无需保存历史
+        self._up = max(0.0, self._up + value - self.mean - self.delta)
+        self._down = max(0.0, self._down + self.mean - value - self.delta)
+        if self._up == 0.0:
+            self._up_start = None
+        elif self._up_start is None:
+            self._up_start = t
+        if self._down == 0.0:
+            self._down_start = None
+        elif self._down_start is None:
+            self._down_start = t
+
+        if self.count < self.min_samples:
+            return None
+        if self._up > self.threshold:
+            return 'shift_up', self._up_start
+        if self._down > self.threshold:
+            return 'shift_down', self._down_start
+        return None
+
+
+class RollingZScore:
+    """
+    滑动窗口 z 分数离群检测：|x - 均值| > z_threshold × 标准差 时判为离群，
+    窗口统计在判定之后才加入当前样本；连续的离群点只报告第一个
+    """
+
+    def __init__(self, window=200, z_threshold=6.0):
+        self.window = max(int(window), 2)
+        self.z_threshold = z_threshold
+        self.reset()
+
+    def reset(self):
+        self._values = collections.deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._in_outlier = False
+
+    @property
+    def std(self):
+        n = len(self._values)
+        return math.sqrt(max(self._m2, 0.0) / (n - 1)) if n > 1 else 0.0
+
+    def update(self, value):
+        """返回 z 分数（窗口未满时为 None）与是否为新的离群段起点"""
+        z = None
+        if len(self._values) >= self.window:
+            std = self.std
+            z = abs(value - self.mean) / std if std > 0 else (0.0 if value == self.mean else math.inf)
+        outlier = z is not None and z > self.z_threshold
+        new_outlier = outlier and not self._in_outlier
+        self._in_outlier = outlier
+        self._add(value)
+        return z, new_outlier
+
+    def _add(self, value):
+        self._values.append(value)
+        n = len(self._values)
+        d = value - self.mean
+        self.mean += d / n
+        self._m2 += d * (value - self.mean)
+        if n > self.window:
+            old = self._values.popleft()
+            n -= 1
+            d = old - self.mean
+            self.mean -= d / n
+            self._m2 -= d * (old - self.mean)
+
+
+class ChangeDetector:
+    """
+    变化点与异常检测阶段
+
+    process() 在采集线程中逐点调用，返回本样本产生的 DetectionEvent 列表
+    """
+
+    def __init__(self, delta=0.5, threshold=50.0, window=200, z_threshold=6.0, detect_outliers=True):
+        self.page_hinkley = PageHinkley(delta, threshold, min_samples=min(30, window))
+        self.outliers = RollingZScore(window, z_threshold) if detect_outliers else None
+
+    def reset(self):
+        self.page_hinkley.reset()
+        if self.outliers is not None:
+            self.outliers.reset()
+
+    def process(self, t, value):
+        events = []
+        if self.outliers is not None:
+            z, new_outlier = self.outliers.update(value)
+            if new_outlier:
+                events.append(DetectionEvent(t, value, 'outlier', f"离群点 {value:.3f} W (z={z:.1f})"))
+
+        level = self.page_hinkley.mean
+        change = self.page_hinkley.update(t, value)
+        if change is not None:
+            kind, onset = change
+            events.append(DetectionEvent(
+                onset, value, kind,
+                f"{DETECTION_KINDS[kind]}: {level:.3f} → {value:.3f} W (t={onset:.3f} s 起，{t - onset:.3f} s 后检出)"
+            ))
+            # 从新电平重新学习
+            self.reset()
+        return events
+
+
+def detection_column(times, events):
+    """
+    导出用事件列：每个事件标记在其时刻所在（之后第一个）样本行，编码见 DETECTION_CODES
+
+    Returns:
+        与 times 等长的 float64 数组（无事件为 0）
+    """
+    times = np.asarray(times, dtype=np.float64)
+    column = np.zeros(len(times))
+    if len(times) == 0:
+        return column
+    for event in events:
+        i = min(int(np.searchsorted(times, event.t, side='left')), len(times) - 1)
+        column[i] = DETECTION_CODES[event.kind]
+    return column
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仪器驱动注册表
+按 *IDN? 回复匹配功率计型号，每个驱动声明：
+    - 支持的采集方式（由快到慢：二进制块 / 数组读取 / 单次查询）
+    - 最高采样率与连接后需下发的设置命令（合并为复合消息）
+    - 静态查询（标识、量程等），缓存回复，不再重复查询仪器
+
+开始采集时按声明顺序逐个试读，选出实际可用的最快方式；固件不支持的方式自动跳过。
+"""
+
+import copy
+import re
+
+from profiles import batch_commands
+
+
+STRATEGY_BINARY = 'binary'
+STRATEGY_ARRAY = 'array'
+STRATEGY_SINGLE = 'single'
+
+STRATEGY_LABELS = {
+    STRATEGY_BINARY: "二进制块",
+    STRATEGY_ARRAY: "数组读取",
+    STRATEGY_SINGLE: "单次查询",
+}
+
+
+class SingleQuery:
+    """每次往返查询一个功率值"""
+
+    kind = STRATEGY_SINGLE
+    poll_interval = 0.0
+
+    def __init__(self, command):
+        self.command = command
+        self.sample_period = 0.0
+        self.last_t = None
+
+    def configure(self, instrument, interval):
+        """按采样周期 interval (s) 设置仪器"""
+
+    def read(self, instrument):
+        """返回本次读到的功率值列表（按时间顺序）"""
+        return [float(instrument.query(self.command).strip())]
+
+    def timestamps(self, count, t):
+        """
+        一批读数的时间：最后一个读数记为读取完成时刻 t，其余按仪器采样周期向前倒推，
+        并接在上一批之后，保证时间单调
+        """
+        period = self.sample_period
+        first = t - (count - 1) * period
+        if self.last_t is not None and count > 1:
+            first = max(first, self.last_t + period)
+        times = [first + i * period for i in range(count)]
+        if times:
+            self.last_t = times[-1]
+        return times
+
+    def describe(self):
+        return f"{STRATEGY_LABELS[self.kind]} {self.command}"
+
+
+class ArrayFetch(SingleQuery):
+    """
+    仪器按设定采样率自行测量并缓存读数，每次读取取走上次以来的全部读数（逗号分隔 ASCII）；
+    采样率不再受每次往返的延迟限制，轮询间隔不低于 poll_interval
+    """
+
+    kind = STRATEGY_ARRAY
+
+    def __init__(self, command, rate_command=None, setup=(), poll_interval=0.05):
+        super().__init__(command)
+        self.rate_command = rate_command
+        self.setup = list(setup)
+        self.poll_interval = poll_interval
+
+    def configure(self, instrument, interval):
+        self.sample_period = interval
+        commands = list(self.setup)
+        if self.rate_command:
+            commands.append(self.rate_command.format(rate=1.0 / interval))
+        for message, _ in batch_commands(commands):
+            instrument.write(message)
+
+    def read(self, instrument):
+        reply = instrument.query(self.command).strip()
+        return [float(part) for part in reply.split(',')] if reply else []
+
+
+class BinaryFetch(ArrayFetch):
+    """同 ArrayFetch，读数以 IEEE 488.2 定长块（二进制浮点）传输，省去文本格式化与解析"""
+
+    kind = STRATEGY_BINARY
+
+    def __init__(self, command, rate_command=None, setup=(), poll_interval=0.05,
+                 datatype='d', big_endian=False):
+        super().__init__(command, rate_command, setup, poll_interval)
+        self.datatype = datatype
+        self.big_endian = big_endian
+
+    def read(self, instrument):
+        return list(instrument.query_binary_values(
+            self.command, datatype=self.datatype, is_big_endian=self.big_endian, container=list
+        ))
+
+
+class Driver:
+    """
+    功率计驱动
+
+    Args:
+        name: 显示名称
+        idn_pattern: 匹配 *IDN? 回复的正则（不区分大小写）
+        power_command: 单次查询功率的命令
+        strategies: 比单次查询更快的采集方式，由快到慢（单次查询 power_command 总是最后的后备）
+        max_rate: 最高采样率 (Sa/s)
+        setup_commands: 连接后下发的设置命令
+        static_queries: 回复在设置不变时保持不变的查询（缓存）
+        trigger_fetch: 支持 GPIB 组触发 (GET) 时，触发后读取该次测量值的命令
+    """
+
+    def __init__(self, name, idn_pattern, power_command, strategies=(), max_rate=10.0,
+                 setup_commands=(), static_queries=(), trigger_fetch=None):
+        self.name = name
+        self.idn_pattern = re.compile(idn_pattern, re.IGNORECASE)
+        self.power_command = power_command
+        self.strategies = list(strategies) + [SingleQuery(power_command)]
+        self.max_rate = float(max_rate)
+        self.setup_commands = list(setup_commands)
+        self.static_queries = ['*IDN?'] + list(static_queries)
+        self.trigger_fetch = trigger_fetch
+
+    def matches(self, idn):
+        return self.idn_pattern.search(idn) is not None
+
+    @property
+    def min_interval_ms(self):
+        """最高采样率对应的最小采样间隔"""
+        return max(1, int(round(1000.0 / self.max_rate)))
+
+    def setup(self, instrument):
+        """下发设置命令（合并为复合消息）"""
+        for message, _ in batch_commands(self.setup_commands):
+            instrument.write(message)
+
+    def select_strategy(self, instrument, interval):
+        """
+        按声明顺序配置并试读，返回第一个可用的采集方式（副本，可同时用于多台同型号仪器）
+
+        Args:
+            interval: 期望采样周期 (s)，不低于 1 / max_rate
+        """
+        interval = max(interval, 1.0 / self.max_rate)
+        for prototype in self.strategies:
+            strategy = copy.copy(prototype)
+            try:
+                strategy.configure(instrument, interval)
+                strategy.read(instrument)
+            except Exception:
+                continue
+            return strategy
+        return strategy
+
+
+# 通用 SCPI：未匹配到型号时按界面上填写的查询命令单次查询
+GENERIC_DRIVER = Driver("通用 SCPI", r'.', 'MEAS:POW?', max_rate=100)
+
+_DRIVERS = []
+
+
+def register_driver(driver):
+    """注册驱动；后注册的优先匹配"""
+    _DRIVERS.insert(0, driver)
+    return driver
+
+
+def registered_drivers():
+    return list(_DRIVERS)
+
+
+def find_driver(idn):
+    """按 *IDN? 回复查找驱动，未匹配时返回 GENERIC_DRIVER"""
+    return next((d for d in _DRIVERS if d.matches(idn)), GENERIC_DRIVER)
+
+
+def _normalize(command):
+    return command.strip().upper().lstrip(':')
+
+
+class CachedInstrument:
+    """
+    仪器代理：驱动声明的静态查询只向仪器查询一次，之后直接返回缓存的回复；
+    写入命令可能改变设置（如量程），因此清空缓存。其余属性与方法原样转发。
+    """
+
+    def __init__(self, instrument, static_queries):
+        self.__dict__['instrument'] = instrument
+        self.__dict__['_static'] = {_normalize(q) for q in static_queries}
+        self.__dict__['_cache'] = {}
+
+    def query(self, command):
+        key = _normalize(command)
+        if key in self._static:
+            if key not in self._cache:
+                self._cache[key] = self.instrument.query(command)
+            return self._cache[key]
+        if not key.endswith('?'):
+            self._cache.clear()
+        return self.instrument.query(command)
+
+    def write(self, command):
+        self._cache.clear()
+        return self.instrument.write(command)
+
+    def __getattr__(self, name):
+        return getattr(self.instrument, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.instrument, name, value)
+
+
+def connect_driver(instrument):
+    """
+    识别型号并下发设置命令
+
+    Returns:
+        (driver, cached_instrument)
+    """
+    cached = CachedInstrument(instrument, ['*IDN?'])
+    driver = find_driver(cached.query('*IDN?').strip())
+    cached._static.update(_normalize(q) for q in driver.static_queries)
+    driver.setup(cached)
+    return driver, cached
+
+
+def acquisition_strategy(driver, instrument, command, interval_ms):
+    """
+    选择采集方式：界面填写的命令与驱动的功率命令相同时自动选择最快方式，
+    否则（手动指定了其他命令或型号未识别）按填写的命令单次查询
+    """
+    if driver is GENERIC_DRIVER or _normalize(command) != _normalize(driver.power_command):
+        return SingleQuery(command)
+    return driver.select_strategy(instrument, interval_ms / 1000.0)
+
+
+# 常见功率计型号（命令见 docs/protocol.md）
+register_driver(Driver(
+    "Fluke", r'FLUKE', 'MEAS:POW?', max_rate=10,
+))
+register_driver(Driver(
+    "Chroma", r'CHROMA', ':MEAS:POW?', max_rate=20,
+    setup_commands=['*CLS'],
+    static_queries=[':CONF:VOLT:RANG?', ':CONF:CURR:RANG?'],
+))
+register_driver(Driver(
+    "Keithley", r'KEITHLEY', 'MEASure:POWer?', max_rate=1000,
+    strategies=[
+        # 读取缓冲区后在同一条复合消息中清空，下次只取新读数
+        BinaryFetch(':TRAC:DATA?;:TRAC:CLE', ':SENS:RATE {rate:g}', [':FORM:BORD SWAP', ':FORM:DATA REAL,64']),
+        ArrayFetch(':TRAC:DATA?;:TRAC:CLE', ':SENS:RATE {rate:g}', [':FORM:DATA ASC']),
+    ],
+    setup_commands=['*CLS'],
+    static_queries=[':SENS:VOLT:RANG?', ':SENS:CURR:RANG?'],
+    trigger_fetch=':FETC?',
+))
+register_driver(Driver(
+    "YOKOGAWA WT", r'YOKOGAWA.*WT', 'MEAS:POW?', max_rate=20,
+    strategies=[
+        # 数值数据以 4 字节大端浮点输出，只取功率一项
+        BinaryFetch(':NUM:NORM:VAL?', setup=[':NUM:FORM FLO', ':NUM:NORM:NUMB 1', ':NUM:NORM:ITEM1 P,1'],
+                    poll_interval=0.0, datatype='f', big_endian=True),
+    ],
+    static_queries=[':INP:VOLT:RANG?', ':INP:CURR:RANG?'],
+))
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+能量积分
+按真实时间戳做梯形积分（W·s → Wh），每样本 O(1)；
+超过间隔阈值的数据缺口和重新连接不跨越积分，
+同时按整点小时和用户标记的区段分别累计
+"""
+
+import collections
+import math
+
+
+JOULES_PER_WH = 3600.0
+
+# 标记区段：名称、起止时间 (s)、能量 (Wh)
+EnergySegment = collections.namedtuple('EnergySegment', 'name start end energy_wh')
+
+
+class EnergyIntegrator:
+    """梯形积分能量累加器"""
+
+    def __init__(self, max_gap=5.0, interval=3600.0, max_intervals=24 * 366):
+        """
+        Args:
+            max_gap: 相邻样本间隔超过该值 (s) 视为数据缺口，不积分
+            interval: 分段统计的区间长度 (s)，默认 1 小时
+            max_intervals: 保留的区间数（超出后丢弃最旧的）
+        """
+        self.max_gap = max_gap
+        self.interval = interval
+        self.max_intervals = max_intervals
+        self.reset()
+
+    def reset(self):
+        """清空全部累计"""
+        self.total_j = 0.0
+        self.covered_time = 0.0     # 参与积分的时间 (s)
+        self.gap_time = 0.0         # 因缺口未积分的时间 (s)
+        self.gap_count = 0
+        self.intervals = collections.OrderedDict()   # 区间起点 -> 焦耳
+        self.segments = []
+        self._open_segment = None   # [name, start, joules]
+        self._prev = None
+
+    def break_segment(self):
+        """断开积分（停止测量、重新连接时调用），下一个样本重新起算"""
+        self._prev = None
+
+    def add(self, t, power):
+        """加入一个样本"""
+        prev = self._prev
+        self._prev = (t, power)
+        if prev is None:
+            return
+        t0, p0 = prev
+        dt = t - t0
+        if dt <= 0:
+            return
+        if dt > self.max_gap:
+            self.gap_time += dt
+            self.gap_count += 1
+            return
+
+        joules = 0.5 * (p0 + power) * dt
+        self.total_j += joules
+        self.covered_time += dt
+        if self._open_segment is not None:
+            self._open_segment[2] += joules
+
+        # 分区间累计：跨越区间边界时按线性插值拆分梯形
+        k0 = math.floor(t0 / self.interval)
+        k1 = math.floor(t / self.interval)
+        if k0 == k1:
+            self._add_interval(k0, joules)
+        else:
+            self._split_intervals(t0, p0, t, power)
+
+    def _split_intervals(self, t0, p0, t1, p1):
+        slope = (p1 - p0) / (t1 - t0)
+        start = t0
+        while start < t1:
+            k = math.floor(start / self.interval)
+            end = min((k + 1) * self.interval, t1)
+            pa = p0 + slope * (start - t0)
+            pb = p0 + slope * (end - t0)
+            self._add_interval(k, 0.5 * (pa + pb) * (end - start))
+            start = end
+
+    def _add_interval(self, k, joules):
+        key = k * self.interval
+        if key in self.intervals:
+            self.intervals[key] += joules
+            return
+        self.intervals[key] = joules
+        if len(self.intervals) > self.max_intervals:
+            self.intervals.popitem(last=False)
+
+    @property
+    def total_wh(self):
+        """全程能量 (Wh)"""
+        return self.total_j / JOULES_PER_WH
+
+    @property
+    def average_power(self):
+        """按积分时间计算的平均功率 (W)"""
+        return self.total_j / self.covered_time if self.covered_time > 0 else 0.0
+
+    def interval_wh(self):
+        """各区间能量 [(区间起点 s, Wh), ...]"""
+        return [(start, j / JOULES_PER_WH) for start, j in self.intervals.items()]
+
+    def current_interval_wh(self):
+        """最近一个区间的能量 (Wh)"""
+        if not self.intervals:
+            return 0.0
+        return next(reversed(self.intervals.values())) / JOULES_PER_WH
+
+    def begin_mark(self, name, t):
+        """开始一个标记区段（已有未结束的区段会先结束）"""
+        if self._open_segment is not None:
+            self.end_mark(t)
+        self._open_segment = [name, t, 0.0]
+
+    def end_mark(self, t):
+        """结束当前标记区段，返回 EnergySegment；没有区段时返回 None"""
+        if self._open_segment is None:
+            return None
+        name, start, joules = self._open_segment
+        self._open_segment = None
+        segment = EnergySegment(name, start, t, joules / JOULES_PER_WH)
+        self.segments.append(segment)
+        return segment
+
+    @property
+    def marking(self):
+        """是否正在标记区段"""
+        return self._open_segment is not None
+
+    def summary(self):
+        """导出用摘要 dict"""
+        return {
+            'energy_wh': round(self.total_wh, 6),
+            'energy_avg_power_w': round(self.average_power, 6),
+            'energy_gap_s': round(self.gap_time, 3),
+            'energy_intervals_wh': [(start, round(wh, 6)) for start, wh in self.interval_wh()],
+            'energy_segments': [
+                {'name': s.name, 'start': s.start, 'end': s.end, 'energy_wh': round(s.energy_wh, 6)}
+                for s in self.segments
+            ],
+        }
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据导出后端
+CSV 文本之外，支持 Parquet / Arrow IPC（pyarrow）与 HDF5（h5py）/ NPZ（numpy）列式格式
+以及长期归档用的压缩格式 .pmarc（见 archive.py），
+时间戳与功率列以 numpy 数组分块批量写入，设备信息等元数据写入文件本身
+"""
+
+import json
+
+import numpy as np
+
+import archive
+from compression import compress
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import h5py
+    HAS_H5PY = True
+except ImportError:
+    HAS_H5PY = False
+
+
+# 每块写入的行数
+CHUNK_ROWS = 65536
+
+# 列式格式的列名（与 CSV 表头一一对应）
+COLUMNS = ('time_s', 'power_w', 'avg_w', 'rms_w')
+CSV_HEADER = "Time(s),Power(W),Avg(W),RMS(W)\n"
+CSV_COMMENT = '#'
+
+# 附加列不能使用的列名：基本列，以及 NPZ 中保存元数据的项
+RESERVED_NAMES = COLUMNS + ('metadata',)
+
+
+def column_name(name, taken=()):
+    """附加列名与保留名或 taken 中的列名冲突时依次加后缀 _1、_2…"""
+    candidate = name
+    i = 1
+    while candidate in RESERVED_NAMES or candidate in taken:
+        candidate = f"{name}_{i}"
+        i += 1
+    return candidate
+
+
+def compute_columns(times, values, extra=None):
+    """
+    计算导出列：时间、功率、累计平均值、累计 RMS，之后依次为 extra 中的附加列（派生通道等），
+    与基本列或保留名冲突的附加列名按 column_name() 加后缀，不会覆盖数据
+
+    Returns:
+        dict: 列名 -> float64 数组（按列顺序）
+    """
+    t = np.asarray(times, dtype=np.float64)
+    p = np.asarray(values, dtype=np.float64)
+    n = np.arange(1, len(p) + 1, dtype=np.float64)
+    avg = np.cumsum(p) / n
+    rms = np.sqrt(np.cumsum(p * p) / n)
+    columns = dict(zip(COLUMNS, (t, p, avg, rms)))
+    for name, column in (extra or {}).items():
+        columns[column_name(name, columns)] = np.asarray(column, dtype=np.float64)
+    return columns
+
+
+def _chunks(length):
+    """按 CHUNK_ROWS 切分的 (start, stop) 序列"""
+    for start in range(0, length, CHUNK_ROWS):
+        yield start, min(start + CHUNK_ROWS, length)
+
+
+def write_csv(filename, columns, metadata):
+    """
+    CSV 文本：表头与数据行保持原有格式，附加列接在原有四列之后；
+    元数据（分位数、能量摘要等）写在表头之前的 # 注释行，每行 "# 键: JSON 值"（见 read_csv_metadata）
+    """
+    extra = [name for name in columns if name not in COLUMNS]
+    table = np.column_stack([columns[name] for name in COLUMNS + tuple(extra)])
+    fmt = ('%.3f', '%.4f', '%.4f', '%.4f') + ('%.6f',) * len(extra)
+    with open(filename, 'w', encoding='utf-8') as f:
+        for key, value in metadata.items():
+            f.write(f"{CSV_COMMENT} {key}: {json.dumps(value, ensure_ascii=False)}\n")
+        f.write(CSV_HEADER if not extra else CSV_HEADER.rstrip('\n') + ''.join(',' + name for name in extra) + '\n')
+        for start, stop in _chunks(len(table)):
+            np.savetxt(f, table[start:stop], fmt=fmt, delimiter=',')
+
+
+def read_csv_metadata(filename):
+    """读取 CSV 表头之前 # 注释行中的元数据 dict"""
+    metadata = {}
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            if not line.startswith(CSV_COMMENT):
+                break
+            key, _, value = line[len(CSV_COMMENT):].partition(':')
+            metadata[key.strip()] = json.loads(value)
+    return metadata
+
+
+def _flat_metadata(metadata):
+    """标量元数据原样保留，列表/字典等序列化为 JSON 字符串"""
+    flat = {}
+    for key, value in metadata.items():
+        if isinstance(value, (str, int, float, bool)):
+            flat[key] = value
+        else:
+            flat[key] = json.dumps(value, ensure_ascii=False)
+    return flat
+
+
+def _arrow_schema(columns, metadata):
+    """带元数据的 Arrow schema"""
+    fields = [pa.field(name, pa.float64()) for name in columns]
+    return pa.schema(fields, metadata={k: str(v) for k, v in _flat_metadata(metadata).items()})
+
+
+def _arrow_batches(columns, schema):
+    """分块生成 RecordBatch"""
+    for start, stop in _chunks(len(columns[COLUMNS[0]])):
+        arrays = [pa.array(column[start:stop]) for column in columns.values()]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(filename, columns, metadata):
+    """Parquet（每块一个 row group）"""
+    schema = _arrow_schema(columns, metadata)
+    with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+        for batch in _arrow_batches(columns, schema):
+            writer.write_batch(batch)
+
+
+def write_arrow(filename, columns, metadata):
+    """Arrow IPC 文件（Feather v2）"""
+    schema = _arrow_schema(columns, metadata)
+    with pa.OSFile(filename, 'wb') as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            for batch in _arrow_batches(columns, schema):
+                writer.write_batch(batch)
+
+
+def write_hdf5(filename, columns, metadata):
+    """HDF5：每列一个可扩展的分块数据集，元数据写入文件属性"""
+    length = len(columns[COLUMNS[0]])
+    with h5py.File(filename, 'w') as f:
+        for key, value in _flat_metadata(metadata).items():
+            f.attrs[key] = value
+        for name in columns:
+            dset = f.create_dataset(
+                name, shape=(length,), maxshape=(None,), dtype='f8',
+                chunks=(min(CHUNK_ROWS, max(length, 1)),), compression='gzip'
+            )
+            for start, stop in _chunks(length):
+                dset[start:stop] = columns[name][start:stop]
+
+
+def write_npz(filename, columns, metadata):
+    """
+    NPZ：每列一个数组，元数据以 JSON 字符串保存在 metadata 项
+
+    NPZ 每列只能作为一个完整数组写入 zip 成员，不像 Parquet / HDF5 那样分块；
+    导出列本身已全部在内存中（见 compute_columns），np.savez_compressed 逐列分段压缩写入，额外内存不大；
+    超出内存的数据量请使用 Parquet / HDF5 / .pmarc
+    """
+    np.savez_compressed(filename, metadata=np.array(json.dumps(metadata, ensure_ascii=False)), **columns)
+
+
+def write_pmarc(filename, columns, metadata):
+    """压缩归档：只保存时间与功率列（平均值/RMS 读取时可重新计算，附加列不写入）"""
+    archive.write_archive(filename, columns['time_s'], columns['power_w'], metadata)
+
+
+# 导出格式注册表：键 -> (显示名称, 文件过滤器, 写入函数, 是否可用)
+EXPORT_FORMATS = {
+    'csv': ("CSV", "CSV 文件 (*.csv)", write_csv, True),
+    'parquet': ("Parquet", "Parquet 文件 (*.parquet)", write_parquet, HAS_PYARROW),
+    'arrow': ("Arrow IPC", "Arrow 文件 (*.arrow)", write_arrow, HAS_PYARROW),
+    'hdf5': ("HDF5", "HDF5 文件 (*.h5)", write_hdf5, HAS_H5PY),
+    'npz': ("NPZ", "NumPy 文件 (*.npz)", write_npz, True),
+    'pmarc': ("压缩归档", "PM-Monitor 归档 (*.pmarc)", write_pmarc, True),
+}
+
+# 各格式默认扩展名
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow', 'hdf5': '.h5', 'npz': '.npz', 'pmarc': '.pmarc'}
+
+
+def available_formats():
+    """返回当前环境可用的格式键列表"""
+    return [key for key, (_, _, _, ok) in EXPORT_FORMATS.items() if ok]
+
+
+def export(filename, fmt, times, values, metadata, extra=None, compression=None):
+    """
+    按指定格式导出
+
+    Args:
+        filename: 目标文件
+        fmt: 格式键（见 EXPORT_FORMATS）
+        times: 时间戳序列 (s)
+        values: 功率序列 (W)
+        metadata: 元数据 dict（IDN、命令、采样间隔等）
+        extra: 附加列 dict（列名 -> 与 times 等长的数组），如派生通道
+        compression: (压缩方式, 容差 W)，见 compression.py；平均值/RMS 与附加列按完整数据计算后取保存点所在行，
+            功率列为保存的数值，压缩方式与压缩比写入元数据
+
+    Returns:
+        int: 写入的行数
+    """
+    label, _, writer, ok = EXPORT_FORMATS[fmt]
+    if not ok:
+        raise RuntimeError(f"{label} 导出需要额外依赖（pyarrow / h5py）")
+    columns = compute_columns(times, values, extra)
+    if compression is not None:
+        method, tolerance = compression
+        indices, kept = compress(columns['time_s'], columns['power_w'], method, tolerance)
+        metadata = dict(metadata, compression=method, compression_tolerance_w=tolerance,
+                        compression_ratio=round(len(columns['time_s']) / max(len(indices), 1), 2))
+        columns = {name: column[indices] for name, column in columns.items()}
+        columns['power_w'] = kept
+    writer(filename, columns, metadata)
+    return len(columns[COLUMNS[0]])
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+派生通道表达式
+每行定义一个派生通道，如：
+    效率 = A / B
+    P_cal = P * 0.98
+    P_1s = mean(P, 1.0)
+    P_ema = ema(P, 5)
+
+表达式只解析一次（Python 语法子集，不执行任意代码），编译为作用在整批 numpy 数组上的运算；
+ema / mean 等有状态运算在批次之间保留状态，逐批计算与一次性计算整段数据结果相同。
+"""
+
+import ast
+import threading
+
+import numpy as np
+
+
+# 有状态运算的数值稳定性：单段累计衰减上限（自然对数）
+_EMA_SEGMENT_DECAY = 50.0
+
+# evaluate_all 使用的编译结果缓存（每个线程一份，节点带有状态，不能跨线程共用）
+_CACHE_SIZE = 64
+_cache = threading.local()
+
+
+class ExpressionError(ValueError):
+    """表达式语法或引用错误"""
+
+
+class _Node:
+    """编译后的表达式节点"""
+
+    def evaluate(self, env, times):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+class _Constant(_Node):
+    def __init__(self, value):
+        self.value = float(value)
+
+    def evaluate(self, env, times):
+        return np.full(len(times), self.value)
+
+
+class _Channel(_Node):
+    def __init__(self, name):
+        self.name = name
+
+    def evaluate(self, env, times):
+        if self.name == 't':
+            return times
+        return env[self.name]
+
+
+class _Apply(_Node):
+    """无状态的逐元素运算"""
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def evaluate(self, env, times):
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return self.func(*[arg.evaluate(env, times) for arg in self.args])
+
+    def reset(self):
+        for arg in self.args:
+            arg.reset()
+
+
+class _Ema(_Node):
+    """
+    按时间常数 tau (s) 的指数滑动平均，采样不均匀时按实际间隔计算衰减：
+    y[i] = a[i] * y[i-1] + (1 - a[i]) * x[i]，a[i] = exp(-dt[i] / tau)
+    用累积乘积的闭式解向量化；累计衰减过大时分段计算以免下溢，
+    单个间隔远大于时间常数（暂停后继续、导出数据中的缺口）时旧状态已完全衰减，从该样本重新开始。
+    NaN / inf 输入（如多表对齐中通道首个样本到达之前）不参与计算，对应输出为 NaN，状态保持不变。
+    """
+
+    def __init__(self, arg, tau):
+        if tau <= 0:
+            raise ExpressionError("ema 的时间常数必须为正数")
+        self.arg = arg
+        self.tau = tau
+        self.reset()
+
+    def reset(self):
+        self.arg.reset()
+        self._last_t = None
+        self._last_y = None
+
+    def evaluate(self, env, times):
+        x = np.asarray(self.arg.evaluate(env, times), dtype=np.float64)
+        if len(x) == 0:
+            return x
+        y = np.full(len(x), np.nan)
+        valid = np.flatnonzero(np.isfinite(x))
+        if len(valid) == 0:
+            return y
+        t = times[valid]
+        xv = x[valid]
+        prev_t = t[0] if self._last_t is None else self._last_t
+        decay = np.maximum(np.diff(t, prepend=prev_t), 0.0) / self.tau    # -log(a)
+        total = np.cumsum(decay)
+        out = np.empty(len(xv))
+        y0 = xv[0] if self._last_y is None else self._last_y
+
+        start = 0
+        while start < len(xv):
+            if decay[start] > _EMA_SEGMENT_DECAY:
+                # a 下溢为 0：y = x，新的一段从这里开始
+                out[start] = y0 = xv[start]
+                start += 1
+                continue
+            base = total[start - 1] if start else 0.0
+            stop = max(start + 1, int(np.searchsorted(total, base + _EMA_SEGMENT_DECAY, side='right')))
+            p = np.exp(-(total[start:stop] - base))     # a[start] * ... * a[i]，不小于 exp(-段衰减上限)
+            w = (1.0 - np.exp(-decay[start:stop])) * xv[start:stop] / p
+            out[start:stop] = p * (y0 + np.cumsum(w))
+            y0 = out[stop - 1]
+            start = stop
+
+        y[valid] = out
+        self._last_t = t[-1]
+        self._last_y = out[-1]
+        return y
+
+
+class _WindowMean(_Node):
+    """
+    时间窗口 (t - window, t] 内的滑动平均；保留上一批窗口内的尾部样本。
+    NaN / inf 样本不计入平均，窗口内没有有效样本时输出 NaN
+    """
+
+    def __init__(self, arg, window):
+        if window <= 0:
+            raise ExpressionError("mean 的窗口长度必须为正数")
+        self.arg = arg
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.arg.reset()
+        self._tail_t = np.zeros(0)
+        self._tail_x = np.zeros(0)
+
+    def evaluate(self, env, times):
+        x = self.arg.evaluate(env, times)
+        if len(x) == 0:
+            return x
+        t = np.concatenate((self._tail_t, times))
+        v = np.concatenate((self._tail_x, x))
+        finite = np.isfinite(v)
+        cs = np.concatenate(([0.0], np.cumsum(np.where(finite, v, 0.0))))
+        cn = np.concatenate(([0], np.cumsum(finite)))
+        end = np.arange(len(self._tail_t), len(t)) + 1
+        begin = np.searchsorted(t, times - self.window, side='right')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = (cs[end] - cs[begin]) / (cn[end] - cn[begin])
+
+        keep = int(np.searchsorted(t, t[-1] - self.window, side='right'))
+        self._tail_t = t[keep:]
+        self._tail_x = v[keep:]
+        return out
+
+
+# 无状态函数：名称 -> (numpy 函数, 参数个数)
+FUNCTIONS = {
+    'abs': (np.abs, 1),
+    'sqrt': (np.sqrt, 1),
+    'log': (np.log, 1),
+    'exp': (np.exp, 1),
+    'min': (np.minimum, 2),
+    'max': (np.maximum, 2),
+    'clip': (np.clip, 3),
+}
+
+# 有状态函数：名称 -> 节点类（第二个参数必须为常数）
+STATEFUL_FUNCTIONS = {
+    'ema': _Ema,
+    'mean': _WindowMean,
+}
+
+_BINARY = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+
+def _compile(node, channels):
+    """把 Python AST 子集编译为表达式节点"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return _Constant(node.value)
+    if isinstance(node, ast.Name):
+        if node.id != 't' and node.id not in channels:
+            raise ExpressionError(f"未知通道: {node.id}（可用: {', '.join(channels)}, t）")
+        return _Channel(node.id)
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        return _Apply(_BINARY[type(node.op)], [_compile(node.left, channels), _compile(node.right, channels)])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile(node.operand, channels)
+        return _Apply(np.negative, [operand]) if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        if name in STATEFUL_FUNCTIONS:
+            if len(node.args) != 2:
+                raise ExpressionError(f"{name}() 需要 2 个参数：{name}(表达式, 秒)")
+            param = _constant_value(node.args[1], name)
+            return STATEFUL_FUNCTIONS[name](_compile(node.args[0], channels), param)
+        if name in FUNCTIONS:
+            func, nargs = FUNCTIONS[name]
+            if len(node.args) != nargs:
+                raise ExpressionError(f"{name}() 需要 {nargs} 个参数")
+            return _Apply(func, [_compile(arg, channels) for arg in node.args])
+        raise ExpressionError(f"未知函数: {name}")
+    raise ExpressionError(f"不支持的语法: {ast.dump(node)[:40]}")
+
+
+def _constant_value(node, name):
+    try:
+        return float(ast.literal_eval(node))
+    except (ValueError, TypeError):
+        raise ExpressionError(f"{name}() 的第二个参数必须是常数（秒）")
+
+
+class DerivedChannel:
+    """一个派生通道：名称 + 编译后的表达式"""
+
+    def __init__(self, name, expression, channels):
+        self.name = name
+        self.expression = expression.strip()
+        try:
+            tree = ast.parse(self.expression, mode='eval')
+        except SyntaxError as e:
+            raise ExpressionError(f"{name}: 语法错误 ({e.msg})")
+        self._root = _compile(tree.body, list(channels))
+
+    def evaluate(self, times, columns):
+        """
+        计算一批数据
+
+        Args:
+            times: 时间数组 (s)
+            columns: 通道名 -> 数组（与 times 等长）
+        """
+        times = np.asarray(times, dtype=np.float64)
+        result = self._root.evaluate(columns, times)
+        return np.broadcast_to(result, times.shape).astype(np.float64)
+
+    def reset(self):
+        """清除有状态运算的历史"""
+        self._root.reset()
+
+
+def parse_definitions(text, channels):
+    """
+    解析多行定义（每行 名称 = 表达式，# 开头为注释）
+
+    Returns:
+        [DerivedChannel, ...]
+    """
+    derived = []
+    names = set(channels)
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if '=' not in line:
+            raise ExpressionError(f"第 {lineno} 行缺少 '='：{line}")
+        name, expression = (part.strip() for part in line.split('=', 1))
+        if not name:
+            raise ExpressionError(f"第 {lineno} 行缺少通道名")
+        if name in names:
+            raise ExpressionError(f"第 {lineno} 行：通道名 {name} 重复")
+        derived.append(DerivedChannel(name, expression, channels))
+        names.add(name)
+    return derived
+
+
+def _compiled(name, expression, channels):
+    """按 (名称, 表达式, 通道) 缓存的编译结果，已清除状态"""
+    cache = getattr(_cache, 'channels', None)
+    if cache is None:
+        cache = _cache.channels = {}
+    key = (name, expression, tuple(channels))
+    channel = cache.get(key)
+    if channel is None:
+        if len(cache) >= _CACHE_SIZE:
+            cache.clear()
+        channel = cache[key] = DerivedChannel(name, expression, channels)
+    else:
+        channel.reset()
+    return channel
+
+
+def evaluate_all(derived, times, columns):
+    """
+    对整段数据从头计算全部派生通道（不影响实时计算的状态），返回 名称 -> 数组；
+    编译结果按表达式文本缓存，每帧调用时不再重新解析
+    """
+    results = {}
+    for channel in derived:
+        fresh = _compiled(channel.name, channel.expression, list(columns))
+        results[channel.name] = fresh.evaluate(times, columns)
+    return results
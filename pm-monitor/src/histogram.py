@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑动窗口直方图
+固定分箱计数，样本进入 / 离开窗口时各 O(1) 更新一个计数；窗口进出由调用方与缓冲区同步驱动
+（与 quantiles.SlidingQuantiles 相同）。
+分箱范围只在数值分布明显变化时重建：超出范围的样本比例过高，或样本只占范围的一小部分；
+重建按当前窗口样本重新计数，其余时间不遍历样本。
+NaN / inf 读数（仪器溢出、回放缺值）不计入任何分箱，也不计入样本数。
+"""
+
+import math
+
+import numpy as np
+
+
+class SlidingHistogram:
+    """
+    Args:
+        bins: 分箱数
+        overflow_fraction: 超出范围的样本占比超过此值时重建
+        shrink_fraction: 有样本的分箱跨度小于范围的此比例时重建（分布变窄）
+        padding: 重建时在数据范围两侧留出的余量（占跨度比例）
+    """
+
+    def __init__(self, bins=64, overflow_fraction=0.05, shrink_fraction=0.25, padding=0.1):
+        self.bins = int(bins)
+        self.overflow_fraction = overflow_fraction
+        self.shrink_fraction = shrink_fraction
+        self.padding = padding
+        self.clear()
+
+    def clear(self):
+        """清空计数与分箱范围"""
+        self.lo = None
+        self.hi = None
+        self._scale = 0.0
+        self._fitted_bins = 0.0     # 上次重建时数据跨越的分箱数
+        self.counts = [0] * self.bins
+        self.count = 0
+        self.underflow = 0
+        self.overflow = 0
+        self.rebins = 0
+
+    def __len__(self):
+        return self.count
+
+    def _bin(self, x):
+        return int(math.floor((x - self.lo) * self._scale))
+
+    def add(self, x):
+        """样本进入窗口（非有限值忽略）"""
+        if not math.isfinite(x):
+            return
+        self.count += 1
+        if self.lo is None:
+            return
+        i = self._bin(x)
+        if i < 0:
+            self.underflow += 1
+        elif i >= self.bins:
+            self.overflow += 1
+        else:
+            self.counts[i] += 1
+
+    def remove(self, x):
+        """样本离开窗口（分箱范围与加入时相同，落在同一分箱；非有限值加入时已忽略）"""
+        if not math.isfinite(x):
+            return
+        self.count -= 1
+        if self.lo is None:
+            return
+        i = self._bin(x)
+        if i < 0:
+            self.underflow -= 1
+        elif i >= self.bins:
+            self.overflow -= 1
+        else:
+            self.counts[i] -= 1
+
+    def needs_rebin(self):
+        """
+        分布是否明显偏离当前分箱范围（O(bins)，在刷新显示时调用）
+
+        上次重建时数据本身就很窄（如恒定信号，跨度不足 shrink_fraction 个范围）时不再做变窄判断，
+        否则每次刷新都会按同样的数据重建
+        """
+        if self.count == 0:
+            return False
+        if self.lo is None:
+            return True
+        if self.underflow + self.overflow > self.overflow_fraction * self.count:
+            return True
+        if self._fitted_bins < self.shrink_fraction * self.bins:
+            return False
+        occupied = [i for i, c in enumerate(self.counts) if c]
+        if not occupied:
+            return True
+        span = occupied[-1] - occupied[0] + 1
+        return span < self.shrink_fraction * self.bins
+
+    def rebin(self, values):
+        """按窗口样本 values 重新确定范围并重新计数"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            self.clear()
+            return
+        vmin, vmax = float(values.min()), float(values.max())
+        span = vmax - vmin
+        if span <= 0:
+            span = max(abs(vmin) * 1e-3, 1e-6)
+        lo = vmin - self.padding * span
+        hi = vmax + self.padding * span
+        self.lo, self.hi = lo, hi
+        self._scale = self.bins / (hi - lo)
+        self._fitted_bins = (vmax - vmin) * self._scale
+        # 与 add() 相同的分箱计算，保证之后 remove() 落在同一分箱
+        index = np.floor((values - lo) * self._scale).astype(np.int64)
+        inside = (index >= 0) & (index < self.bins)
+        self.counts = np.bincount(index[inside], minlength=self.bins).tolist()
+        self.count = len(values)
+        self.underflow = int((index < 0).sum())
+        self.overflow = int((index >= self.bins).sum())
+        self.rebins += 1
+
+    def edges(self):
+        """分箱边界 (bins + 1 个)"""
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    @property
+    def width(self):
+        return (self.hi - self.lo) / self.bins
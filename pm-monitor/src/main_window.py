@@ -6,18 +6,44 @@ PM-Monitor 主窗口模块
 使用 NI-VISA 驱动与功率计通信
 """
 
+import collections
+import os
 import sys
-import time
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QGridLayout, QLabel, QPushButton, QComboBox, QSpinBox,
-    QGroupBox, QFrame, QMessageBox
+    QGroupBox, QFrame, QMessageBox, QCheckBox, QDialog, QListWidget,
+    QListWidgetItem, QAbstractItemView, QDoubleSpinBox, QLineEdit, QPlainTextEdit
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 
+import numpy as np
 import pyqtgraph as pg
 
+import alarms
+import archive
+import capture
+import clock
+import compression
+import detection
+import drivers
+import exporters
+import expressions
+import profiles
+import remote_agent
+import replay
+import serial_backend
+import session_db
+from acquisition import AcquisitionWorker, ProcessAcquisitionWorker, RemoteAcquisitionWorker, ReplayWorker
+from dashboard import DashboardDialog
+from energy import EnergyIntegrator
+from histogram import SlidingHistogram
+from multimeter import MultiMeterDialog
+from quantiles import DEFAULT_PERCENTILES, SlidingQuantiles, StreamingQuantiles, percentile_label
+from rollup import RollupStore
+from spectrum import SpectrumWorker
+
 try:
     import pyvisa
     HAS_PYVISA = True
@@ -32,9 +58,276 @@ except ImportError:
     HAS_MOCK = False
 
 
+class ExportThread(QThread):
+    """后台导出线程，避免大文件写入阻塞界面"""
+
+    succeeded = pyqtSignal(str, int)   # 文件名, 行数
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, fmt, times, values, metadata, derived=None, compression=None, detections=None,
+                 parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.fmt = fmt
+        self.times = times
+        self.values = values
+        self.metadata = metadata
+        self.derived = derived or []
+        self.compression = compression
+        self.detections = detections or []
+
+    def run(self):
+        try:
+            # 派生通道按整段数据从头计算，作为附加列导出；与 detection 列同名时加后缀
+            derived = expressions.evaluate_all(
+                self.derived, self.times, {PMMonitorMainWindow.DERIVED_INPUT: self.values}
+            )
+            reserved = {'detection'} if self.detections else set()
+            extra = {}
+            for name, values in derived.items():
+                extra[exporters.column_name(name, reserved | set(extra))] = values
+            if self.detections:
+                extra['detection'] = detection.detection_column(self.times, self.detections)
+            rows = exporters.export(self.filename, self.fmt, self.times, self.values, self.metadata, extra,
+                                    compression=self.compression)
+            self.succeeded.emit(self.filename, rows)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class HistoryDialog(QDialog):
+    """历史会话浏览：选择一个或多个会话叠加绘制到曲线上"""
+
+    # 叠加曲线颜色
+    COLORS = ['#795548', '#009688', '#E91E63', '#3F51B5', '#CDDC39', '#607D8B']
+
+    def __init__(self, db, plot_widget, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.plot_widget = plot_widget
+        self.curves = []
+        self.setWindowTitle("历史会话")
+        self.resize(560, 380)
+
+        layout = QVBoxLayout(self)
+        self.list_sessions = QListWidget()
+        self.list_sessions.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        layout.addWidget(self.list_sessions)
+
+        buttons = QHBoxLayout()
+        btn_plot = QPushButton("绘制所选")
+        btn_plot.clicked.connect(self.plot_selected)
+        buttons.addWidget(btn_plot)
+        btn_clear = QPushButton("清除历史曲线")
+        btn_clear.clicked.connect(self.clear_curves)
+        buttons.addWidget(btn_clear)
+        btn_archive = QPushButton("归档所选...")
+        btn_archive.clicked.connect(self.archive_selected)
+        buttons.addWidget(btn_archive)
+        btn_delete = QPushButton("删除会话")
+        btn_delete.clicked.connect(self.delete_selected)
+        buttons.addWidget(btn_delete)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.close)
+        buttons.addWidget(btn_close)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        """重新加载会话列表"""
+        import datetime
+
+        self.list_sessions.clear()
+        for item in self.db.list_sessions():
+            started = datetime.datetime.fromtimestamp(item['start_time']).strftime('%Y-%m-%d %H:%M:%S')
+            text = f"#{item['id']}  {started}  {item['resource']}  {item['idn'] or ''}  ({item['sample_count']} 点)"
+            entry = QListWidgetItem(text)
+            entry.setData(Qt.UserRole, item['id'])
+            self.list_sessions.addItem(entry)
+
+    def plot_selected(self, max_points=4000):
+        """叠加绘制所选会话（点数过多时在数据库内按桶聚合）"""
+        self.clear_curves()
+        for i, entry in enumerate(self.list_sessions.selectedItems()):
+            session_id = entry.data(Qt.UserRole)
+            t_first, t_last = self.db.time_span(session_id)
+            if t_first is None:
+                continue
+            bucket = (t_last - t_first) / max_points
+            if bucket > 0:
+                t, mean, _, _ = self.db.query_range(session_id, bucket=bucket)
+            else:
+                t, mean = self.db.query_range(session_id)
+            pen = pg.mkPen(self.COLORS[i % len(self.COLORS)], width=1)
+            self.curves.append(self.plot_widget.plot(t, mean, pen=pen, name=f"会话 #{session_id}"))
+
+    def clear_curves(self):
+        """移除历史曲线"""
+        for curve in self.curves:
+            self.plot_widget.removeItem(curve)
+        self.curves = []
+
+    def archive_selected(self):
+        """把所选会话写成压缩归档文件（每个会话一个 .pmarc）"""
+        from PyQt5.QtWidgets import QFileDialog
+
+        entries = self.list_sessions.selectedItems()
+        if not entries:
+            return
+        directory = QFileDialog.getExistingDirectory(self, "选择归档目录")
+        if not directory:
+            return
+
+        lines = []
+        try:
+            for entry in entries:
+                session_id = entry.data(Qt.UserRole)
+                path = os.path.join(directory, f"session_{session_id}.pmarc")
+                count, size = archive.archive_session(self.db, session_id, path)
+                ratio = count * 16 / size if size else 0.0
+                lines.append(f"#{session_id}: {count} 点, {size / 1024:.1f} KB (压缩比 {ratio:.1f}:1)")
+        except Exception as e:
+            QMessageBox.critical(self, "归档失败", f"归档会话时出错:\n{str(e)}")
+            return
+        QMessageBox.information(self, "归档完成", "\n".join(lines))
+
+    def delete_selected(self):
+        """删除所选会话"""
+        entries = self.list_sessions.selectedItems()
+        if not entries:
+            return
+        reply = QMessageBox.question(self, "确认", f"删除所选 {len(entries)} 个会话？")
+        if reply != QMessageBox.Yes:
+            return
+        self.clear_curves()
+        for entry in entries:
+            self.db.delete_session(entry.data(Qt.UserRole))
+        self.refresh()
+
+
+class EventListDialog(QDialog):
+    """捕获事件浏览：选择事件查看波形，逐条导出"""
+
+    def __init__(self, window, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.setWindowTitle("捕获事件")
+        self.resize(720, 480)
+
+        layout = QHBoxLayout(self)
+        self.list_events = QListWidget()
+        self.list_events.currentRowChanged.connect(self.show_event)
+        layout.addWidget(self.list_events, 1)
+
+        right = QVBoxLayout()
+        self.plot_event = pg.PlotWidget()
+        self.plot_event.setLabel('left', '功率', units='W')
+        self.plot_event.setLabel('bottom', '相对触发时间', units='s')
+        self.plot_event.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_event.setBackground('#F5F5F5')
+        self.curve_event = self.plot_event.plot(pen=pg.mkPen('#2196F3', width=2), symbol='o', symbolSize=3)
+        self.line_trigger = pg.InfiniteLine(pos=0, angle=90, pen=pg.mkPen('#F44336', style=Qt.DashLine))
+        self.plot_event.addItem(self.line_trigger)
+        right.addWidget(self.plot_event)
+
+        buttons = QHBoxLayout()
+        btn_refresh = QPushButton("刷新")
+        btn_refresh.clicked.connect(self.refresh)
+        buttons.addWidget(btn_refresh)
+        btn_export = QPushButton("导出所选事件")
+        btn_export.clicked.connect(self.export_selected)
+        buttons.addWidget(btn_export)
+        btn_close = QPushButton("关闭")
+        btn_close.clicked.connect(self.close)
+        buttons.addWidget(btn_close)
+        right.addLayout(buttons)
+        layout.addLayout(right, 2)
+
+        self.refresh()
+
+    def refresh(self):
+        """重新加载事件列表"""
+        self.events = list(self.window.capture_events)
+        self.list_events.clear()
+        for event in self.events:
+            peak = float(event.values.max())
+            self.list_events.addItem(
+                f"#{event.index}  t={event.trigger_time:.3f} s  "
+                f"{capture.TRIGGER_MODES[event.mode]} {event.level:g}  峰值 {peak:.2f} W"
+            )
+        if self.events:
+            self.list_events.setCurrentRow(len(self.events) - 1)
+
+    def show_event(self, row):
+        """绘制所选事件（横轴以触发时刻为零点）"""
+        if row < 0 or row >= len(self.events):
+            self.curve_event.setData([], [])
+            return
+        event = self.events[row]
+        self.curve_event.setData(event.times - event.trigger_time, event.values)
+        self.plot_event.setTitle(f"事件 #{event.index}（预触发 {event.pre_count} 点）")
+
+    def export_selected(self):
+        """按当前导出格式导出所选事件"""
+        row = self.list_events.currentRow()
+        if row < 0 or row >= len(self.events):
+            return
+        from PyQt5.QtWidgets import QFileDialog
+
+        event = self.events[row]
+        fmt = self.window.combo_export_format.currentData()
+        _, file_filter, _, _ = exporters.EXPORT_FORMATS[fmt]
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "导出事件", f"event_{event.index}{exporters.EXTENSIONS[fmt]}", file_filter
+        )
+        if not filename:
+            return
+        metadata = self.window.export_metadata()
+        metadata.update({
+            'event_index': event.index,
+            'trigger_time': event.trigger_time,
+            'trigger_mode': event.mode,
+            'trigger_level': event.level,
+            'pre_trigger_samples': event.pre_count,
+        })
+        try:
+            exporters.export(filename, fmt, event.times, event.values, metadata)
+            self.window.statusBar().showMessage(f"事件 #{event.index} 已导出到: {filename}")
+        except Exception as e:
+            QMessageBox.critical(self, "导出失败", f"导出事件时出错:\n{str(e)}")
+
+
 class PMMonitorMainWindow(QMainWindow):
     """功率监测主窗口"""
 
+    # 频谱重算节流：至少新增的样本数与最小间隔 (s)
+    SPECTRUM_MIN_NEW_SAMPLES = 32
+    SPECTRUM_MIN_INTERVAL = 0.5
+    # 连接远程采集代理时回放的历史 (s)
+    REMOTE_HISTORY_SECONDS = 60.0
+    # 派生通道表达式中测量通道的名称
+    DERIVED_INPUT = 'P'
+    DERIVED_COLORS = ['#9C27B0', '#009688', '#795548', '#E91E63', '#3F51B5']
+    # 变化检测标记 (符号, 颜色) 与曲线上最多显示的标记数
+    DETECTION_SYMBOLS = {
+        'shift_up': ('t1', '#E91E63'),
+        'shift_down': ('t', '#3F51B5'),
+        'outlier': ('x', '#FF9800'),
+    }
+    MAX_DETECTION_MARKERS = 1000
+    MAX_DETECTION_EVENTS = 10000    # 保留的检测事件数（导出只含原始层保留的数据，足够覆盖）
+
+    # 曲线显示范围 (名称, 秒)；None 表示实时窗口，0 表示全部
+    PLOT_RANGES = [
+        ("实时窗口", None),
+        ("10 分钟", 600),
+        ("1 小时", 3600),
+        ("24 小时", 86400),
+        ("7 天", 604800),
+        ("全部", 0),
+    ]
+
     def __init__(self):
         super().__init__()
         self.init_ui()
@@ -79,11 +372,40 @@ class PMMonitorMainWindow(QMainWindow):
         self.time_buffer = []
         self.max_buffer_size = 1000
 
-        # 定时器
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_display)
+        # 分位数：窗口内精确值 + 全程流式估计
+        self.window_quantiles = SlidingQuantiles()
+        self.window_histogram = SlidingHistogram()
+        self.session_quantiles = StreamingQuantiles()
+
+        # 长期趋势：多分辨率汇总存储（内存有上限）
+        self.rollup_store = RollupStore()
+
+        # 能量积分（按小时与标记区段分别累计）
+        self.energy = EnergyIntegrator()
+
+        # 采集线程（开始测量时创建）
+        self.worker = None
+        self.alarm_engine = None
+        self.trigger_capture = None
+        self.change_detector = None
         self.start_time = None
 
+        # 派生通道：编译后的表达式与实时窗口内的计算结果（与 time_buffer 尾部对齐）
+        self.derived_channels = []
+        self.derived_buffers = {}
+        self.derived_curves = {}
+
+        # 测试配置：加载的配置、当前执行器与已完成的步骤结果
+        self.profile = None
+        self.profile_runner = None
+        self.profile_results = []
+
+        # 捕获到的瞬态事件（保留最近 500 条）
+        self.capture_events = collections.deque(maxlen=500)
+        # 变化检测事件（随导出写入，保留最近 MAX_DETECTION_EVENTS 条）与会话内的总数
+        self.detection_events = collections.deque(maxlen=self.MAX_DETECTION_EVENTS)
+        self.detection_count = 0
+
     def init_visa(self):
         """初始化 VISA"""
         self.use_mock = False
@@ -116,6 +438,17 @@ class PMMonitorMainWindow(QMainWindow):
             self.btn_connect.setEnabled(False)
 
         self.instrument = None
+        self.resource_name = ""
+        self.device_idn = ""
+        self.driver = None
+        self.export_thread = None
+        self.spectrum_worker = None
+        self.spectrum_last_count = 0
+        self.spectrum_last_time = 0.0
+        self.session_writer = None
+        self.session_db = None
+        self.multimeter_dialog = None
+        self.dashboard_dialog = None
 
     def create_control_panel(self):
         """创建左侧控制面板"""
@@ -160,11 +493,16 @@ class PMMonitorMainWindow(QMainWindow):
         # 采样率设置
         conn_layout.addWidget(QLabel("采样间隔："))
         self.spin_sample_rate = QSpinBox()
-        self.spin_sample_rate.setRange(10, 5000)
+        self.spin_sample_rate.setRange(1, 5000)
         self.spin_sample_rate.setValue(100)
         self.spin_sample_rate.setSuffix(" ms")
         conn_layout.addWidget(self.spin_sample_rate)
 
+        # 独立采集进程：仪器会话交给子进程，样本经共享内存传回
+        self.chk_process_mode = QCheckBox("独立采集进程")
+        self.chk_process_mode.setToolTip("在子进程中采集，驱动崩溃不影响界面")
+        conn_layout.addWidget(self.chk_process_mode)
+
         conn_group.setLayout(conn_layout)
         layout.addWidget(conn_group)
 
@@ -189,6 +527,19 @@ class PMMonitorMainWindow(QMainWindow):
         self.btn_reset.clicked.connect(self.reset_data)
         measure_layout.addWidget(self.btn_reset)
 
+        self.btn_mark = QPushButton("开始标记区段")
+        self.btn_mark.setCheckable(True)
+        self.btn_mark.toggled.connect(self.toggle_energy_mark)
+        measure_layout.addWidget(self.btn_mark)
+
+        self.btn_multimeter = QPushButton("多表对齐...")
+        self.btn_multimeter.clicked.connect(self.show_multimeter)
+        measure_layout.addWidget(self.btn_multimeter)
+
+        self.btn_dashboard = QPushButton("仪表盘...")
+        self.btn_dashboard.clicked.connect(self.show_dashboard)
+        measure_layout.addWidget(self.btn_dashboard)
+
         measure_group.setLayout(measure_layout)
         layout.addWidget(measure_group)
 
@@ -196,14 +547,212 @@ class PMMonitorMainWindow(QMainWindow):
         export_group = QGroupBox("数据导出")
         export_layout = QVBoxLayout()
 
-        self.btn_export = QPushButton("导出数据 (CSV)")
+        export_layout.addWidget(QLabel("导出格式："))
+        self.combo_export_format = QComboBox()
+        for key in exporters.available_formats():
+            self.combo_export_format.addItem(exporters.EXPORT_FORMATS[key][0], key)
+        export_layout.addWidget(self.combo_export_format)
+
+        # 有损有界压缩：同时作用于导出与会话记录，重建误差不超过容差
+        compress_layout = QHBoxLayout()
+        self.combo_compression = QComboBox()
+        self.combo_compression.addItem("不压缩", None)
+        for key, label in compression.COMPRESSION_METHODS.items():
+            self.combo_compression.addItem(label, key)
+        self.combo_compression.setToolTip("死区：偏离上一保存值超过容差才保存；旋转门：直线在容差内穿过全部样本时不保存")
+        compress_layout.addWidget(self.combo_compression)
+        self.spin_compression_tolerance = QDoubleSpinBox()
+        self.spin_compression_tolerance.setRange(0.0001, 10000)
+        self.spin_compression_tolerance.setDecimals(4)
+        self.spin_compression_tolerance.setValue(0.05)
+        self.spin_compression_tolerance.setSuffix(" W")
+        compress_layout.addWidget(self.spin_compression_tolerance)
+        export_layout.addLayout(compress_layout)
+
+        self.btn_export = QPushButton("导出数据")
         self.btn_export.clicked.connect(self.export_data)
         export_layout.addWidget(self.btn_export)
 
+        # 会话数据库：开始测量时建立会话，采样点由后台线程批量写入
+        self.chk_record_db = QCheckBox("记录到会话数据库")
+        export_layout.addWidget(self.chk_record_db)
+
+        self.btn_history = QPushButton("历史会话...")
+        self.btn_history.clicked.connect(self.show_history)
+        export_layout.addWidget(self.btn_history)
+
         export_group.setLayout(export_layout)
         layout.addWidget(export_group)
 
-        # 4. 设备信息组
+        # 4. 报警设置组
+        alarm_group = QGroupBox("报警设置")
+        alarm_layout = QGridLayout()
+
+        self.chk_alarm = QCheckBox("启用报警")
+        alarm_layout.addWidget(self.chk_alarm, 0, 0, 1, 2)
+
+        alarm_layout.addWidget(QLabel("功率上限："), 1, 0)
+        self.spin_alarm_limit = QDoubleSpinBox()
+        self.spin_alarm_limit.setRange(0, 100000)
+        self.spin_alarm_limit.setDecimals(2)
+        self.spin_alarm_limit.setValue(55.0)
+        self.spin_alarm_limit.setSuffix(" W")
+        alarm_layout.addWidget(self.spin_alarm_limit, 1, 1)
+
+        alarm_layout.addWidget(QLabel("回差："), 2, 0)
+        self.spin_alarm_hysteresis = QDoubleSpinBox()
+        self.spin_alarm_hysteresis.setRange(0, 10000)
+        self.spin_alarm_hysteresis.setDecimals(2)
+        self.spin_alarm_hysteresis.setValue(1.0)
+        self.spin_alarm_hysteresis.setSuffix(" W")
+        alarm_layout.addWidget(self.spin_alarm_hysteresis, 2, 1)
+
+        alarm_layout.addWidget(QLabel("持续时间："), 3, 0)
+        self.spin_alarm_duration = QDoubleSpinBox()
+        self.spin_alarm_duration.setRange(0, 3600)
+        self.spin_alarm_duration.setDecimals(1)
+        self.spin_alarm_duration.setValue(1.0)
+        self.spin_alarm_duration.setSuffix(" s")
+        alarm_layout.addWidget(self.spin_alarm_duration, 3, 1)
+
+        alarm_layout.addWidget(QLabel("变化率上限："), 4, 0)
+        self.spin_alarm_rate = QDoubleSpinBox()
+        self.spin_alarm_rate.setRange(0, 1000000)
+        self.spin_alarm_rate.setDecimals(1)
+        self.spin_alarm_rate.setValue(0.0)
+        self.spin_alarm_rate.setSuffix(" W/s")
+        self.spin_alarm_rate.setSpecialValueText("关闭")
+        alarm_layout.addWidget(self.spin_alarm_rate, 4, 1)
+
+        alarm_layout.addWidget(QLabel("钩子："), 5, 0)
+        self.edit_alarm_hook = QLineEdit()
+        self.edit_alarm_hook.setPlaceholderText("http://localhost:8000/alarm 或命令")
+        alarm_layout.addWidget(self.edit_alarm_hook, 5, 1)
+
+        self.lbl_alarm_status = QLabel("无报警")
+        self.lbl_alarm_status.setStyleSheet("color: #666;")
+        self.lbl_alarm_status.setWordWrap(True)
+        alarm_layout.addWidget(self.lbl_alarm_status, 6, 0, 1, 2)
+
+        alarm_group.setLayout(alarm_layout)
+        layout.addWidget(alarm_group)
+
+        # 5. 事件捕获组
+        capture_group = QGroupBox("事件捕获")
+        capture_layout = QGridLayout()
+
+        self.chk_capture = QCheckBox("启用触发捕获")
+        capture_layout.addWidget(self.chk_capture, 0, 0, 1, 2)
+
+        capture_layout.addWidget(QLabel("触发方式："), 1, 0)
+        self.combo_trigger_mode = QComboBox()
+        for key, label in capture.TRIGGER_MODES.items():
+            self.combo_trigger_mode.addItem(label, key)
+        capture_layout.addWidget(self.combo_trigger_mode, 1, 1)
+
+        capture_layout.addWidget(QLabel("触发电平："), 2, 0)
+        self.spin_trigger_level = QDoubleSpinBox()
+        self.spin_trigger_level.setRange(0, 1000000)
+        self.spin_trigger_level.setDecimals(2)
+        self.spin_trigger_level.setValue(60.0)
+        capture_layout.addWidget(self.spin_trigger_level, 2, 1)
+
+        capture_layout.addWidget(QLabel("预触发 / 后触发："), 3, 0)
+        samples_layout = QHBoxLayout()
+        self.spin_pre_samples = QSpinBox()
+        self.spin_pre_samples.setRange(1, 100000)
+        self.spin_pre_samples.setValue(100)
+        samples_layout.addWidget(self.spin_pre_samples)
+        self.spin_post_samples = QSpinBox()
+        self.spin_post_samples.setRange(1, 100000)
+        self.spin_post_samples.setValue(200)
+        samples_layout.addWidget(self.spin_post_samples)
+        capture_layout.addLayout(samples_layout, 3, 1)
+
+        self.btn_events = QPushButton("事件列表 (0)")
+        self.btn_events.clicked.connect(self.show_events)
+        capture_layout.addWidget(self.btn_events, 4, 0, 1, 2)
+
+        capture_group.setLayout(capture_layout)
+        layout.addWidget(capture_group)
+
+        # 6. 变化检测组：Page-Hinkley 均值变化 + 滑动 z 分数离群点，结果标在曲线上并随数据导出
+        detect_group = QGroupBox("变化检测")
+        detect_layout = QGridLayout()
+
+        self.chk_detect = QCheckBox("启用变化点 / 离群点检测")
+        detect_layout.addWidget(self.chk_detect, 0, 0, 1, 2)
+
+        detect_layout.addWidget(QLabel("均值容差 δ："), 1, 0)
+        self.spin_detect_delta = QDoubleSpinBox()
+        self.spin_detect_delta.setRange(0, 10000)
+        self.spin_detect_delta.setDecimals(3)
+        self.spin_detect_delta.setValue(0.5)
+        self.spin_detect_delta.setSuffix(" W")
+        self.spin_detect_delta.setToolTip("小于此幅度的均值波动不累计")
+        detect_layout.addWidget(self.spin_detect_delta, 1, 1)
+
+        detect_layout.addWidget(QLabel("检测阈值 λ："), 2, 0)
+        self.spin_detect_threshold = QDoubleSpinBox()
+        self.spin_detect_threshold.setRange(0.1, 1000000)
+        self.spin_detect_threshold.setDecimals(1)
+        self.spin_detect_threshold.setValue(50.0)
+        self.spin_detect_threshold.setToolTip("累计偏离量 (W·样本) 超过此值判为均值变化；越大误报越少、检出越慢")
+        detect_layout.addWidget(self.spin_detect_threshold, 2, 1)
+
+        detect_layout.addWidget(QLabel("离群 z 阈值 / 窗口："), 3, 0)
+        outlier_layout = QHBoxLayout()
+        self.spin_detect_z = QDoubleSpinBox()
+        self.spin_detect_z.setRange(0, 100)
+        self.spin_detect_z.setDecimals(1)
+        self.spin_detect_z.setValue(6.0)
+        self.spin_detect_z.setSpecialValueText("关闭")
+        outlier_layout.addWidget(self.spin_detect_z)
+        self.spin_detect_window = QSpinBox()
+        self.spin_detect_window.setRange(10, 100000)
+        self.spin_detect_window.setValue(200)
+        self.spin_detect_window.setSuffix(" 点")
+        outlier_layout.addWidget(self.spin_detect_window)
+        detect_layout.addLayout(outlier_layout, 3, 1)
+
+        self.lbl_detect_status = QLabel("")
+        self.lbl_detect_status.setStyleSheet("color: #666;")
+        self.lbl_detect_status.setWordWrap(True)
+        detect_layout.addWidget(self.lbl_detect_status, 4, 0, 1, 2)
+
+        detect_group.setLayout(detect_layout)
+        layout.addWidget(detect_group)
+
+        # 7. 测试配置组
+        profile_group = QGroupBox("测试配置")
+        profile_layout = QVBoxLayout()
+
+        self.btn_load_profile = QPushButton("加载测试配置...")
+        self.btn_load_profile.clicked.connect(self.load_profile)
+        profile_layout.addWidget(self.btn_load_profile)
+
+        self.lbl_profile_status = QLabel("未加载（连续测量）")
+        self.lbl_profile_status.setStyleSheet("color: #666;")
+        self.lbl_profile_status.setWordWrap(True)
+        profile_layout.addWidget(self.lbl_profile_status)
+
+        profile_group.setLayout(profile_layout)
+        layout.addWidget(profile_group)
+
+        # 8. 派生通道组
+        derived_group = QGroupBox("派生通道")
+        derived_layout = QVBoxLayout()
+        self.edit_derived = QPlainTextEdit()
+        self.edit_derived.setPlaceholderText("每行 名称 = 表达式，例如：\nP_cal = P * 0.98\nP_1s = mean(P, 1)\nP_ema = ema(P, 5)")
+        self.edit_derived.setMaximumHeight(80)
+        derived_layout.addWidget(self.edit_derived)
+        self.btn_apply_derived = QPushButton("应用派生通道")
+        self.btn_apply_derived.clicked.connect(self.apply_derived_channels)
+        derived_layout.addWidget(self.btn_apply_derived)
+        derived_group.setLayout(derived_layout)
+        layout.addWidget(derived_group)
+
+        # 9. 设备信息组
         info_group = QGroupBox("设备信息")
         info_layout = QVBoxLayout()
 
@@ -297,6 +846,20 @@ class PMMonitorMainWindow(QMainWindow):
         stats_layout.addWidget(self.lbl_rms_label, 0, 2)
         stats_layout.addWidget(self.lbl_rms_value, 1, 2)
 
+        # 分位数（窗口 / 全程）
+        self.lbl_percentile_values = []
+        for col, p in enumerate(DEFAULT_PERCENTILES):
+            label = QLabel(f"{percentile_label(p).upper()} (窗口 / 全程)")
+            label.setFont(font_small_label)
+            label.setAlignment(Qt.AlignCenter)
+            value = QLabel("0.00 / 0.00 W")
+            value.setFont(font_stat)
+            value.setStyleSheet("color: #00796B; background-color: #E0F2F1; padding: 6px; border-radius: 5px;")
+            value.setAlignment(Qt.AlignCenter)
+            stats_layout.addWidget(label, 2, col)
+            stats_layout.addWidget(value, 3, col)
+            self.lbl_percentile_values.append(value)
+
         values_layout.addLayout(stats_layout)
 
         # ========== 采样统计（底部）==========
@@ -330,6 +893,25 @@ class PMMonitorMainWindow(QMainWindow):
         count_inner.addWidget(self.lbl_count_value)
         time_layout.addWidget(count_frame)
 
+        energy_frame = QFrame()
+        energy_frame.setStyleSheet("background-color: #F5F5F5; border-radius: 5px; padding: 5px;")
+        energy_inner = QVBoxLayout(energy_frame)
+        self.lbl_energy_label = QLabel("累计能量")
+        self.lbl_energy_label.setFont(font_small_label)
+        self.lbl_energy_label.setAlignment(Qt.AlignCenter)
+        self.lbl_energy_value = QLabel("0.0000 Wh")
+        self.lbl_energy_value.setFont(font_stat)
+        self.lbl_energy_value.setStyleSheet("color: #333;")
+        self.lbl_energy_value.setAlignment(Qt.AlignCenter)
+        self.lbl_energy_detail = QLabel("本小时 0.0000 Wh")
+        self.lbl_energy_detail.setFont(font_small_label)
+        self.lbl_energy_detail.setStyleSheet("color: #666;")
+        self.lbl_energy_detail.setAlignment(Qt.AlignCenter)
+        energy_inner.addWidget(self.lbl_energy_label)
+        energy_inner.addWidget(self.lbl_energy_value)
+        energy_inner.addWidget(self.lbl_energy_detail)
+        time_layout.addWidget(energy_frame)
+
         values_layout.addLayout(time_layout)
 
         values_group.setLayout(values_layout)
@@ -339,6 +921,23 @@ class PMMonitorMainWindow(QMainWindow):
         plot_group = QGroupBox("功率曲线")
         plot_layout = QVBoxLayout()
 
+        # 显示范围：实时窗口使用原始缓冲区，更长范围由汇总存储按分辨率选取
+        range_layout = QHBoxLayout()
+        range_layout.addWidget(QLabel("显示范围："))
+        self.combo_plot_range = QComboBox()
+        for label, span in self.PLOT_RANGES:
+            self.combo_plot_range.addItem(label, span)
+        self.combo_plot_range.currentIndexChanged.connect(lambda _: self.update_plot())
+        range_layout.addWidget(self.combo_plot_range)
+        range_layout.addStretch()
+        self.chk_spectrum = QCheckBox("显示频谱")
+        self.chk_spectrum.toggled.connect(self.toggle_spectrum)
+        range_layout.addWidget(self.chk_spectrum)
+        self.chk_histogram = QCheckBox("显示分布")
+        self.chk_histogram.toggled.connect(self.toggle_histogram)
+        range_layout.addWidget(self.chk_histogram)
+        plot_layout.addLayout(range_layout)
+
         # 创建曲线控件
         self.plot_widget = pg.PlotWidget()
         self.plot_widget.setTitle("实时功率监测曲线")
@@ -350,10 +949,43 @@ class PMMonitorMainWindow(QMainWindow):
         # 添加多条曲线
         self.curve_current = self.plot_widget.plot(pen=pg.mkPen('#2196F3', width=2), name='当前值')
         self.curve_avg = self.plot_widget.plot(pen=pg.mkPen('#FF5722', width=1, style=Qt.DashLine), name='平均值')
+        # 汇总层的最大/最小包络（仅在长时间范围下显示）
+        self.curve_env_max = self.plot_widget.plot(pen=pg.mkPen('#90CAF9', width=1))
+        self.curve_env_min = self.plot_widget.plot(pen=pg.mkPen('#90CAF9', width=1))
+        # 变化检测标记：▲ 均值上移，▼ 均值下移，× 离群点
+        self.scatter_detections = pg.ScatterPlotItem(size=11, pen=pg.mkPen('#333', width=1))
+        self.plot_widget.addItem(self.scatter_detections)
 
         self.plot_widget.addLegend()
 
-        plot_layout.addWidget(self.plot_widget)
+        plot_layout.addWidget(self.plot_widget, 3)
+
+        # 频谱面板（Welch PSD，可选）
+        self.spectrum_widget = pg.PlotWidget()
+        self.spectrum_widget.setTitle("功率谱密度 (Welch)")
+        self.spectrum_widget.setLabel('left', 'PSD', units='W²/Hz')
+        self.spectrum_widget.setLabel('bottom', '频率', units='Hz')
+        self.spectrum_widget.setLogMode(y=True)
+        self.spectrum_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.spectrum_widget.setBackground('#F5F5F5')
+        self.curve_spectrum = self.spectrum_widget.plot(pen=pg.mkPen('#673AB7', width=1))
+        self.lbl_spectrum_peak = pg.TextItem(color='#673AB7', anchor=(1, 0))
+        self.spectrum_widget.addItem(self.lbl_spectrum_peak)
+        self.spectrum_widget.setVisible(False)
+        plot_layout.addWidget(self.spectrum_widget, 2)
+
+        # 分布面板：实时窗口的滑动直方图（可选）
+        self.histogram_widget = pg.PlotWidget()
+        self.histogram_widget.setLabel('left', '样本数')
+        self.histogram_widget.setLabel('bottom', '功率', units='W')
+        self.histogram_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.histogram_widget.setBackground('#F5F5F5')
+        self.curve_histogram = self.histogram_widget.plot(
+            stepMode='center', fillLevel=0, brush='#2196F380', pen=pg.mkPen('#2196F3', width=1)
+        )
+        self.histogram_widget.setVisible(False)
+        plot_layout.addWidget(self.histogram_widget, 2)
+
         plot_group.setLayout(plot_layout)
         layout.addWidget(plot_group, 7)
 
@@ -408,19 +1040,23 @@ class PMMonitorMainWindow(QMainWindow):
             # 关闭现有连接
             if self.instrument:
                 self.instrument.close()
+            self.end_session()
 
             # 打开新连接
             self.statusBar().showMessage("正在连接设备...")
             QApplication.processEvents()  # 更新界面
 
-            # 检测是否为 Mock 设备
-            is_mock = "MOCK" in resource_str.upper()
-            
+            # 检测是否为远程采集代理或 Mock 设备
+            agent = remote_agent.parse_agent_resource(resource_str)
+            is_replay = replay.is_replay_resource(resource_str)
+            is_serial = serial_backend.is_serial_resource(resource_str)
+            is_mock = agent is None and ("MOCK" in resource_str.upper() or is_replay)
+
             if is_mock and HAS_MOCK:
                 from mock_visa import MockResourceManager
                 self.rm = MockResourceManager('@py')
                 self.use_mock = True
-            elif not HAS_PYVISA:
+            elif agent is None and not is_serial and not HAS_PYVISA:
                 QMessageBox.warning(
                     self,
                     "缺少依赖",
@@ -428,24 +1064,48 @@ class PMMonitorMainWindow(QMainWindow):
                 )
                 return
 
-            self.instrument = self.rm.open_resource(resource_str, timeout=5000)
-
-            # 设置超时和终止符
-            self.instrument.timeout = 5000
-            self.instrument.read_termination = '\n'
-            self.instrument.write_termination = '\n'
+            self.driver = None
+            if agent is not None:
+                self.instrument = remote_agent.AgentChannel(*agent)
+            else:
+                self.instrument = self.open_instrument(resource_str)
+                if not is_replay and not getattr(self.instrument, 'continuous', False):
+                    # 按型号选择驱动：下发设置命令，静态查询走缓存
+                    self.driver, self.instrument = drivers.connect_driver(self.instrument)
+                    if self.driver is not drivers.GENERIC_DRIVER:
+                        self.combo_command.setEditText(self.driver.power_command)
 
             # 查询设备信息
             idn = self.instrument.query('*IDN?')
-            self.lbl_device_info.setText(idn.strip())
+            self.resource_name = resource_str
+            self.device_idn = idn.strip()
+            if self.driver is not None:
+                self.lbl_device_info.setText(
+                    f"{self.device_idn}\n驱动: {self.driver.name}（最高 {self.driver.max_rate:g} Sa/s）"
+                )
+            else:
+                self.lbl_device_info.setText(self.device_idn)
 
             self.btn_connect.setEnabled(False)
             self.btn_connect.setText("已连接")
             self.btn_start.setEnabled(True)
-            self.lbl_connection_status.setText("状态: 已连接" + (" [模拟]" if is_mock else ""))
+            if is_replay:
+                mode = " [回放]"
+            elif is_mock:
+                mode = " [模拟]"
+            elif getattr(self.instrument, 'continuous', False):
+                mode = " [串口连续输出]"
+            else:
+                mode = ""
+            self.lbl_connection_status.setText("状态: 已连接" + mode)
             self.lbl_connection_status.setStyleSheet("color: #4CAF50; font-weight: bold;")
 
-            if is_mock:
+            if is_replay:
+                speed = self.instrument.speed
+                self.statusBar().showMessage(
+                    f"回放 {len(self.instrument)} 个录制样本 ({'尽快' if speed is None else f'{speed:g}x'})"
+                )
+            elif is_mock:
                 self.statusBar().showMessage("模拟设备已连接 (生成虚拟数据)")
                 QMessageBox.information(
                     self,
@@ -467,6 +1127,31 @@ class PMMonitorMainWindow(QMainWindow):
             QMessageBox.critical(self, "连接失败", error_msg)
             self.statusBar().showMessage("连接失败")
 
+    def open_instrument(self, resource_str):
+        """打开仪器并设置超时和终止符（SERIAL:: 资源直接打开串口，不经过 VISA）"""
+        rm = serial_backend.SerialResourceManager() if serial_backend.is_serial_resource(resource_str) else self.rm
+        instrument = rm.open_resource(resource_str, timeout=5000)
+        instrument.timeout = 5000
+        instrument.read_termination = '\n'
+        instrument.write_termination = '\n'
+        return instrument
+
+    def reopen_instrument(self):
+        """独立采集进程结束后，界面端重新打开仪器连接"""
+        try:
+            self.instrument = self.open_instrument(self.resource_name)
+            if self.driver is not None:
+                self.instrument = drivers.CachedInstrument(self.instrument, self.driver.static_queries)
+                self.driver.setup(self.instrument)
+        except Exception as e:
+            QMessageBox.warning(self, "重新连接失败", f"无法重新打开设备:\n{str(e)}")
+            self.instrument = None
+            self.btn_start.setEnabled(False)
+            self.btn_connect.setEnabled(True)
+            self.btn_connect.setText("连接设备")
+            self.lbl_connection_status.setText("状态: 未连接")
+            self.lbl_connection_status.setStyleSheet("color: #F44336; font-weight: bold;")
+
     def start_measurement(self):
         """开始测量"""
         if not self.instrument:
@@ -474,7 +1159,9 @@ class PMMonitorMainWindow(QMainWindow):
             return
 
         self.is_measuring = True
-        self.start_time = time.time()
+        # 停止后再次开始时沿用原时间轴，保证缓冲区和汇总数据时间单调
+        if self.start_time is None:
+            self.start_time = clock.now()
         
         self.btn_start.setEnabled(False)
         self.btn_connect.setEnabled(False)
@@ -483,12 +1170,81 @@ class PMMonitorMainWindow(QMainWindow):
         self.combo_visa_resources.setEnabled(False)
         self.combo_command.setEnabled(False)
         self.spin_sample_rate.setEnabled(False)
+        self.chk_process_mode.setEnabled(False)
+        self.btn_load_profile.setEnabled(False)
         
         self.statusBar().showMessage("测量中...")
 
-        # 启动更新定时器
-        interval = self.spin_sample_rate.value()
-        self.update_timer.start(interval)
+        # 超过 5 个采样周期（至少 1 s）没有数据视为缺口，不参与能量积分
+        self.energy.max_gap = max(5 * self.spin_sample_rate.value() / 1000.0, 1.0)
+
+        if self.chk_record_db.isChecked() and self.session_writer is None:
+            self.start_session()
+
+        # 启动采集线程（或独立采集进程）
+        command = self.combo_command.currentText().strip()
+        if isinstance(self.instrument, remote_agent.AgentChannel):
+            # 首次开始时回放代理保存的最近历史，再次开始时只接实时数据，保证时间轴单调
+            history = self.REMOTE_HISTORY_SECONDS if self.sample_count == 0 else 0.0
+            self.worker = RemoteAcquisitionWorker(
+                self.instrument.host, self.instrument.port, self.instrument.channel,
+                self.start_time, history=history, parent=self
+            )
+        elif isinstance(self.instrument, replay.ReplayInstrument):
+            # 回放使用录制时间戳，经与实时测量相同的处理阶段和界面链路
+            self.worker = ReplayWorker(self.instrument, self.start_time, parent=self)
+        elif self.chk_process_mode.isChecked() or getattr(self.instrument, 'continuous', False):
+            # 子进程独占仪器会话，界面端先释放连接，停止后再重新打开；
+            # 连续输出的串口仪表总是由采集进程读取，数值直接写入共享内存环形缓冲区
+            self.instrument.close()
+            self.worker = ProcessAcquisitionWorker(
+                self.resource_name, command, self.spin_sample_rate.value(), self.start_time, parent=self
+            )
+        else:
+            interval_ms = self.spin_sample_rate.value()
+            strategy = None
+            if self.driver is not None:
+                strategy = drivers.acquisition_strategy(self.driver, self.instrument, command, interval_ms)
+                if interval_ms < self.driver.min_interval_ms:
+                    interval_ms = self.driver.min_interval_ms
+                    self.statusBar().showMessage(
+                        f"{self.driver.name} 最高 {self.driver.max_rate:g} Sa/s，采样间隔按 {interval_ms} ms"
+                    )
+                self.lbl_device_info.setText(
+                    f"{self.device_idn}\n驱动: {self.driver.name}，{strategy.describe()}"
+                )
+            self.worker = AcquisitionWorker(
+                self.instrument, command, interval_ms, self.start_time, strategy=strategy, parent=self
+            )
+        self.alarm_engine = self.create_alarm_engine()
+        if self.alarm_engine is not None:
+            self.worker.add_stage(self.alarm_engine)
+        self.trigger_capture = self.create_trigger_capture()
+        if self.trigger_capture is not None:
+            self.worker.add_stage(self.trigger_capture)
+        self.change_detector = None
+        if self.chk_detect.isChecked():
+            self.change_detector = detection.ChangeDetector(
+                delta=self.spin_detect_delta.value(),
+                threshold=self.spin_detect_threshold.value(),
+                window=self.spin_detect_window.value(),
+                z_threshold=self.spin_detect_z.value(),
+                detect_outliers=self.spin_detect_z.value() > 0,
+            )
+            self.worker.add_stage(self.change_detector)
+        if self.profile is not None:
+            if isinstance(self.worker, AcquisitionWorker):
+                # 测试配置需要在采集线程中向仪器下发命令
+                self.profile_runner = profiles.ProfileRunner(self.profile)
+                self.profile_results = []
+                self.worker.add_controller(self.profile_runner)
+                self.worker.add_stage(self.profile_runner)
+            else:
+                self.statusBar().showMessage("测试配置仅支持本地采集线程，本次按连续测量运行")
+        self.worker.samples_ready.connect(self.on_samples)
+        self.worker.events_ready.connect(self.on_events)
+        self.worker.read_error.connect(self.on_read_error)
+        clock.start_worker(self.worker)
 
     def stop_measurement(self):
         """停止测量"""
@@ -502,13 +1258,33 @@ class PMMonitorMainWindow(QMainWindow):
         self.combo_command.setEnabled(True)
         self.spin_sample_rate.setEnabled(True)
         
-        self.update_timer.stop()
+        self.chk_process_mode.setEnabled(True)
+        self.btn_load_profile.setEnabled(True)
+        if self.worker is not None:
+            self.worker.stop()
+            if isinstance(self.worker, ProcessAcquisitionWorker):
+                self.reopen_instrument()
+            self.worker = None
+        self.energy.break_segment()
+        if self.alarm_engine is not None:
+            # 不等待：剩余报警由分发线程在后台发送，界面不被慢速 Webhook / 命令阻塞
+            self.alarm_engine.close()
+            self.alarm_engine = None
+        self.trigger_capture = None
+        self.change_detector = None
+        if self.profile_runner is not None and not self.profile_runner.done:
+            self.lbl_profile_status.setText(f"{self.profile['name']}: 已中止")
+        self.profile_runner = None
+        self.set_alarm_state([])
+        if self.session_writer is not None:
+            self.session_writer.flush()
         self.statusBar().showMessage("测量已停止")
 
     def reset_data(self):
         """重置数据"""
         self.data_buffer = []
         self.time_buffer = []
+        self.current_value = 0.0
         self.max_value = 0.0
         self.min_value = 0.0
         self.rms_value = 0.0
@@ -516,29 +1292,112 @@ class PMMonitorMainWindow(QMainWindow):
         self.avg_value = 0.0
         self.sample_count = 0
         self.start_time = None
+        self.window_quantiles.clear()
+        self.window_histogram.clear()
+        self.session_quantiles.reset()
+        self.rollup_store.clear()
+        self.energy.reset()
+        self.btn_mark.setChecked(False)
+        self.capture_events.clear()
+        self.profile_results = []
+        for channel in self.derived_channels:
+            channel.reset()
+        for buffer in self.derived_buffers.values():
+            buffer.clear()
+        self.btn_events.setText("事件列表 (0)")
+        self.detection_events.clear()
+        self.detection_count = 0
+        self.update_detection_markers()
+        self.lbl_detect_status.setText("")
+        self.end_session()
+        # 测量中重置：从新的时间零点开始，处理阶段的状态随之清除，并按需开启新会话
+        if self.is_measuring:
+            self.start_time = clock.now()
+            self.worker.start_time = self.start_time
+            if self.alarm_engine is not None:
+                self.worker.reset_stage(self.alarm_engine)
+                self.set_alarm_state([])
+            if self.trigger_capture is not None:
+                self.worker.reset_stage(self.trigger_capture)
+            if self.change_detector is not None:
+                self.worker.reset_stage(self.change_detector)
+            if self.chk_record_db.isChecked():
+                self.start_session()
 
         self.update_display()
         self.curve_current.setData([], [])
         self.curve_avg.setData([], [])
+        self.curve_env_max.setData([], [])
+        self.curve_env_min.setData([], [])
         
         self.statusBar().showMessage("数据已重置")
 
-    def update_display(self):
-        """更新显示"""
-        if not self.instrument or not self.is_measuring:
-            return
-
+    def create_alarm_engine(self):
+        """按报警设置创建报警引擎，未启用时返回 None"""
+        if not self.chk_alarm.isChecked():
+            return None
+
+        rules = [alarms.ThresholdRule(
+            "功率超限",
+            self.spin_alarm_limit.value(),
+            hysteresis=self.spin_alarm_hysteresis.value(),
+            duration=self.spin_alarm_duration.value(),
+        )]
+        if self.spin_alarm_rate.value() > 0:
+            rules.append(alarms.RateOfChangeRule(
+                "功率突变",
+                self.spin_alarm_rate.value(),
+                duration=self.spin_alarm_duration.value(),
+            ))
+
+        log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'alarms.log')
+        sinks = [alarms.LogSink(log_path)]
         try:
-            # 获取功率查询命令
-            command = self.combo_command.currentText().strip()
-
-            # 读取功率值
-            response = self.instrument.query(command)
-            new_value = float(response.strip())
+            hook = alarms.make_hook(self.edit_alarm_hook.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "报警设置", f"钩子命令无效，本次测量不调用钩子:\n{str(e)}")
+            hook = None
+        if hook is not None:
+            sinks.append(hook)
+        return alarms.AlarmEngine(rules, sinks, context={'resource': self.resource_name})
+
+    def create_trigger_capture(self):
+        """按事件捕获设置创建触发捕获阶段，未启用时返回 None"""
+        if not self.chk_capture.isChecked():
+            return None
+        return capture.TriggerCapture(
+            mode=self.combo_trigger_mode.currentData(),
+            level=self.spin_trigger_level.value(),
+            pre_samples=self.spin_pre_samples.value(),
+            post_samples=self.spin_post_samples.value(),
+        )
+
+    def show_multimeter(self):
+        """打开多表对齐窗口（独立采集，不影响主窗口测量）"""
+        if self.multimeter_dialog is None:
+            self.multimeter_dialog = MultiMeterDialog(self.combo_command.currentText().strip(), self)
+        self.multimeter_dialog.show()
+        self.multimeter_dialog.raise_()
+
+    def show_dashboard(self):
+        """打开多表仪表盘（独立采集，不影响主窗口测量）"""
+        if self.dashboard_dialog is None:
+            self.dashboard_dialog = DashboardDialog(self.combo_command.currentText().strip(), self)
+        self.dashboard_dialog.show()
+        self.dashboard_dialog.raise_()
+
+    def show_events(self):
+        """打开捕获事件列表"""
+        EventListDialog(self, self).show()
+
+    def on_samples(self, samples):
+        """接收采集线程送来的一批样本"""
+        if self.start_time is None:
+            return
 
+        for elapsed_time, new_value in samples:
             # 更新计数
             self.sample_count += 1
-            elapsed_time = time.time() - self.start_time if self.start_time else 0
 
             # 更新当前值
             self.current_value = new_value
@@ -556,94 +1415,498 @@ class PMMonitorMainWindow(QMainWindow):
             # 更新数据缓冲区
             self.data_buffer.append(new_value)
             self.time_buffer.append(elapsed_time)
+            self.window_quantiles.add(new_value)
+            self.window_histogram.add(new_value)
+            self.session_quantiles.add(new_value)
 
             # 限制缓冲区大小
             if len(self.data_buffer) > self.max_buffer_size:
-                self.data_buffer.pop(0)
+                old_value = self.data_buffer.pop(0)
+                self.window_quantiles.remove(old_value)
+                self.window_histogram.remove(old_value)
                 self.time_buffer.pop(0)
 
-            # 计算统计数据
-            import math
-            avg = sum(self.data_buffer) / len(self.data_buffer) if self.data_buffer else 0.0
-            rms = math.sqrt(sum(x**2 for x in self.data_buffer) / len(self.data_buffer)) if self.data_buffer else 0.0
+            # 折叠进多分辨率汇总存储
+            self.rollup_store.add(elapsed_time, new_value)
+            self.energy.add(elapsed_time, new_value)
+            if self.session_writer is not None:
+                self.session_writer.put(elapsed_time, new_value)
 
-            self.avg_value = avg
-            self.rms_value = rms
+        if self.session_writer is not None and self.session_writer.error is not None:
+            self.on_session_error()
+        if self.derived_channels and samples:
+            self.update_derived(samples)
+        self.update_display()
 
-            # 更新曲线
-            self.curve_current.setData(self.time_buffer, self.data_buffer)
-            self.curve_avg.setData(self.time_buffer, [avg] * len(self.time_buffer))
+    def apply_derived_channels(self):
+        """解析派生通道定义，替换现有派生曲线"""
+        try:
+            derived = expressions.parse_definitions(self.edit_derived.toPlainText(), [self.DERIVED_INPUT])
+        except expressions.ExpressionError as e:
+            QMessageBox.warning(self, "派生通道", str(e))
+            return
 
-            # 更新数值显示
-            self.lbl_current_value.setText(f"{self.current_value:.2f} W")
-            self.lbl_max_value.setText(f"{self.max_value:.2f} W")
-            self.lbl_min_value.setText(f"{self.min_value:.2f} W")
-            self.lbl_rms_value.setText(f"{self.rms_value:.2f} W")
-            self.lbl_count_value.setText(str(self.sample_count))
+        for curve in self.derived_curves.values():
+            self.plot_widget.removeItem(curve)
+        self.derived_channels = derived
+        self.derived_buffers = {d.name: collections.deque(maxlen=self.max_buffer_size) for d in derived}
+        self.derived_curves = {
+            d.name: self.plot_widget.plot(pen=pg.mkPen(self.DERIVED_COLORS[i % len(self.DERIVED_COLORS)], width=1),
+                                          name=d.name)
+            for i, d in enumerate(derived)
+        }
+        self.update_plot()
+        self.statusBar().showMessage(f"已应用 {len(derived)} 个派生通道")
+
+    def update_derived(self, samples):
+        """对一批新样本计算派生通道（有状态运算跨批保留状态）"""
+        times, values = np.array(samples, dtype=np.float64).T
+        columns = {self.DERIVED_INPUT: values}
+        for channel in self.derived_channels:
+            self.derived_buffers[channel.name].extend(channel.evaluate(times, columns).tolist())
+
+    def toggle_energy_mark(self, checked):
+        """开始/结束一个能量标记区段"""
+        t = self.time_buffer[-1] if self.time_buffer else 0.0
+        if checked:
+            name = f"区段 {len(self.energy.segments) + 1}"
+            self.energy.begin_mark(name, t)
+            self.btn_mark.setText("结束标记区段")
+            self.statusBar().showMessage(f"{name} 开始于 {t:.1f} s")
+        else:
+            self.btn_mark.setText("开始标记区段")
+            segment = self.energy.end_mark(t)
+            if segment is not None:
+                self.statusBar().showMessage(
+                    f"{segment.name}: {segment.start:.1f} ~ {segment.end:.1f} s, {segment.energy_wh:.4f} Wh"
+                )
 
-            # 更新时间显示
-            hours = int(elapsed_time // 3600)
-            minutes = int((elapsed_time % 3600) // 60)
-            seconds = int(elapsed_time % 60)
-            self.lbl_time_value.setText(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+    def on_events(self, events):
+        """处理采集线程产生的事件"""
+        captured = [e for e in events if isinstance(e, capture.CaptureEvent)]
+        if captured:
+            self.capture_events.extend(captured)
+            self.btn_events.setText(f"事件列表 ({len(self.capture_events)})")
+            self.statusBar().showMessage(
+                f"捕获事件 #{captured[-1].index} (t={captured[-1].trigger_time:.3f} s)"
+            )
 
+        step_results = [e for e in events if isinstance(e, profiles.StepResult)]
+        if step_results:
+            self.on_step_results(step_results)
+
+        alarm_events = [e for e in events if isinstance(e, alarms.AlarmEvent)]
+        if alarm_events and self.alarm_engine is not None:
+            last = alarm_events[-1]
+            self.statusBar().showMessage(f"[报警] {last.message}")
+            self.set_alarm_state(self.alarm_engine.active, last.message)
+
+        detected = [e for e in events if isinstance(e, detection.DetectionEvent)]
+        if detected:
+            self.detection_events.extend(detected)
+            self.detection_count += len(detected)
+            self.update_detection_markers()
+            self.lbl_detect_status.setText(f"{self.detection_count} 个事件；最近: {detected[-1].message}")
+
+        done = [e for e in events if isinstance(e, profiles.ProfileDone)]
+        if done:
+            self.on_profile_done(done[-1])
+
+        finished = [e for e in events if isinstance(e, replay.ReplayFinished)]
+        if finished:
+            info = finished[-1]
+            rate = info.count / info.elapsed if info.elapsed > 0 else 0.0
+            message = f"回放完成: {info.count} 点, 耗时 {info.elapsed:.2f} s ({rate:.0f} 点/s)"
+            if self.is_measuring:
+                self.stop_measurement()
+            self.statusBar().showMessage(message)
+
+    def update_detection_markers(self):
+        """在曲线上标出最近的检测事件"""
+        shown = list(self.detection_events)[-self.MAX_DETECTION_MARKERS:]
+        self.scatter_detections.setData(
+            [e.t for e in shown], [e.value for e in shown],
+            symbol=[self.DETECTION_SYMBOLS[e.kind][0] for e in shown],
+            brush=[self.DETECTION_SYMBOLS[e.kind][1] for e in shown],
+        )
+
+    def load_profile(self):
+        """加载测试配置（JSON / YAML），并按配置设置查询命令和采样间隔"""
+        from PyQt5.QtWidgets import QFileDialog
+
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "加载测试配置", "", "测试配置 (*.json *.yaml *.yml);;所有文件 (*)"
+        )
+        if not filename:
+            return
+        try:
+            self.profile = profiles.load_profile(filename)
         except Exception as e:
-            # 处理 VISA 错误（如果安装了 pyvisa）
-            if HAS_PYVISA:
-                import pyvisa
-                if isinstance(e, pyvisa.Error):
-                    print(f"VISA 读取错误: {e}")
-                    self.statusBar().showMessage(f"读取错误: {e.abbreviation}")
-                    return
-            # 重新抛出其他异常
+            QMessageBox.critical(self, "测试配置", f"无法加载测试配置:\n{str(e)}")
+            return
 
-        except ValueError as e:
-            print(f"数据解析错误: {e}")
-            self.statusBar().showMessage("数据格式错误")
+        if 'command' in self.profile:
+            self.combo_command.setEditText(self.profile['command'])
+        if 'interval_ms' in self.profile:
+            self.spin_sample_rate.setValue(int(self.profile['interval_ms']))
+        self.lbl_profile_status.setText(f"{self.profile['name']}: {len(self.profile['steps'])} 个步骤，开始测量后执行")
+        self.lbl_profile_status.setStyleSheet("color: #666;")
+
+    def on_step_results(self, results):
+        """记录步骤结果（写入会话数据库，导出时附在元数据中）"""
+        self.profile_results.extend(results)
+        last = results[-1]
+        self.statusBar().showMessage(
+            f"{last.name}: {'通过' if last.passed else '不通过 (' + '; '.join(last.failures) + ')'}"
+        )
+        if self.session_writer is not None:
+            try:
+                self.get_session_db().add_step_results(
+                    self.session_writer.session_id, self.profile['name'], profiles.results_metadata(results)
+                )
+            except Exception as e:
+                print(f"步骤结果写入数据库失败: {e}")
+
+    def on_profile_done(self, done):
+        """测试配置执行完毕"""
+        failed = [r.name for r in done.results if not r.passed]
+        if done.passed:
+            self.lbl_profile_status.setText(f"{done.name}: 全部通过 ({len(done.results)} 步)")
+            self.lbl_profile_status.setStyleSheet("color: #4CAF50; font-weight: bold;")
+        else:
+            self.lbl_profile_status.setText(f"{done.name}: 不通过 — {', '.join(failed)}")
+            self.lbl_profile_status.setStyleSheet("color: #F44336; font-weight: bold;")
+        if self.profile.get('stop_when_done') and self.is_measuring:
+            self.stop_measurement()
+
+    def on_read_error(self, message):
+        """采集线程读取错误"""
+        print(message)
+        self.statusBar().showMessage(message)
+
+    def set_alarm_state(self, active, message=""):
+        """当前值颜色与报警状态：绿色正常，红色超限"""
+        if active:
+            self.lbl_current_value.setStyleSheet("color: #F44336;")
+            self.lbl_alarm_status.setText("报警中: " + ", ".join(active))
+            self.lbl_alarm_status.setStyleSheet("color: #F44336; font-weight: bold;")
+        else:
+            self.lbl_current_value.setStyleSheet("color: #4CAF50;")
+            self.lbl_alarm_status.setText(message or "无报警")
+            self.lbl_alarm_status.setStyleSheet("color: #666;")
+
+    def update_display(self):
+        """更新显示"""
+        # 计算统计数据
+        import math
+        avg = sum(self.data_buffer) / len(self.data_buffer) if self.data_buffer else 0.0
+        rms = math.sqrt(sum(x**2 for x in self.data_buffer) / len(self.data_buffer)) if self.data_buffer else 0.0
+
+        self.avg_value = avg
+        self.rms_value = rms
+
+        # 更新曲线
+        self.update_plot()
+        self.maybe_update_spectrum()
+        self.update_histogram()
+
+        # 更新数值显示
+        self.lbl_current_value.setText(f"{self.current_value:.2f} W")
+        self.lbl_max_value.setText(f"{self.max_value:.2f} W")
+        self.lbl_min_value.setText(f"{self.min_value:.2f} W")
+        self.lbl_rms_value.setText(f"{self.rms_value:.2f} W")
+        self.lbl_count_value.setText(str(self.sample_count))
+        session_values = self.session_quantiles.values()
+        for label, p in zip(self.lbl_percentile_values, DEFAULT_PERCENTILES):
+            window = self.window_quantiles.quantile(p) or 0.0
+            session = session_values[p] or 0.0
+            label.setText(f"{window:.2f} / {session:.2f} W")
+
+        self.lbl_energy_value.setText(f"{self.energy.total_wh:.4f} Wh")
+        self.lbl_energy_detail.setText(f"本小时 {self.energy.current_interval_wh():.4f} Wh")
+        if self.profile_runner is not None and not self.profile_runner.done:
+            self.lbl_profile_status.setText(f"{self.profile['name']}: {self.profile_runner.status_text()}")
+
+        # 更新时间显示
+        elapsed_time = self.time_buffer[-1] if self.time_buffer else 0
+        hours = int(elapsed_time // 3600)
+        minutes = int((elapsed_time % 3600) // 60)
+        seconds = int(elapsed_time % 60)
+        self.lbl_time_value.setText(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
+
+    def update_plot(self):
+        """按显示范围更新曲线"""
+        span = self.combo_plot_range.currentData()
+        if span is None:
+            self.curve_current.setData(self.time_buffer, self.data_buffer)
+            self.curve_avg.setData(self.time_buffer, [self.avg_value] * len(self.time_buffer))
+            self.curve_env_max.setData([], [])
+            self.curve_env_min.setData([], [])
+            for name, buffer in self.derived_buffers.items():
+                n = min(len(buffer), len(self.time_buffer))
+                values = list(buffer)[len(buffer) - n:]
+                self.derived_curves[name].setData(self.time_buffer[len(self.time_buffer) - n:], values, connect='finite')
+            return
+
+        if not self.time_buffer:
+            return
+        t1 = self.time_buffer[-1]
+        t0 = t1 - span if span else 0.0
+        t, mean, vmin, vmax, _, _, width = self.rollup_store.select(t0, t1)
+        self.curve_current.setData(t, mean)
+        self.curve_avg.setData(t, [self.avg_value] * len(t))
+        if width > 0:
+            self.curve_env_max.setData(t, vmax)
+            self.curve_env_min.setData(t, vmin)
+        else:
+            self.curve_env_max.setData([], [])
+            self.curve_env_min.setData([], [])
+        # 长时间范围下派生通道按汇总均值重新计算（近似）
+        derived = expressions.evaluate_all(self.derived_channels, t, {self.DERIVED_INPUT: mean})
+        for name, values in derived.items():
+            self.derived_curves[name].setData(t, values, connect='finite')
+
+    def toggle_spectrum(self, checked):
+        """显示/隐藏频谱面板，按需启动计算线程"""
+        self.spectrum_widget.setVisible(checked)
+        if checked and self.spectrum_worker is None:
+            self.spectrum_worker = SpectrumWorker(parent=self)
+            self.spectrum_worker.result_ready.connect(self.on_spectrum)
+            self.spectrum_worker.start()
+        self.spectrum_last_count = 0
+        self.maybe_update_spectrum()
+
+    def toggle_histogram(self, checked):
+        """显示/隐藏分布面板"""
+        self.histogram_widget.setVisible(checked)
+        self.update_histogram()
+
+    def update_histogram(self):
+        """刷新分布面板；分布明显变化时才按窗口样本重建分箱"""
+        if not self.chk_histogram.isChecked():
+            return
+        hist = self.window_histogram
+        if hist.needs_rebin():
+            hist.rebin(self.data_buffer)
+        if hist.lo is None:
+            self.curve_histogram.setData([], [])
+            return
+        self.curve_histogram.setData(hist.edges(), hist.counts)
+        outside = hist.underflow + hist.overflow
+        self.histogram_widget.setTitle(
+            f"窗口分布：{hist.count} 点，分箱 {hist.width:.4g} W" + (f"，{outside} 点超出范围" if outside else "")
+        )
+
+    def maybe_update_spectrum(self):
+        """新样本足够多且距上次计算足够久时，把缓冲区快照交给频谱线程"""
+        if not self.chk_spectrum.isChecked() or self.spectrum_worker is None:
+            return
+        if self.spectrum_worker.busy or len(self.data_buffer) < 16:
+            return
+        if self.sample_count - self.spectrum_last_count < self.SPECTRUM_MIN_NEW_SAMPLES:
+            return
+        now = clock.monotonic()
+        if now - self.spectrum_last_time < self.SPECTRUM_MIN_INTERVAL:
+            return
+        self.spectrum_last_count = self.sample_count
+        self.spectrum_last_time = now
+        self.spectrum_worker.submit(list(self.time_buffer), list(self.data_buffer))
 
+    def on_spectrum(self, freqs, psd, peak):
+        """频谱计算结果"""
+        if len(freqs) < 2:
+            return
+        # 对数坐标下去掉直流分量和零值
+        psd = psd[1:]
+        self.curve_spectrum.setData(freqs[1:], psd.clip(min=1e-12))
+        if peak is not None:
+            self.lbl_spectrum_peak.setText(f"峰值 {peak:.3f} Hz")
+            self.lbl_spectrum_peak.setPos(freqs[-1], float(np.log10(psd.max().clip(min=1e-12))))
+
+    def get_session_db(self):
+        """按需打开会话数据库"""
+        if self.session_db is None:
+            self.session_db = session_db.SessionDB()
+        return self.session_db
+
+    def start_session(self):
+        """新建数据库会话并启动写入线程"""
+        try:
+            db = self.get_session_db()
+            session_id = db.create_session(
+                self.resource_name,
+                idn=self.device_idn,
+                command=self.combo_command.currentText().strip(),
+                start_time=self.start_time,
+                settings=dict({'sample_interval_ms': self.spin_sample_rate.value()}, **self.compression_settings()),
+            )
+            method = self.combo_compression.currentData()
+            compressor = None
+            if method is not None:
+                compressor = compression.Compressor(method, self.spin_compression_tolerance.value())
+            self.session_writer = session_db.SessionWriter(session_id, path=db.path, compressor=compressor)
+            self.session_writer.start()
+            self.statusBar().showMessage(f"测量中... (记录到会话 #{session_id})")
         except Exception as e:
-            print(f"更新显示错误: {e}")
-            import traceback
-            traceback.print_exc()
+            QMessageBox.warning(self, "会话数据库", f"无法创建会话，本次测量不记录:\n{str(e)}")
+
+    def end_session(self):
+        """结束当前数据库会话（提交剩余数据）"""
+        if self.session_writer is not None:
+            self.session_writer.stop()
+            compressor = self.session_writer.compressor
+            if compressor is not None:
+                self.statusBar().showMessage(
+                    f"会话 #{self.session_writer.session_id} 记录 {compressor.kept}/{compressor.received} 点，"
+                    f"压缩比 {compressor.ratio:.1f}:1"
+                )
+            self.session_writer = None
+
+    def on_session_error(self):
+        """会话写入线程出错：结束会话，测量继续但不再记录"""
+        writer = self.session_writer
+        self.end_session()
+        message = f"会话 #{writer.session_id} 写入失败，已停止记录（已写入 {writer.written} 点）"
+        self.statusBar().showMessage(message)
+        QMessageBox.warning(self, "会话数据库", f"{message}:\n{writer.error}")
+
+    def compression_settings(self):
+        """当前压缩设置（写入会话设置）；不压缩时为空"""
+        method = self.combo_compression.currentData()
+        if method is None:
+            return {}
+        return {'compression': method, 'compression_tolerance_w': self.spin_compression_tolerance.value()}
+
+    def show_history(self):
+        """打开历史会话浏览"""
+        try:
+            dialog = HistoryDialog(self.get_session_db(), self.plot_widget, self)
+        except Exception as e:
+            QMessageBox.critical(self, "会话数据库", f"无法打开会话数据库:\n{str(e)}")
+            return
+        dialog.show()
 
     def export_data(self):
-        """导出数据到 CSV"""
-        if not self.data_buffer:
+        """导出数据（格式由导出格式选择决定，写入在后台线程进行）"""
+        if len(self.rollup_store.raw) == 0:
             QMessageBox.information(self, "提示", "没有数据可导出！")
             return
 
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.information(self, "提示", "上一次导出尚未完成！")
+            return
+
         try:
             from PyQt5.QtWidgets import QFileDialog
             import datetime
 
+            fmt = self.combo_export_format.currentData()
+            _, file_filter, _, _ = exporters.EXPORT_FORMATS[fmt]
+
             # 选择保存文件
             filename, _ = QFileDialog.getSaveFileName(
                 self,
                 "导出数据",
-                f"power_data_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                "CSV 文件 (*.csv)"
+                f"power_data_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{exporters.EXTENSIONS[fmt]}",
+                file_filter
             )
 
             if filename:
-                # 写入 CSV
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("Time(s),Power(W),Avg(W),RMS(W)\n")
-                    for i, (t, p) in enumerate(zip(self.time_buffer, self.data_buffer)):
-                        avg = sum(self.data_buffer[:i+1]) / (i+1)
-                        rms = (sum(x**2 for x in self.data_buffer[:i+1]) / (i+1))**0.5
-                        f.write(f"{t:.3f},{p:.4f},{avg:.4f},{rms:.4f}\n")
-
-                self.statusBar().showMessage(f"数据已导出到: {filename}")
-                QMessageBox.information(self, "导出成功", f"数据已导出:\n{filename}")
+                # 在界面线程中取快照，写文件交给后台线程
+                metadata = self.export_metadata()
+                metadata.update(self.statistics_metadata())
+                metadata.update(self.energy.summary())
+                times = self.rollup_store.raw.column('t')
+                values = self.rollup_store.raw.column('v')
+
+                if self.derived_channels:
+                    metadata['derived_channels'] = {d.name: d.expression for d in self.derived_channels}
+                if self.detection_events:
+                    metadata['detection_codes'] = detection.DETECTION_CODES
+                    metadata['detections'] = [[round(e.t, 6), e.kind] for e in self.detection_events]
+
+                method = self.combo_compression.currentData()
+                self.export_thread = ExportThread(
+                    filename, fmt, times, values, metadata, self.derived_channels,
+                    compression=(method, self.spin_compression_tolerance.value()) if method is not None else None,
+                    detections=list(self.detection_events), parent=self
+                )
+                self.export_thread.succeeded.connect(self.on_export_succeeded)
+                self.export_thread.failed.connect(self.on_export_failed)
+                self.btn_export.setEnabled(False)
+                self.statusBar().showMessage(f"正在导出 {len(times)} 条数据...")
+                self.export_thread.start()
 
         except Exception as e:
             QMessageBox.critical(self, "导出失败", f"导出数据时出错:\n{str(e)}")
 
+    def export_metadata(self):
+        """导出文件的基本元数据（设备、命令、采样设置、测试配置结果）"""
+        import datetime
+
+        metadata = {
+            'resource': self.resource_name,
+            'idn': self.device_idn,
+            'command': self.combo_command.currentText().strip(),
+            'sample_interval_ms': self.spin_sample_rate.value(),
+            'start_time': self.start_time or 0.0,
+            'exported_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        if self.profile_results:
+            metadata['profile'] = self.profile['name']
+            metadata['profile_results'] = profiles.results_metadata(self.profile_results)
+        return metadata
+
+    def statistics_metadata(self):
+        """导出元数据中的统计摘要（窗口与全程分位数）"""
+        stats = {}
+        session_values = self.session_quantiles.values()
+        for p in DEFAULT_PERCENTILES:
+            name = percentile_label(p)
+            window = self.window_quantiles.quantile(p)
+            if window is not None:
+                stats[f'window_{name}_w'] = round(window, 6)
+            if session_values[p] is not None:
+                stats[f'session_{name}_w'] = round(session_values[p], 6)
+        return stats
+
+    def on_export_succeeded(self, filename, rows):
+        """导出完成"""
+        self.btn_export.setEnabled(True)
+        count = f"{rows} 条"
+        if self.export_thread.compression is not None:
+            total = len(self.export_thread.times)
+            count = f"{rows}/{total} 条，压缩比 {total / max(rows, 1):.1f}:1"
+        self.statusBar().showMessage(f"数据已导出到: {filename} ({count})")
+        QMessageBox.information(self, "导出成功", f"数据已导出:\n{filename}")
+
+    def on_export_failed(self, message):
+        """导出失败"""
+        self.btn_export.setEnabled(True)
+        self.statusBar().showMessage("导出失败")
+        QMessageBox.critical(self, "导出失败", f"导出数据时出错:\n{message}")
+
     def closeEvent(self, event):
         """关闭事件"""
         if self.is_measuring:
             self.stop_measurement()
 
+        if self.spectrum_worker is not None:
+            self.spectrum_worker.stop()
+        if self.multimeter_dialog is not None:
+            self.multimeter_dialog.close()
+        if self.dashboard_dialog is not None:
+            self.dashboard_dialog.close()
+
+        # 等待后台导出完成，避免写出半个文件
+        if self.export_thread is not None:
+            self.export_thread.wait()
+
+        # 提交会话数据库剩余数据
+        self.end_session()
+        if self.session_db is not None:
+            self.session_db.close()
+
         # 关闭 VISA 连接
         if self.instrument:
             try:
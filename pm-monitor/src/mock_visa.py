@@ -7,7 +7,16 @@ Mock VISA 设备模拟器
 
 import random
 import math
-import time
+
+import clock
+import drivers
+from replay import ReplayInstrument, is_replay_resource
+
+# 仪器内部读数缓冲区上限
+MAX_BUFFERED = 10000
+
+# 共享总线上每次查询的模拟传输耗时 (s)
+BUS_LATENCY = {'GPIB': 0.002, 'ASRL': 0.008}
 
 
 class MockInstrument:
@@ -26,39 +35,89 @@ class MockInstrument:
         self._noise_level = 2.0   # 噪声幅度
         self._trend = 0.0         # 趋势变化
         self._sample_count = 0
+
+        # 内部采样（FETC:ARR? 取走上次以来缓存的读数）
+        self._rate = 10.0          # Sa/s
+        self._buffer_from = clock.monotonic()
+        self._latched = None       # 组触发锁存的读数
+
+        # 资源名含 GPIB / ASRL 时模拟总线传输耗时（如 MOCK::GPIB0::12）
+        self._latency = next((v for k, v in BUS_LATENCY.items() if k in resource_name.upper()), 0.0)
         
     def query(self, command):
         """模拟查询命令"""
         command = command.strip().upper()
+        if self._latency:
+            clock.sleep(self._latency)
+
+        # 复合消息：逐条处理，只回复其中的查询命令（分号分隔）
+        if ';' in command:
+            parts = [part.strip() for part in command.split(';') if part.strip()]
+            replies = [self.query(part).strip() for part in parts]
+            return ';'.join(r for part, r in zip(parts, replies) if part.endswith('?')) + self.read_termination
         
         if command in ["*IDN?", "*IDN"]:
             return self._idn + self.read_termination
             
-        elif command in ["MEAS:POW?", ":MEAS:POW?", "FETC?", "MEASURE:POW?", "MEASURE:POWER?"]:
-            # 生成模拟功率值
-            self._sample_count += 1
-            
-            # 添加随机噪声
-            noise = random.uniform(-self._noise_level, self._noise_level)
-            
-            # 添加缓慢的趋势变化（模拟设备预热/负载变化）
-            self._trend += random.uniform(-0.1, 0.1)
-            self._trend = max(-5, min(5, self._trend))  # 限制趋势范围
-            
-            # 添加周期性波动（模拟交流电频率）
-            cycle = 2.0 * math.sin(self._sample_count * 0.1)
-            
-            power = self._base_power + self._trend + noise + cycle
-            power = max(0, power)  # 功率不能为负
-            
+        elif command in ["FETC?", ":FETC?"] and self._latched is not None:
+            # 读取组触发时的测量值
+            power, self._latched = self._latched, None
             return f"{power:.4f}" + self.read_termination
+
+        elif command in ["MEAS:POW?", ":MEAS:POW?", "FETC?", "MEASURE:POW?", "MEASURE:POWER?"]:
+            return f"{self._next_power():.4f}" + self.read_termination
+
+        elif command.lstrip(':') == "FETC:ARR?":
+            return ",".join(f"{p:.4f}" for p in self._fetch_buffered()) + self.read_termination
+
+        elif command.lstrip(':') == "SENS:RATE?":
+            return f"{self._rate:g}" + self.read_termination
+
+        elif command.lstrip(':').startswith("SENS:RATE "):
+            self._rate = min(float(command.split()[1]), 1000.0)
+            self._buffer_from = clock.monotonic()
+            return ""
             
         else:
             return "0" + self.read_termination
+
+    def _next_power(self):
+        """生成下一个模拟功率值"""
+        self._sample_count += 1
+        
+        # 添加随机噪声
+        noise = random.uniform(-self._noise_level, self._noise_level)
+        
+        # 添加缓慢的趋势变化（模拟设备预热/负载变化）
+        self._trend += random.uniform(-0.1, 0.1)
+        self._trend = max(-5, min(5, self._trend))  # 限制趋势范围
+        
+        # 添加周期性波动（模拟交流电频率）
+        cycle = 2.0 * math.sin(self._sample_count * 0.1)
+        
+        power = self._base_power + self._trend + noise + cycle
+        return max(0, power)  # 功率不能为负
+
+    def _fetch_buffered(self):
+        """按内部采样率生成自上次读取以来的读数"""
+        now = clock.monotonic()
+        count = int((now - self._buffer_from) * self._rate)
+        self._buffer_from += count / self._rate
+        return [self._next_power() for _ in range(min(count, MAX_BUFFERED))]
+
+    def assert_trigger(self):
+        """模拟触发：锁存一次测量值，供 FETC? 读取"""
+        self._latched = self._next_power()
+
+    def query_binary_values(self, command, datatype='f', is_big_endian=False, container=list):
+        """模拟定长块查询（与 pyvisa 同名方法一致，直接返回数值）"""
+        if command.strip().upper().lstrip(':') != "FETC:ARR?":
+            raise ValueError(f"不支持的二进制查询: {command}")
+        return container(self._fetch_buffered())
     
     def write(self, command):
-        """模拟写入命令"""
-        pass
+        """模拟写入命令（设置类命令与 query 相同处理）"""
+        self.query(command)
     
     def read(self):
         """模拟读取"""
@@ -69,6 +128,34 @@ class MockInstrument:
         self._connected = False
 
 
+# 模拟功率计驱动：仪器内部按设定采样率测量，二进制块批量读取
+drivers.register_driver(drivers.Driver(
+    "模拟功率计", r'^MOCK,', 'MEAS:POW?', max_rate=1000,
+    strategies=[
+        drivers.BinaryFetch('FETC:ARR?', 'SENS:RATE {rate:g}'),
+        drivers.ArrayFetch('FETC:ARR?', 'SENS:RATE {rate:g}'),
+    ],
+    static_queries=['SENS:RATE?'],
+    trigger_fetch='FETC?',
+))
+
+
+class MockInterface:
+    """模拟 GPIB 接口会话（GPIBn::INTFC），支持组触发"""
+
+    def __init__(self, resource_name):
+        self.resource_name = resource_name
+
+    def group_execute_trigger(self, *resources):
+        """向总线上的多台仪器同时发送 GET"""
+        clock.sleep(BUS_LATENCY['GPIB'])
+        for resource in resources:
+            resource.assert_trigger()
+
+    def close(self):
+        pass
+
+
 class MockResourceManager:
     """模拟 VISA 资源管理器"""
     
@@ -85,7 +172,11 @@ class MockResourceManager:
         return self._mock_devices
     
     def open_resource(self, resource_name, **kwargs):
-        """打开资源"""
+        """打开资源（REPLAY:: 资源为录制数据回放）"""
+        if is_replay_resource(resource_name):
+            return ReplayInstrument(resource_name)
+        if resource_name.strip().upper().endswith('::INTFC'):
+            return MockInterface(resource_name)
         return MockInstrument(resource_name)
     
     def close(self):
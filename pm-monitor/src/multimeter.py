@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多表对齐窗口
+同时采集多台功率计（LAN 等独立连接每台一个采集线程，GPIB / 串口按总线由调度线程交错查询），
+把各通道重采样到统一时间网格，
+实时绘制对齐后的各通道（A, B, ...）与派生通道（机柜总功率、差值、效率等，表达式见 expressions.py）
+"""
+
+import collections
+
+from PyQt5.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QGridLayout, QLabel, QPushButton,
+    QComboBox, QSpinBox, QPlainTextEdit, QMessageBox, QCheckBox
+)
+from PyQt5.QtCore import QTimer
+
+import numpy as np
+import pyqtgraph as pg
+
+import bus_scheduler
+import clock
+import drivers
+import expressions
+import remote_agent
+import replay
+import serial_backend
+from acq_process import open_resource_manager
+from acquisition import AcquisitionWorker, ProcessAcquisitionWorker, RemoteAcquisitionWorker, ReplayWorker
+from alignment import ALIGN_METHODS, DERIVED_OPS, StreamAligner, preset_definition
+
+
+def open_instrument(rm, resource):
+    """打开仪器并设置超时和终止符"""
+    instrument = rm.open_resource(resource, timeout=5000)
+    instrument.timeout = 5000
+    instrument.read_termination = '\n'
+    instrument.write_termination = '\n'
+    return instrument
+
+
+def open_channel_worker(resource, command, interval_ms, start_time, parent=None):
+    """按资源类型打开仪器并创建对应的采集线程（代理 / 回放 / 模拟 / VISA，后两者按型号选择采集方式）"""
+    agent = remote_agent.parse_agent_resource(resource)
+    if agent is not None:
+        return RemoteAcquisitionWorker(*agent, start_time, parent=parent)
+    if serial_backend.is_serial_resource(resource) and serial_backend.parse_serial_resource(resource)['stream']:
+        # 连续输出的串口仪表由采集进程读取
+        return ProcessAcquisitionWorker(resource, command, interval_ms, start_time, parent=parent)
+
+    instrument = open_instrument(open_resource_manager(resource), resource)
+    if isinstance(instrument, replay.ReplayInstrument):
+        return ReplayWorker(instrument, start_time, parent=parent)
+    driver, instrument = drivers.connect_driver(instrument)
+    strategy = drivers.acquisition_strategy(driver, instrument, command, interval_ms)
+    interval_ms = max(interval_ms, driver.min_interval_ms)
+    return AcquisitionWorker(instrument, command, interval_ms, start_time, strategy=strategy, parent=parent)
+
+
+def open_bus_scheduler(bus, resources, channels, command, interval_ms, start_time,
+                       mode=bus_scheduler.SCHEDULE_ROUND_ROBIN, group_trigger=True, parent=None):
+    """
+    打开同一总线上的全部仪器并创建该总线的调度线程
+
+    Args:
+        resources / channels: 该总线上的资源及其通道序号（优先级按资源顺序，靠前的优先）
+        group_trigger: 全部仪器的驱动都支持组触发时使用 GET
+    """
+    rm = open_resource_manager(resources[0])
+    members = []
+    for priority, (channel, resource) in enumerate(zip(channels, resources)):
+        driver, instrument = drivers.connect_driver(open_instrument(rm, resource))
+        strategy = drivers.acquisition_strategy(driver, instrument, command, interval_ms)
+        interval = max(interval_ms, driver.min_interval_ms) / 1000.0
+        members.append(bus_scheduler.BusMember(channel, instrument, strategy, interval, priority,
+                                               driver.trigger_fetch))
+    trigger = None
+    if group_trigger and all(m.trigger_fetch for m in members):
+        trigger = bus_scheduler.open_group_trigger(rm, bus)
+    return bus_scheduler.BusScheduler(bus, members, start_time, mode, trigger, parent=parent)
+
+
+def open_workers(resources, command, interval_ms, start_time, on_samples,
+                 mode=bus_scheduler.SCHEDULE_ROUND_ROBIN, group_trigger=True, parent=None):
+    """
+    为一组资源创建采集线程（尚未启动）：独立连接的仪器各一个线程，共享总线的仪器每条总线一个调度线程
+
+    Args:
+        on_samples: 回调 on_samples(通道序号, [(t, value), ...])，通道序号为资源在 resources 中的位置
+
+    Raises:
+        ConnectionError: 某个资源打开失败（已打开的仪器会被关闭）
+    """
+    workers = []
+    buses, parallel = bus_scheduler.group_by_bus(resources)
+    resource = None
+    try:
+        for i in parallel:
+            resource = resources[i]
+            worker = open_channel_worker(resource, command, interval_ms, start_time, parent)
+            worker.samples_ready.connect(lambda samples, ch=i: on_samples(ch, samples))
+            workers.append(worker)
+        for bus, channels in buses.items():
+            resource = bus
+            scheduler = open_bus_scheduler(bus, [resources[i] for i in channels], channels, command,
+                                           interval_ms, start_time, mode, group_trigger, parent)
+            scheduler.channel_samples.connect(on_samples)
+            workers.append(scheduler)
+    except Exception as e:
+        close_workers(workers)
+        raise ConnectionError(f"无法打开 {resource}:\n{str(e)}") from e
+    return workers
+
+
+def close_workers(workers):
+    """停止采集线程并关闭其使用的仪器"""
+    for worker in workers:
+        worker.stop()
+        for instrument in getattr(worker, 'instruments', [getattr(worker, 'instrument', None)]):
+            if instrument is not None:
+                instrument.close()
+        worker.deleteLater()
+
+
+class MultiMeterDialog(QDialog):
+    """多表采集与时间对齐"""
+
+    COLORS = ['#2196F3', '#4CAF50', '#FF9800', '#9C27B0', '#795548', '#009688', '#E91E63', '#3F51B5']
+    DISPLAY_POINTS = 3000
+
+    def __init__(self, command="MEAS:POW?", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("多表对齐")
+        self.resize(900, 640)
+        self.workers = []
+        self.bus_rates = {}         # 总线名 -> 吞吐显示文本
+        self.aligner = None
+        self.start_time = None
+        self.generation = 0   # 每次开始递增，丢弃上一轮线程仍在队列中的样本
+        self.grid_t = collections.deque(maxlen=self.DISPLAY_POINTS)
+        self.grid_columns = []
+        self.channels = []
+        self.derived = []           # [DerivedChannel, ...]
+        self.derived_columns = []   # 与 derived 对应的显示缓冲
+
+        layout = QHBoxLayout(self)
+
+        controls = QGridLayout()
+        controls.addWidget(QLabel("VISA 资源（每行一台）："), 0, 0, 1, 2)
+        self.edit_resources = QPlainTextEdit("MOCK::PowerMeter::1\nMOCK::PowerMeter::2")
+        controls.addWidget(self.edit_resources, 1, 0, 1, 2)
+
+        controls.addWidget(QLabel("查询命令："), 2, 0)
+        self.combo_command = QComboBox()
+        self.combo_command.setEditable(True)
+        self.combo_command.addItems(['MEAS:POW?', ':MEAS:POW?', 'FETC?', 'MEASure:POWer?'])
+        self.combo_command.setEditText(command)
+        controls.addWidget(self.combo_command, 2, 1)
+
+        controls.addWidget(QLabel("采样间隔："), 3, 0)
+        self.spin_interval = QSpinBox()
+        self.spin_interval.setRange(1, 5000)
+        self.spin_interval.setValue(100)
+        self.spin_interval.setSuffix(" ms")
+        controls.addWidget(self.spin_interval, 3, 1)
+
+        controls.addWidget(QLabel("对齐网格："), 4, 0)
+        self.spin_period = QSpinBox()
+        self.spin_period.setRange(10, 60000)
+        self.spin_period.setValue(200)
+        self.spin_period.setSuffix(" ms")
+        controls.addWidget(self.spin_period, 4, 1)
+
+        controls.addWidget(QLabel("插值方式："), 5, 0)
+        self.combo_method = QComboBox()
+        for key, label in ALIGN_METHODS.items():
+            self.combo_method.addItem(label, key)
+        controls.addWidget(self.combo_method, 5, 1)
+
+        controls.addWidget(QLabel("最大等待："), 6, 0)
+        self.spin_latency = QSpinBox()
+        self.spin_latency.setRange(50, 60000)
+        self.spin_latency.setValue(500)
+        self.spin_latency.setSuffix(" ms")
+        controls.addWidget(self.spin_latency, 6, 1)
+
+        controls.addWidget(QLabel("总线调度："), 7, 0)
+        self.combo_schedule = QComboBox()
+        for key, label in bus_scheduler.SCHEDULE_MODES.items():
+            self.combo_schedule.addItem(label, key)
+        self.combo_schedule.setToolTip("GPIB / 串口上多台仪表共用总线：轮询或按资源顺序的优先级交错查询")
+        controls.addWidget(self.combo_schedule, 7, 1)
+        self.chk_group_trigger = QCheckBox("GPIB 组触发（驱动支持时）")
+        self.chk_group_trigger.setChecked(True)
+        controls.addWidget(self.chk_group_trigger, 8, 0, 1, 2)
+
+        controls.addWidget(QLabel("派生通道："), 9, 0)
+        self.combo_derived = QComboBox()
+        self.combo_derived.addItem("预设...", None)
+        for key, label in DERIVED_OPS.items():
+            self.combo_derived.addItem(label, key)
+        self.combo_derived.activated.connect(self.insert_preset)
+        controls.addWidget(self.combo_derived, 9, 1)
+        self.edit_derived = QPlainTextEdit("Total = A + B")
+        self.edit_derived.setPlaceholderText("每行 名称 = 表达式，如 Eff = A / B、A_1s = mean(A, 1.0)")
+        self.edit_derived.setMaximumHeight(90)
+        controls.addWidget(self.edit_derived, 10, 0, 1, 2)
+
+        self.btn_start = QPushButton("开始")
+        self.btn_start.clicked.connect(self.start)
+        controls.addWidget(self.btn_start, 11, 0)
+        self.btn_stop = QPushButton("停止")
+        self.btn_stop.clicked.connect(self.stop)
+        self.btn_stop.setEnabled(False)
+        controls.addWidget(self.btn_stop, 11, 1)
+
+        self.lbl_status = QLabel("")
+        self.lbl_status.setWordWrap(True)
+        controls.addWidget(self.lbl_status, 12, 0, 1, 2)
+        self.lbl_bus = QLabel("")
+        self.lbl_bus.setWordWrap(True)
+        self.lbl_bus.setStyleSheet("color: #666;")
+        controls.addWidget(self.lbl_bus, 13, 0, 1, 2)
+        controls.setRowStretch(14, 1)
+        layout.addLayout(controls, 1)
+
+        plots = QVBoxLayout()
+        self.plot_channels = pg.PlotWidget()
+        self.plot_channels.setLabel('left', '功率', units='W')
+        self.plot_channels.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_channels.setBackground('#F5F5F5')
+        self.legend = self.plot_channels.addLegend()
+        plots.addWidget(self.plot_channels, 3)
+
+        self.plot_derived = pg.PlotWidget()
+        self.plot_derived.setLabel('bottom', '时间', units='s')
+        self.plot_derived.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_derived.setBackground('#F5F5F5')
+        self.plot_derived.setXLink(self.plot_channels)
+        self.legend_derived = self.plot_derived.addLegend()
+        plots.addWidget(self.plot_derived, 2)
+        layout.addLayout(plots, 3)
+
+        self.curves = []
+        self.derived_curves = []
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_alignment)
+
+    def _resources(self):
+        return [line.strip() for line in self.edit_resources.toPlainText().splitlines() if line.strip()]
+
+    @staticmethod
+    def channel_names(count):
+        return [chr(ord('A') + i) for i in range(count)]
+
+    def insert_preset(self):
+        """把选中的预设追加到派生通道定义"""
+        op = self.combo_derived.currentData()
+        self.combo_derived.setCurrentIndex(0)
+        if op is None:
+            return
+        try:
+            line = preset_definition(op, self.channel_names(max(len(self._resources()), 1)))
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            return
+        self.edit_derived.appendPlainText(line)
+
+    def start(self):
+        """为每个资源启动采集线程并开始对齐"""
+        resources = self._resources()
+        if not resources:
+            QMessageBox.warning(self, "警告", "请至少输入一个 VISA 资源！")
+            return
+        names = self.channel_names(len(resources))
+        try:
+            derived = expressions.parse_definitions(self.edit_derived.toPlainText(), names)
+        except expressions.ExpressionError as e:
+            QMessageBox.warning(self, "派生通道", str(e))
+            return
+
+        self.start_time = clock.now()
+        self.generation += 1
+        command = self.combo_command.currentText().strip()
+        interval_ms = self.spin_interval.value()
+        try:
+            self.workers = open_workers(
+                resources, command, interval_ms, self.start_time,
+                lambda ch, samples, gen=self.generation: self.on_samples(gen, ch, samples),
+                self.combo_schedule.currentData(), self.chk_group_trigger.isChecked(), self
+            )
+        except ConnectionError as e:
+            QMessageBox.critical(self, "连接失败", str(e))
+            return
+        self.bus_rates = {}
+        for worker in self.workers:
+            worker.read_error.connect(self.lbl_status.setText)
+            if isinstance(worker, bus_scheduler.BusScheduler):
+                worker.rate_report.connect(self.on_rate_report)
+                self.bus_rates[worker.bus] = (f"{worker.bus}: {len(worker.members)} 台"
+                                              + ("，组触发" if worker.group_triggered else ""))
+        self.lbl_bus.setText("\n".join(self.bus_rates.values()))
+
+        self.aligner = StreamAligner(
+            range(len(resources)), self.spin_period.value() / 1000.0,
+            method=self.combo_method.currentData(), max_latency=self.spin_latency.value() / 1000.0,
+        )
+        self.channels = names
+        self.derived = derived
+        self.grid_t.clear()
+        self.grid_columns = [collections.deque(maxlen=self.DISPLAY_POINTS) for _ in resources]
+        self.derived_columns = [collections.deque(maxlen=self.DISPLAY_POINTS) for _ in derived]
+        self.plot_channels.clear()
+        self.legend.clear()
+        self.curves = [
+            self.plot_channels.plot(pen=pg.mkPen(self.COLORS[i % len(self.COLORS)], width=1),
+                                    name=f"{name}: {resource}")
+            for i, (name, resource) in enumerate(zip(names, resources))
+        ]
+        self.plot_derived.clear()
+        self.legend_derived.clear()
+        self.derived_curves = [
+            self.plot_derived.plot(pen=pg.mkPen(self.COLORS[-1 - i % len(self.COLORS)], width=2),
+                                   name=f"{d.name} = {d.expression}")
+            for i, d in enumerate(derived)
+        ]
+
+        for worker in self.workers:
+            clock.start_worker(worker)
+        self.timer.start(100)
+        self.btn_start.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.lbl_status.setText(f"采集 {len(resources)} 台仪表")
+
+    def on_samples(self, generation, channel, samples):
+        """某通道的一批样本进入对齐器"""
+        if generation != self.generation or self.aligner is None or not samples:
+            return
+        times, values = zip(*samples)
+        self.aligner.add(channel, times, values)
+
+    def on_rate_report(self, bus, achieved, capacity):
+        """显示各总线的实际总采样率与可达总采样率"""
+        scheduler = next((w for w in self.workers if getattr(w, 'bus', None) == bus), None)
+        if scheduler is None:
+            return
+        mode = "组触发" if scheduler.group_triggered else bus_scheduler.SCHEDULE_MODES[scheduler.mode]
+        self.bus_rates[bus] = (f"{bus}: {len(scheduler.members)} 台，{mode}，"
+                               f"{achieved:.1f} Sa/s（总线可达 {capacity:.1f} Sa/s）")
+        self.lbl_bus.setText("\n".join(self.bus_rates.values()))
+
+    def update_alignment(self):
+        """输出新的网格点并刷新曲线"""
+        grid, columns = self.aligner.align(now=clock.now() - self.start_time)
+        if len(grid) == 0:
+            return
+        self.grid_t.extend(grid.tolist())
+        for store, column in zip(self.grid_columns, columns):
+            store.extend(column.tolist())
+        env = dict(zip(self.channels, columns))
+        for channel, store in zip(self.derived, self.derived_columns):
+            store.extend(channel.evaluate(grid, env).tolist())
+
+        t = np.fromiter(self.grid_t, dtype=np.float64)
+        for curve, store in zip(self.curves + self.derived_curves, self.grid_columns + self.derived_columns):
+            curve.setData(t, np.fromiter(store, dtype=np.float64), connect='finite')
+
+        latest = "  ".join(f"{d.name}: {store[-1]:.4f}" for d, store in zip(self.derived, self.derived_columns))
+        self.lbl_status.setText(f"{latest}  (t={grid[-1]:.1f} s)")
+
+    def stop(self):
+        """停止全部采集线程"""
+        self.timer.stop()
+        close_workers(self.workers)
+        self.workers = []
+        self.btn_start.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.stop()
+        event.accept()
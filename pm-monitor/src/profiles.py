@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试配置（SCPI 序列）引擎
+按 JSON / YAML 描述的步骤依次下发设置命令、等待稳定、在测量窗口内统计功率并判定上下限；
+由采集线程驱动，命令尽量合并为复合 SCPI 消息以减少往返。
+
+配置示例：
+    {
+        "name": "负载阶跃",
+        "command": "MEAS:POW?",
+        "interval_ms": 100,
+        "setup": ["*RST", "CONF:POW"],
+        "steps": [
+            {"name": "空载", "write": ["LOAD:OFF"], "settle": 2, "measure": 5,
+             "limits": {"mean": [null, 5.0]}},
+            {"name": "半载", "write": ["LOAD:LEV 50"], "query": ["POW:RANG?"],
+             "settle": 1, "measure": 5, "limits": {"mean": [45, 55], "max": [null, 60]}},
+            {"name": "冷却", "wait": 3}
+        ]
+    }
+"""
+
+import collections
+import json
+import math
+import os
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+
+# 测量窗口可判定的统计量
+STAT_NAMES = ('count', 'mean', 'min', 'max', 'std', 'rms')
+
+# 单条复合消息的最大长度（字符）
+MAX_MESSAGE_LENGTH = 256
+
+# 步骤结果：stats 为测量窗口统计，replies 为查询命令的回复，failures 为超限说明
+StepResult = collections.namedtuple('StepResult', 'index name t_start t_end stats replies passed failures')
+# 整个配置运行结束
+ProfileDone = collections.namedtuple('ProfileDone', 'name passed results')
+
+
+def load_profile(path):
+    """读取测试配置（.json / .yaml / .yml），并做基本校验"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            if not HAS_YAML:
+                raise ValueError("读取 YAML 配置需要安装 pyyaml")
+            profile = yaml.safe_load(f)
+        else:
+            profile = json.load(f)
+    return validate_profile(profile, default_name=os.path.splitext(os.path.basename(path))[0])
+
+
+def validate_profile(profile, default_name="profile"):
+    """校验并补全配置字段"""
+    if not isinstance(profile, dict) or not isinstance(profile.get('steps'), list) or not profile['steps']:
+        raise ValueError("测试配置必须包含非空的 steps 列表")
+    profile.setdefault('name', default_name)
+    profile.setdefault('setup', [])
+    profile.setdefault('batch', True)
+    profile.setdefault('stop_when_done', True)
+    for i, step in enumerate(profile['steps']):
+        if not isinstance(step, dict):
+            raise ValueError(f"第 {i + 1} 步格式错误")
+        step.setdefault('name', f"步骤 {i + 1}")
+        step['settle'] = float(step.get('settle', step.get('wait', 0.0)))
+        step['measure'] = float(step.get('measure', 0.0))
+        for stat, bounds in step.get('limits', {}).items():
+            if stat not in STAT_NAMES:
+                raise ValueError(f"{step['name']}: 未知统计量 {stat}")
+            if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+                raise ValueError(f"{step['name']}: {stat} 的限值应为 [下限, 上限]")
+    return profile
+
+
+def batch_commands(commands, max_length=MAX_MESSAGE_LENGTH):
+    """
+    把命令合并为复合 SCPI 消息（分号分隔，非公共命令补根路径冒号）
+
+    Returns:
+        [(message, query_count), ...]：每条消息及其中查询命令的个数
+    """
+    messages = []
+    parts = []
+    queries = 0
+    for command in commands:
+        command = command.strip()
+        if not command:
+            continue
+        if not command.startswith((':', '*')):
+            command = ':' + command
+        if parts and len(';'.join(parts)) + 1 + len(command) > max_length:
+            messages.append((';'.join(parts), queries))
+            parts, queries = [], 0
+        parts.append(command)
+        if command.endswith('?'):
+            queries += 1
+    if parts:
+        messages.append((';'.join(parts), queries))
+    return messages
+
+
+def send_commands(instrument, commands, batch=True):
+    """下发命令，返回查询命令的回复列表（按顺序）"""
+    if not batch:
+        replies = []
+        for command in commands:
+            if command.strip().endswith('?'):
+                replies.append(instrument.query(command).strip())
+            else:
+                instrument.write(command)
+        return replies
+
+    replies = []
+    for message, queries in batch_commands(commands):
+        if queries:
+            answers = instrument.query(message).strip().split(';')
+            replies.extend(a.strip() for a in answers[:queries])
+        else:
+            instrument.write(message)
+    return replies
+
+
+class _WindowStats:
+    """测量窗口的增量统计（Welford）"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._sumsq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self._sumsq += value * value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def result(self):
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'std': math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0,
+            'rms': math.sqrt(self._sumsq / self.count),
+        }
+
+
+class ProfileRunner:
+    """
+    测试配置执行器
+
+    采集线程在每次查询功率前调用 control(instrument, t) 下发命令，
+    并把 runner 作为处理阶段逐点调用 process(t, value) 推进等待与测量窗口。
+    步骤完成时返回 [StepResult]，全部完成时再返回 ProfileDone。
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.steps = profile['steps']
+        self.index = -1          # -1 表示尚未执行 setup
+        self.phase = 'pending'   # pending / settle / measure / done
+        self.results = []
+        self._step_start = None
+        self._phase_start = None
+        self._replies = {}
+        self._stats = None
+
+    @property
+    def done(self):
+        return self.phase == 'done'
+
+    def status_text(self):
+        """当前进度描述"""
+        if self.done:
+            return "已完成"
+        if self.index < 0:
+            return "等待开始"
+        step = self.steps[self.index]
+        phase = {'pending': "准备", 'settle': "等待稳定", 'measure': "测量中"}[self.phase]
+        return f"步骤 {self.index + 1}/{len(self.steps)}: {step['name']} — {phase}"
+
+    def control(self, instrument, t):
+        """在采集线程中调用：需要时下发 setup 或下一步骤的命令"""
+        if self.phase != 'pending':
+            return
+        batch = self.profile['batch']
+        if self.index < 0:
+            send_commands(instrument, self.profile['setup'], batch)
+            self.index = 0
+
+        step = self.steps[self.index]
+        queries = list(step.get('query', []))
+        replies = send_commands(instrument, list(step.get('write', [])) + queries, batch)
+        self._replies = dict(zip(queries, replies))
+        self._step_start = t
+        self._phase_start = t
+        self._stats = _WindowStats()
+        self.phase = 'settle'
+
+    def process(self, t, value):
+        """逐点推进当前步骤，步骤或配置完成时返回事件列表"""
+        if self.phase == 'settle' and t - self._phase_start >= self.steps[self.index]['settle']:
+            self.phase = 'measure'
+            self._phase_start = t
+        if self.phase != 'measure':
+            return None
+
+        step = self.steps[self.index]
+        if step['measure'] > 0:
+            self._stats.add(value)
+            if t - self._phase_start < step['measure']:
+                return None
+        return self._finish_step(t)
+
+    def _finish_step(self, t):
+        step = self.steps[self.index]
+        stats = self._stats.result()
+        failures = []
+        for stat, (lo, hi) in step.get('limits', {}).items():
+            value = stats.get(stat)
+            if value is None:
+                failures.append(f"{stat} 无数据")
+            elif lo is not None and value < lo:
+                failures.append(f"{stat}={value:.4g} < {lo}")
+            elif hi is not None and value > hi:
+                failures.append(f"{stat}={value:.4g} > {hi}")
+
+        result = StepResult(self.index, step['name'], self._step_start, t,
+                            stats, self._replies, not failures, failures)
+        self.results.append(result)
+        events = [result]
+
+        self.index += 1
+        if self.index < len(self.steps):
+            self.phase = 'pending'
+        else:
+            self.phase = 'done'
+            events.append(ProfileDone(self.profile['name'], all(r.passed for r in self.results), self.results))
+        return events
+
+
+def results_metadata(results):
+    """步骤结果转为可序列化的 dict 列表（导出元数据与数据库使用）"""
+    return [{
+        'step': r.index + 1,
+        'name': r.name,
+        't_start': r.t_start,
+        't_end': r.t_end,
+        'passed': r.passed,
+        'failures': r.failures,
+        'stats': r.stats,
+        'replies': r.replies,
+    } for r in results]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式分位数统计
+- P2Quantile：P² 算法（Jain & Chlamtac），O(1) 内存估计全程分位数
+- SlidingQuantiles：有序窗口（二分插入/删除），滑动窗口内的精确分位数与中位数
+两者都忽略 NaN / inf：NaN 与任何值比较都不成立，进入有序窗口后既无法按值移除，也会打乱二分查找
+"""
+
+import bisect
+import math
+
+
+# 统计面板与导出使用的分位点
+DEFAULT_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class P2Quantile:
+    """P² 单分位数估计器：5 个标记点，每样本 O(1)，不保存样本"""
+
+    def __init__(self, p):
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"分位点必须在 (0, 1) 内: {p}")
+        self.p = p
+        self.count = 0
+        self._q = []                       # 标记点高度
+        self._n = [0, 1, 2, 3, 4]           # 标记点实际位置
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]   # 期望位置
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]     # 期望位置增量
+
+    def add(self, x):
+        """加入一个样本（非有限值忽略）"""
+        if not math.isfinite(x):
+            return
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+
+        n = self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x, 1, 4) - 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        np_ = self._np
+        for i in range(5):
+            np_[i] += self._dn[i]
+
+        # 调整中间三个标记点
+        for i in (1, 2, 3):
+            d = np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    # 抛物线插值越界时退回线性插值
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        """当前估计值；无样本时为 None"""
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return _interpolate(self._q, self.p)
+        return self._q[2]
+
+    def reset(self):
+        """清空"""
+        self.__init__(self.p)
+
+
+class SlidingQuantiles:
+    """
+    滑动窗口精确分位数
+
+    窗口内样本保持有序：加入/移除为二分查找 + 一次内存搬移，
+    查询任意分位数（含中位数）为 O(1)。窗口进出由调用方与缓冲区同步驱动。
+    """
+
+    def __init__(self):
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def add(self, x):
+        """样本进入窗口（非有限值忽略）"""
+        if math.isfinite(x):
+            bisect.insort(self._sorted, x)
+
+    def remove(self, x):
+        """样本离开窗口（非有限值加入时已忽略）"""
+        if not math.isfinite(x):
+            return
+        i = bisect.bisect_left(self._sorted, x)
+        if i < len(self._sorted) and self._sorted[i] == x:
+            del self._sorted[i]
+
+    def clear(self):
+        """清空"""
+        self._sorted = []
+
+    def quantile(self, p):
+        """窗口内第 p 分位数（线性插值，与 numpy 默认方法一致）"""
+        if not self._sorted:
+            return None
+        return _interpolate(self._sorted, p)
+
+    def median(self):
+        """窗口中位数"""
+        return self.quantile(0.5)
+
+
+class StreamingQuantiles:
+    """一组全程分位数（每个分位点一个 P² 估计器）"""
+
+    def __init__(self, percentiles=DEFAULT_PERCENTILES):
+        self.estimators = [P2Quantile(p) for p in percentiles]
+
+    def add(self, x):
+        """加入一个样本"""
+        for estimator in self.estimators:
+            estimator.add(x)
+
+    def values(self):
+        """返回 {p: 估计值}"""
+        return {e.p: e.value() for e in self.estimators}
+
+    def reset(self):
+        """清空"""
+        for estimator in self.estimators:
+            estimator.reset()
+
+
+def _interpolate(sorted_values, p):
+    """有序序列的线性插值分位数"""
+    pos = p * (len(sorted_values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+
+def percentile_label(p):
+    """0.95 -> 'p95'"""
+    return f"p{p * 100:g}"
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程采集代理
+代理进程独占实验室里的仪器，通过 TCP 以紧凑的二进制批量帧把样本推送给任意数量的查看端；
+支持按通道订阅、服务端降采样（慢速查看端自动加大降采样倍数）和连接时回放最近历史。
+
+用法：
+    python3 remote_agent.py --resource MOCK::PowerMeter::1 --port 5600
+查看端在"VISA 资源"中输入 AGENT::<主机>::<端口>::<通道号>
+"""
+
+import argparse
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from rollup import RingSeries
+
+
+DEFAULT_PORT = 5600
+
+# 帧头：魔数、帧类型、负载长度
+FRAME_HEADER = struct.Struct('!2sBI')
+FRAME_MAGIC = b'PM'
+
+FRAME_HELLO = 1       # 代理 -> 查看端：通道列表 (JSON)
+FRAME_SUBSCRIBE = 2   # 查看端 -> 代理：订阅请求 (JSON)
+FRAME_SAMPLES = 3     # 代理 -> 查看端：样本批 (二进制)
+FRAME_ERROR = 4       # 代理 -> 查看端：错误信息 (JSON)
+
+# 样本批：通道号、样本数，之后为 float64 时间列与 float64 数值列（小端）
+SAMPLES_HEADER = struct.Struct('!HI')
+
+MAX_DECIMATION = 64
+
+# 查看端队列已满时腾出位置并重新放入的尝试次数（见 ClientHandler.enqueue）
+ENQUEUE_ATTEMPTS = 3
+
+
+def send_frame(sock, frame_type, payload):
+    """发送一帧"""
+    sock.sendall(FRAME_HEADER.pack(FRAME_MAGIC, frame_type, len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    """接收一帧，返回 (帧类型, 负载)"""
+    magic, frame_type, length = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    if magic != FRAME_MAGIC:
+        raise ConnectionError("协议错误：帧头魔数不匹配")
+    return frame_type, _recv_exact(sock, length)
+
+
+def encode_samples(channel, times, values):
+    """编码样本批（列式，整块拷贝）"""
+    times = np.ascontiguousarray(times, dtype='<f8')
+    values = np.ascontiguousarray(values, dtype='<f8')
+    return SAMPLES_HEADER.pack(channel, len(times)) + times.tobytes() + values.tobytes()
+
+
+def decode_samples(payload):
+    """解码样本批，返回 (channel, times, values)"""
+    channel, count = SAMPLES_HEADER.unpack_from(payload)
+    offset = SAMPLES_HEADER.size
+    times = np.frombuffer(payload, dtype='<f8', count=count, offset=offset)
+    values = np.frombuffer(payload, dtype='<f8', count=count, offset=offset + 8 * count)
+    return channel, times, values
+
+
+def decimate(times, values, factor, carry):
+    """
+    按 factor 个样本一组求平均
+
+    carry 为上一批剩下不足一组的 (times, values)，返回 (times, values, 新 carry)
+    """
+    if factor <= 1:
+        return times, values, None
+    if carry is not None:
+        times = np.concatenate((carry[0], times))
+        values = np.concatenate((carry[1], values))
+    full = len(times) - len(times) % factor
+    rest = (times[full:], values[full:]) if full < len(times) else None
+    if full == 0:
+        return np.zeros(0), np.zeros(0), rest
+    return (times[:full].reshape(-1, factor).mean(axis=1),
+            values[:full].reshape(-1, factor).mean(axis=1), rest)
+
+
+class ChannelSource(threading.Thread):
+    """代理端的单通道采集线程：查询仪器、保存历史、按批分发给订阅者"""
+
+    def __init__(self, index, rm, resource, command, interval_ms, history_seconds, batch_interval=0.05):
+        super().__init__(name=f"agent-ch{index}", daemon=True)
+        self.index = index
+        self.resource = resource
+        self.command = command
+        self.interval = interval_ms / 1000.0
+        self.batch_interval = batch_interval
+        self.instrument = rm.open_resource(resource, timeout=5000)
+        self.instrument.read_termination = '\n'
+        self.instrument.write_termination = '\n'
+        self.idn = self.instrument.query('*IDN?').strip()
+
+        capacity = max(16, int(history_seconds / self.interval))
+        self.history = RingSeries(capacity, ('t', 'v'))
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self._pending_t = []    # 已写入历史、尚未发布的样本（与 history 同受 lock 保护）
+        self._pending_v = []
+        self.running = True
+
+    def info(self):
+        """HELLO 帧中的通道描述"""
+        return {
+            'channel': self.index,
+            'resource': self.resource,
+            'idn': self.idn,
+            'command': self.command,
+            'interval_ms': self.interval * 1000.0,
+        }
+
+    def subscribe(self, client, history_seconds):
+        """
+        登记订阅者，返回需要回放的历史 (times, values)
+
+        历史只取到已发布的样本为止：尚未发布的样本会在下一批中发给新订阅者，
+        两者在同一把锁内确定，因此既不重复也不留空档
+        """
+        with self.lock:
+            self.subscribers.append(client)
+            published = len(self.history) - len(self._pending_t)
+            if history_seconds <= 0 or published <= 0:
+                return np.zeros(0), np.zeros(0)
+            latest = self.history.slice('t', published - 1, published)[0]
+            lo = min(self.history.searchsorted('t', latest - history_seconds), published)
+            return self.history.slice('t', lo, published).copy(), self.history.slice('v', lo, published).copy()
+
+    def unsubscribe(self, client):
+        with self.lock:
+            if client in self.subscribers:
+                self.subscribers.remove(client)
+
+    def run(self):
+        next_due = time.monotonic()
+        last_publish = next_due
+        while self.running:
+            try:
+                value = float(self.instrument.query(self.command).strip())
+                t = time.time()
+                with self.lock:
+                    self.history.append(t, value)
+                    self._pending_t.append(t)
+                    self._pending_v.append(value)
+            except Exception as e:
+                print(f"通道 {self.index} 读取错误: {e}")
+
+            now = time.monotonic()
+            if self._pending_t and now - last_publish >= self.batch_interval:
+                last_publish = now
+                # 取出待发布批次与订阅者列表在同一把锁内完成（见 subscribe）
+                with self.lock:
+                    times = np.array(self._pending_t)
+                    values = np.array(self._pending_v)
+                    self._pending_t, self._pending_v = [], []
+                    subscribers = list(self.subscribers)
+                for client in subscribers:
+                    client.enqueue(self.index, times, values)
+
+            next_due += self.interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.interval:
+                next_due = time.monotonic()
+
+    def stop(self):
+        self.running = False
+        self.join(2.0)
+        self.instrument.close()
+
+
+class ClientHandler(threading.Thread):
+    """代理端的单个查看端连接"""
+
+    def __init__(self, server, sock, address, max_pending=100):
+        super().__init__(name=f"agent-client-{address}", daemon=True)
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.decimation = {}    # 通道 -> 降采样倍数
+        self.dropped = 0        # 因发送跟不上丢弃的批次数
+        self._carry = {}
+        self.channels = []
+
+    def enqueue(self, channel, times, values):
+        """
+        由采集线程调用（多个通道线程可能同时调用）；发送跟不上时丢弃最旧的批次并加大该通道的降采样倍数。
+        腾出的位置可能被其他通道线程抢先占用，因此重试几次，仍然放不下时丢弃本批次，不向调用方抛出异常
+        """
+        for attempt in range(ENQUEUE_ATTEMPTS):
+            try:
+                self.queue.put_nowait((channel, times, values))
+                return
+            except queue.Full:
+                pass
+            if attempt == 0:
+                self.decimation[channel] = min(MAX_DECIMATION, self.decimation.get(channel, 1) * 2)
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+        self.dropped += 1
+
+    def send_samples(self, channel, times, values):
+        times, values, self._carry[channel] = decimate(
+            times, values, self.decimation.get(channel, 1), self._carry.get(channel)
+        )
+        if len(times):
+            send_frame(self.sock, FRAME_SAMPLES, encode_samples(channel, times, values))
+
+    def run(self):
+        try:
+            hello = {'channels': [source.info() for source in self.server.sources]}
+            send_frame(self.sock, FRAME_HELLO, json.dumps(hello, ensure_ascii=False).encode('utf-8'))
+
+            frame_type, payload = recv_frame(self.sock)
+            if frame_type != FRAME_SUBSCRIBE:
+                raise ConnectionError("协议错误：应为订阅请求")
+            request = json.loads(payload.decode('utf-8'))
+            self.channels = [c for c in request.get('channels', []) if 0 <= c < len(self.server.sources)]
+            for channel in self.channels:
+                self.decimation[channel] = max(1, int(request.get('decimate', 1)))
+
+            # 先登记订阅，再回放历史，保证历史与实时数据之间不留空档
+            for channel in self.channels:
+                times, values = self.server.sources[channel].subscribe(self, request.get('history', 0))
+                if len(times):
+                    self.send_samples(channel, times, values)
+
+            while True:
+                channel, times, values = self.queue.get()
+                self.send_samples(channel, times, values)
+        except (ConnectionError, OSError, ValueError) as e:
+            print(f"查看端 {self.address} 断开: {e}")
+        finally:
+            for channel in self.channels:
+                self.server.sources[channel].unsubscribe(self)
+            self.sock.close()
+
+
+class AgentServer:
+    """采集代理服务端"""
+
+    def __init__(self, sources, host='0.0.0.0', port=DEFAULT_PORT):
+        self.sources = sources
+        self.host = host
+        self.port = port
+        self._sock = None
+
+    def serve_forever(self):
+        for source in self.sources:
+            source.start()
+        self._sock = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self._sock.getsockname()[1]
+        print(f"采集代理已启动: {self.host}:{self.port}，{len(self.sources)} 个通道")
+        while True:
+            try:
+                sock, address = self._sock.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            ClientHandler(self, sock, address).start()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+        for source in self.sources:
+            source.stop()
+
+
+def parse_agent_resource(resource):
+    """解析 AGENT::<主机>::<端口>::<通道号>，不是代理资源时返回 None"""
+    parts = resource.strip().split('::')
+    if len(parts) != 4 or parts[0].upper() != 'AGENT':
+        return None
+    return parts[1], int(parts[2]), int(parts[3])
+
+
+class AgentClient:
+    """查看端连接：握手、订阅，并逐帧读取样本"""
+
+    def __init__(self, host, port, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        frame_type, payload = recv_frame(self.sock)
+        if frame_type != FRAME_HELLO:
+            raise ConnectionError("协议错误：应为 HELLO")
+        self.channels = json.loads(payload.decode('utf-8'))['channels']
+
+    def subscribe(self, channels, decimate_factor=1, history=0.0):
+        """订阅通道；history 为连接时回放的历史秒数"""
+        request = {'channels': list(channels), 'decimate': decimate_factor, 'history': history}
+        send_frame(self.sock, FRAME_SUBSCRIBE, json.dumps(request).encode('utf-8'))
+        self.sock.settimeout(None)
+
+    def read_samples(self):
+        """阻塞读取下一批样本，返回 (channel, times, values)"""
+        while True:
+            frame_type, payload = recv_frame(self.sock)
+            if frame_type == FRAME_SAMPLES:
+                return decode_samples(payload)
+            if frame_type == FRAME_ERROR:
+                raise ConnectionError(json.loads(payload.decode('utf-8')).get('message', '代理错误'))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class AgentChannel:
+    """
+    代理通道的仪器占位对象
+
+    只回答 *IDN?（来自代理的 HELLO），实际样本由查看端订阅流获得。
+    """
+
+    def __init__(self, host, port, channel):
+        self.host = host
+        self.port = port
+        self.channel = channel
+        client = AgentClient(host, port)
+        try:
+            infos = {info['channel']: info for info in client.channels}
+        finally:
+            client.close()
+        if channel not in infos:
+            raise ValueError(f"代理 {host}:{port} 没有通道 {channel}")
+        self.info = infos[channel]
+
+    def query(self, command):
+        if command.strip().upper() in ('*IDN?', '*IDN'):
+            return f"{self.info['idn']} (via {self.host}:{self.port})\n"
+        raise ValueError("代理通道只支持订阅数据流")
+
+    def write(self, command):
+        raise ValueError("代理通道只支持订阅数据流")
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PM-Monitor 远程采集代理")
+    parser.add_argument('--resource', action='append', required=True, help="VISA 资源（可重复，按顺序编号为通道 0, 1, ...）")
+    parser.add_argument('--command', default='MEAS:POW?', help="功率查询命令")
+    parser.add_argument('--interval', type=int, default=100, help="采样间隔 (ms)")
+    parser.add_argument('--history', type=float, default=600.0, help="保留供回放的历史秒数")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    from acq_process import open_resource_manager
+
+    sources = []
+    for index, resource in enumerate(args.resource):
+        rm = open_resource_manager(resource)
+        sources.append(ChannelSource(index, rm, resource, args.command, args.interval, args.history))
+
+    server = AgentServer(sources, args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n采集代理已退出")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制数据回放
+把导出的 CSV / NPZ 或压缩归档 (.pmarc) 当作一台仪器，经 MockResourceManager 打开，
+让录制的真实信号走与实时测量完全相同的处理链路（统计、报警、捕获、绘图）。
+
+资源字符串：REPLAY::<文件路径>[::<速度>]
+    速度为 1（实时，默认）、N（N 倍速）或 fast（不等待，尽快回放，可作吞吐基准）
+"""
+
+import collections
+import os
+
+import numpy as np
+
+
+REPLAY_PREFIX = 'REPLAY::'
+
+# 回放结束：样本数与墙钟耗时 (s)
+ReplayFinished = collections.namedtuple('ReplayFinished', 'path count elapsed')
+
+
+def is_replay_resource(resource_name):
+    return resource_name.strip().upper().startswith(REPLAY_PREFIX)
+
+
+def parse_replay_resource(resource_name):
+    """解析 REPLAY::<路径>[::<速度>]，返回 (path, speed)；speed 为 None 表示尽快回放"""
+    body = resource_name.strip()[len(REPLAY_PREFIX):]
+    path, speed = body, 1.0
+    if '::' in body:
+        head, tail = body.rsplit('::', 1)
+        if tail.lower() == 'fast':
+            path, speed = head, None
+        else:
+            try:
+                path, speed = head, float(tail)
+            except ValueError:
+                pass
+    if speed is not None and speed <= 0:
+        raise ValueError(f"回放速度必须为正数: {speed}")
+    return path, speed
+
+
+def load_recording(path):
+    """读取录制文件，返回 (times, values)，时间从 0 开始"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pmarc':
+        from archive import ArchiveReader
+        with ArchiveReader(path) as reader:
+            times, values = reader.read_range()
+    elif ext == '.npz':
+        with np.load(path) as data:
+            times, values = data['time_s'], data['power_w']
+    else:
+        # 导出的 CSV：# 元数据注释行之后为表头，前两列为 Time(s), Power(W)
+        with open(path, encoding='utf-8') as f:
+            lines = (line for line in f if not line.startswith('#'))
+            next(lines, None)
+            table = np.loadtxt(lines, delimiter=',', usecols=(0, 1), ndmin=2)
+        times, values = table[:, 0], table[:, 1]
+    if len(times) == 0:
+        raise ValueError(f"{path} 中没有数据")
+    times = np.asarray(times, dtype=np.float64)
+    return times - times[0], np.asarray(values, dtype=np.float64)
+
+
+class ReplayInstrument:
+    """
+    回放仪器
+
+    与 MockInstrument 一样响应 query()：功率查询按顺序返回录制值（由调用方的采样间隔决定节奏）；
+    ReplayWorker 则用 take_until() / take() 按录制时间戳成批取数。
+    """
+
+    def __init__(self, resource_name):
+        self.resource_name = resource_name
+        self.timeout = 5000
+        self.read_termination = '\n'
+        self.write_termination = '\n'
+        self.path, self.speed = parse_replay_resource(resource_name)
+        self.times, self.values = load_recording(self.path)
+        self.position = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def exhausted(self):
+        return self.position >= len(self.times)
+
+    def next_time(self):
+        """下一个样本的录制时间，回放完毕时为 None"""
+        return None if self.exhausted else float(self.times[self.position])
+
+    def take_until(self, t):
+        """取出录制时间 <= t 的后续样本"""
+        stop = int(np.searchsorted(self.times, t, side='right'))
+        return self.take(max(0, stop - self.position))
+
+    def take(self, count):
+        """取出后续 count 个样本"""
+        start = self.position
+        self.position = min(len(self.times), start + count)
+        return self.times[start:self.position], self.values[start:self.position]
+
+    def rewind(self):
+        self.position = 0
+
+    def query(self, command):
+        command = command.strip().upper()
+        if command in ("*IDN?", "*IDN"):
+            return f"REPLAY,{os.path.basename(self.path)},{len(self.times)},1.0" + self.read_termination
+        if command.endswith('?'):
+            if self.exhausted:
+                raise ValueError("回放数据已结束")
+            value = self.values[self.position]
+            self.position += 1
+            return f"{value:.6f}" + self.read_termination
+        return "0" + self.read_termination
+
+    def write(self, command):
+        pass
+
+    def read(self):
+        return "0" + self.read_termination
+
+    def close(self):
+        pass
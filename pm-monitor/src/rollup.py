@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多分辨率汇总存储
+将原始采样逐点折叠为 1 s / 1 min / 1 h 的汇总桶（min、max、mean、RMS、count），
+原始数据按容量老化淘汰，汇总数据长期保留，总内存占用有固定上限。
+较粗的层只折叠已关闭的细桶，查询时把各更细层未关闭的桶并入结果，因此粗层显示不滞后。
+"""
+
+import math
+
+import numpy as np
+
+
+class RingSeries:
+    """定长环形列存储（numpy 预分配，追加 O(1)，写满后覆盖最旧数据）"""
+
+    def __init__(self, capacity, columns):
+        self.capacity = int(capacity)
+        self.columns = tuple(columns)
+        self._data = {name: np.zeros(self.capacity) for name in self.columns}
+        self._head = 0      # 下一个写入位置
+        self._size = 0
+        self.dropped = 0    # 已被覆盖的行数
+
+    def __len__(self):
+        return self._size
+
+    def append(self, *values):
+        """追加一行"""
+        i = self._head
+        for name, value in zip(self.columns, values):
+            self._data[name][i] = value
+        self._head = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self.dropped += 1
+
+    def clear(self):
+        """清空"""
+        self._head = 0
+        self._size = 0
+        self.dropped = 0
+
+    def column(self, name):
+        """按时间顺序返回一列（拷贝）"""
+        arr = self._data[name]
+        if self._size < self.capacity:
+            return arr[:self._size].copy()
+        return np.concatenate((arr[self._head:], arr[:self._head]))
+
+    def _parts(self, name):
+        """按时间顺序的两段视图（未写满时第二段为空）"""
+        arr = self._data[name]
+        if self._size < self.capacity:
+            return arr[:self._size], arr[:0]
+        return arr[self._head:], arr[:self._head]
+
+    def searchsorted(self, name, value, side='left'):
+        """在按时间顺序递增的一列中二分查找（不拷贝，分两段查找）"""
+        first, second = self._parts(name)
+        i = int(np.searchsorted(first, value, side=side))
+        if i < len(first):
+            return i
+        return len(first) + int(np.searchsorted(second, value, side=side))
+
+    def slice(self, name, lo, hi):
+        """
+        按时间顺序的第 [lo, hi) 行；不跨越环形缓冲区接缝时返回视图（只读，下次追加后可能被覆盖），
+        否则只拷贝请求的范围
+        """
+        first, second = self._parts(name)
+        n = len(first)
+        if hi <= n:
+            return first[lo:hi]
+        if lo >= n:
+            return second[lo - n:hi - n]
+        return np.concatenate((first[lo:], second[:hi - n]))
+
+    def oldest(self, name):
+        """最旧一行的某列值"""
+        if self._size == 0:
+            return None
+        i = 0 if self._size < self.capacity else self._head
+        return float(self._data[name][i])
+
+
+class RollupTier:
+    """单一分辨率的汇总层"""
+
+    COLUMNS = ('t', 'min', 'max', 'sum', 'sumsq', 'count')
+
+    def __init__(self, width, capacity):
+        self.width = float(width)
+        self.series = RingSeries(capacity, self.COLUMNS)
+        self._open = None   # 当前未关闭的桶 [start, min, max, sum, sumsq, count]
+
+    def fold(self, t, vmin, vmax, vsum, vsumsq, count):
+        """
+        折叠一个样本或一个更细的桶
+
+        Returns:
+            被关闭的桶 (start, min, max, sum, sumsq, count)，没有则为 None
+        """
+        start = math.floor(t / self.width) * self.width
+        closed = None
+        o = self._open
+        # 时间回退（理论上不应出现）时并入当前桶，保证桶序单调
+        if o is not None and start > o[0]:
+            closed = tuple(o)
+            self.series.append(*closed)
+            o = None
+
+        if o is None:
+            self._open = [start, vmin, vmax, vsum, vsumsq, count]
+        else:
+            if vmin < o[1]:
+                o[1] = vmin
+            if vmax > o[2]:
+                o[2] = vmax
+            o[3] += vsum
+            o[4] += vsumsq
+            o[5] += count
+        return closed
+
+    def clear(self):
+        """清空"""
+        self.series.clear()
+        self._open = None
+
+    def open_bucket(self):
+        """当前未关闭的桶 (start, min, max, sum, sumsq, count)，没有则为 None"""
+        return None if self._open is None else tuple(self._open)
+
+    def _open_rows(self, pending=()):
+        """
+        未关闭的桶，并入更细层尚未折叠进来的未关闭桶 pending（按时间顺序）；
+        细桶可能已进入下一个粗桶，此时多出一行
+        """
+        rows = []
+        o = None if self._open is None else list(self._open)
+        for bucket in pending:
+            start = math.floor(bucket[0] / self.width) * self.width
+            if o is not None and start <= o[0]:
+                if bucket[1] < o[1]:
+                    o[1] = bucket[1]
+                if bucket[2] > o[2]:
+                    o[2] = bucket[2]
+                o[3] += bucket[3]
+                o[4] += bucket[4]
+                o[5] += bucket[5]
+            else:
+                if o is not None:
+                    rows.append(o)
+                o = [start] + list(bucket[1:])
+        if o is not None:
+            rows.append(o)
+        return rows
+
+    def covers(self, t0):
+        """是否仍保留着 t0 时刻的数据"""
+        return self.series.dropped == 0 or self.series.oldest('t') <= t0
+
+    def count_between(self, t0, t1, pending=()):
+        """[t0, t1] 内的桶数（含未关闭桶）"""
+        s = self.series
+        n = s.searchsorted('t', t1, side='right') - s.searchsorted('t', t0 - self.width, side='right')
+        return n + len(self._open_rows(pending))
+
+    def select(self, t0, t1, pending=()):
+        """
+        返回 [t0, t1] 内各桶的 (t, mean, min, max, rms, count)，t 为桶起始时间；
+        pending 为更细层的未关闭桶（见 RollupStore.select）
+        """
+        s = self.series
+        lo = s.searchsorted('t', t0 - self.width, side='right')
+        hi = s.searchsorted('t', t1, side='right')
+        cols = {name: s.slice(name, lo, hi) for name in self.COLUMNS}
+
+        rows = [row for row in self._open_rows(pending) if row[0] <= t1]
+        if rows:
+            for name, values in zip(self.COLUMNS, zip(*rows)):
+                cols[name] = np.append(cols[name], values)
+        else:
+            cols = {name: col.copy() for name, col in cols.items()}
+
+        count = cols['count']
+        nonzero = count > 0
+        mean = np.divide(cols['sum'], count, out=np.zeros_like(count), where=nonzero)
+        rms = np.sqrt(np.divide(cols['sumsq'], count, out=np.zeros_like(count), where=nonzero))
+        return cols['t'], mean, cols['min'], cols['max'], rms, count
+
+
+class RollupStore:
+    """
+    分层汇总存储
+
+    原始层保留最近 raw_capacity 个样本；汇总层按 1 s → 1 min → 1 h 级联折叠，
+    每层都是定长环形缓冲区，因此运行时间再长内存也不会增长。
+    """
+
+    # (桶宽度 s, 保留桶数)：1 s 保留 2 小时，1 min 保留 7 天，1 h 保留约 1 年
+    DEFAULT_TIERS = ((1.0, 7200), (60.0, 10080), (3600.0, 8784))
+
+    def __init__(self, raw_capacity=36000, tiers=DEFAULT_TIERS):
+        self.raw = RingSeries(raw_capacity, ('t', 'v'))
+        self.tiers = [RollupTier(width, capacity) for width, capacity in tiers]
+
+    def add(self, t, value):
+        """加入一个样本，逐层级联折叠（每样本 O(层数)）"""
+        self.raw.append(t, value)
+        closed = self.tiers[0].fold(t, value, value, value, value * value, 1)
+        for tier in self.tiers[1:]:
+            if closed is None:
+                break
+            closed = tier.fold(*closed)
+
+    def clear(self):
+        """清空全部数据"""
+        self.raw.clear()
+        for tier in self.tiers:
+            tier.clear()
+
+    def select(self, t0, t1, max_points=4000):
+        """
+        为可见时间范围挑选合适的分辨率
+
+        从最细的层开始，选择仍覆盖 t0 且点数不超过 max_points 的第一层；
+        都不满足时退回最粗的一层。
+
+        Returns:
+            (t, mean, min, max, rms, count, width)，原始层的 width 为 0
+        """
+        raw = self.raw
+        if raw.dropped == 0 or raw.oldest('t') <= t0:
+            lo = raw.searchsorted('t', t0, side='left')
+            hi = raw.searchsorted('t', t1, side='right')
+            if hi - lo <= max_points:
+                t = raw.slice('t', lo, hi).copy()
+                v = raw.slice('v', lo, hi).copy()
+                return t, v, v, v, np.abs(v), np.ones_like(v), 0.0
+
+        for k, tier in enumerate(self.tiers):
+            pending = self._pending(k)
+            if tier.covers(t0) and tier.count_between(t0, t1, pending) <= max_points:
+                return tier.select(t0, t1, pending) + (tier.width,)
+
+        k = len(self.tiers) - 1
+        return self.tiers[k].select(t0, t1, self._pending(k)) + (self.tiers[k].width,)
+
+    def _pending(self, k):
+        """比第 k 层更细的各层未关闭的桶（尚未折叠进第 k 层），按时间顺序"""
+        buckets = (tier.open_bucket() for tier in reversed(self.tiers[:k]))
+        return [b for b in buckets if b is not None]
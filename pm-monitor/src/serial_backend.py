@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口高速采集
+绕过通用 VISA 读路径，直接以原始模式打开串口：波特率、流控、读块大小可配置，
+一次读取整块数据再按行解析。支持两类仪表：
+    - 轮询：与其他仪器相同的 query() 接口（可配合驱动注册表、采集线程使用）
+    - 连续输出：仪表自行按固定速率推送数值，不需要查询；read_values() 成批解析，
+      由采集进程直接写入共享内存环形缓冲区
+
+资源字符串：SERIAL::<设备>[::选项...]
+    baud=115200     波特率（默认 9600）
+    flow=rtscts     流控：none / rtscts / xonxoff
+    chunk=65536     每次读取的最大字节数
+    stream          连续输出模式
+    rate=1000       连续输出的标称速率 (Sa/s)，用于还原各读数的时间；不填则在两次读取之间均匀分布
+    field=2         每行为逗号分隔的多个量时取第几项（从 0 开始）
+
+没有硬件时可用伪终端模拟器测试与压测：
+    python serial_backend.py --simulate --stream --rate 2000
+    python serial_backend.py --benchmark --rate 20000
+"""
+
+import argparse
+import os
+import select
+import threading
+import time
+
+import numpy as np
+
+try:
+    import termios
+    import tty
+    HAS_TERMIOS = True
+except ImportError:
+    HAS_TERMIOS = False
+
+try:
+    import serial
+    HAS_PYSERIAL = True
+except ImportError:
+    HAS_PYSERIAL = False
+
+
+SERIAL_PREFIX = 'SERIAL::'
+
+FLOW_CONTROLS = ('none', 'rtscts', 'xonxoff')
+
+DEFAULT_BAUD = 9600
+DEFAULT_CHUNK = 65536
+
+# 单行最大长度：超过时丢弃（对端在发送非文本数据或终止符设置错误）
+MAX_LINE = 4096
+
+# 连续输出模式下每次等待数据的最长时间 (s)
+STREAM_WAIT = 0.05
+
+
+def is_serial_resource(resource_name):
+    return resource_name.strip().upper().startswith(SERIAL_PREFIX)
+
+
+def parse_serial_resource(resource_name):
+    """解析 SERIAL:: 资源字符串，返回配置字典"""
+    parts = resource_name.strip()[len(SERIAL_PREFIX):].split('::')
+    if not parts[0]:
+        raise ValueError(f"串口资源缺少设备名: {resource_name}")
+    config = {
+        'device': parts[0], 'baud': DEFAULT_BAUD, 'flow': 'none', 'chunk': DEFAULT_CHUNK,
+        'stream': False, 'rate': None, 'field': None,
+    }
+    for option in parts[1:]:
+        key, _, value = option.partition('=')
+        key = key.strip().lower()
+        if key == 'stream' and not value:
+            config['stream'] = True
+        elif key in ('baud', 'chunk', 'field') and value:
+            config[key] = int(value)
+        elif key == 'rate' and value:
+            config['rate'] = float(value)
+        elif key == 'flow' and value.lower() in FLOW_CONTROLS:
+            config['flow'] = value.lower()
+        else:
+            raise ValueError(f"无法识别的串口选项: {option}")
+    return config
+
+
+class _TermiosPort:
+    """POSIX 原始模式串口（也可打开伪终端）"""
+
+    def __init__(self, device, baud, flow):
+        speed = getattr(termios, f'B{baud}', None)
+        if speed is None:
+            raise ValueError(f"不支持的波特率: {baud}")
+        self.fd = os.open(device, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            tty.setraw(self.fd)
+            iflag, oflag, cflag, lflag, _, _, cc = termios.tcgetattr(self.fd)
+            cflag |= termios.CLOCAL | termios.CREAD
+            cflag &= ~termios.CRTSCTS
+            iflag &= ~(termios.IXON | termios.IXOFF)
+            if flow == 'rtscts':
+                cflag |= termios.CRTSCTS
+            elif flow == 'xonxoff':
+                iflag |= termios.IXON | termios.IXOFF
+            cc[termios.VMIN] = 0
+            cc[termios.VTIME] = 0
+            termios.tcsetattr(self.fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, speed, speed, cc])
+            termios.tcflush(self.fd, termios.TCIOFLUSH)
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def read(self, size, timeout):
+        """读取已到达的数据（最多 size 字节），timeout 内没有数据返回 b''"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return b''
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            return b''
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view):]
+            except BlockingIOError:
+                select.select([], [self.fd], [], 1.0)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class _PySerialPort:
+    """pyserial 串口（没有 termios 的平台）"""
+
+    def __init__(self, device, baud, flow, chunk):
+        self.port = serial.Serial(device, baud, rtscts=flow == 'rtscts', xonxoff=flow == 'xonxoff', timeout=0)
+        if hasattr(self.port, 'set_buffer_size'):
+            self.port.set_buffer_size(rx_size=chunk)
+
+    def read(self, size, timeout):
+        self.port.timeout = timeout
+        data = self.port.read(1)
+        if data and self.port.in_waiting:
+            data += self.port.read(min(size - 1, self.port.in_waiting))
+        return data
+
+    def write(self, data):
+        self.port.write(data)
+
+    def close(self):
+        self.port.close()
+
+
+def open_port(config):
+    """按配置打开串口"""
+    if HAS_TERMIOS:
+        return _TermiosPort(config['device'], config['baud'], config['flow'])
+    if HAS_PYSERIAL:
+        return _PySerialPort(config['device'], config['baud'], config['flow'], config['chunk'])
+    raise RuntimeError("此平台打开串口需要安装 pyserial")
+
+
+class LineParser:
+    """
+    按行解析数值流：保留不完整的尾行，完整的行整批用 numpy 转换，
+    只有整批转换失败时才逐行解析并跳过格式错误的行
+    """
+
+    def __init__(self, terminator=b'\n', field=None, separator=b','):
+        self.terminator = terminator
+        self.field = field
+        self.separator = separator
+        self.errors = 0
+        self._tail = b''
+
+    def feed(self, data):
+        """送入一块原始数据，返回其中完整行的数值数组"""
+        data = self._tail + data
+        cut = data.rfind(self.terminator)
+        if cut < 0:
+            self._tail = data
+            if len(self._tail) > MAX_LINE:
+                self._tail = b''
+                self.errors += 1
+            return np.zeros(0)
+        self._tail = data[cut + len(self.terminator):]
+        lines = data[:cut].split(self.terminator)
+        if self.field is not None:
+            picked = []
+            for line in lines:
+                parts = line.split(self.separator)
+                if len(parts) > self.field:
+                    picked.append(parts[self.field])
+                elif line.strip():
+                    # 字段不足的行按格式错误计数
+                    self.errors += 1
+            lines = picked
+        try:
+            return np.array(lines, dtype=np.float64)
+        except ValueError:
+            return self._parse_slow(lines)
+
+    def _parse_slow(self, lines):
+        values = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                values.append(float(line))
+            except ValueError:
+                self.errors += 1
+        return np.array(values, dtype=np.float64)
+
+    def reset(self):
+        self._tail = b''
+
+
+class SerialInstrument:
+    """
+    串口仪器
+
+    轮询模式与 VISA 仪器接口相同（query / write / read）；
+    连续输出模式下 read_values() 返回 (绝对时间数组, 数值数组)，query('*IDN?') 返回本地生成的标识。
+    """
+
+    def __init__(self, resource_name):
+        self.resource_name = resource_name
+        self.config = parse_serial_resource(resource_name)
+        self.continuous = self.config['stream']
+        self.timeout = 5000
+        self.read_termination = '\n'
+        self.write_termination = '\n'
+        self.port = open_port(self.config)
+        self.parser = LineParser(field=self.config['field'])
+        self._buffer = b''
+        self._last_read = time.time()
+        self._last_t = None
+
+    @property
+    def parse_errors(self):
+        return self.parser.errors
+
+    def write(self, command):
+        self.port.write((command + self.write_termination).encode('ascii'))
+
+    def read(self):
+        """读取一行回复（一次读入整块数据，多余部分留待下次）"""
+        terminator = self.read_termination.encode('ascii')
+        deadline = time.monotonic() + self.timeout / 1000.0
+        while terminator not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.config['device']} 读取超时")
+            self._buffer += self.port.read(self.config['chunk'], remaining)
+        line, _, self._buffer = self._buffer.partition(terminator)
+        return line.decode('ascii', errors='replace') + self.read_termination
+
+    def query(self, command):
+        if self.continuous:
+            if command.strip().upper() in ("*IDN?", "*IDN"):
+                return f"SERIAL-STREAM,{self.config['device']},{self.config['baud']},0" + self.read_termination
+            raise ValueError("连续输出模式的仪表不支持查询")
+        self._buffer = b''
+        self.write(command)
+        return self.read()
+
+    def read_values(self, wait=STREAM_WAIT):
+        """
+        连续输出模式：读取已到达的数值
+
+        Returns:
+            (times, values)：times 为绝对时间 (s，系统时间，由采集子进程调用)，
+            有标称速率时最后一个读数记为到达时刻并按速率倒推，否则在上次读取与本次之间均匀分布
+        """
+        data = self.port.read(self.config['chunk'], wait)
+        now = time.time()
+        values = self.parser.feed(data) if data else np.zeros(0)
+        n = len(values)
+        if n == 0:
+            return np.zeros(0), values
+        rate = self.config['rate']
+        if rate:
+            times = now - np.arange(n - 1, -1, -1) / rate
+            if self._last_t is not None and times[0] <= self._last_t:
+                times = self._last_t + np.arange(1, n + 1) / rate
+        else:
+            times = self._last_read + (now - self._last_read) * np.arange(1, n + 1) / n
+        self._last_read = now
+        self._last_t = times[-1]
+        return times, values
+
+    def close(self):
+        self.port.close()
+
+
+class SerialResourceManager:
+    """与 pyvisa ResourceManager 相同接口，只打开 SERIAL:: 资源"""
+
+    def open_resource(self, resource_name, **kwargs):
+        return SerialInstrument(resource_name)
+
+    def list_resources(self):
+        return ()
+
+    def close(self):
+        pass
+
+
+class PtySimulator:
+    """
+    伪终端功率计模拟器（Linux / macOS）
+
+    从端路径 device 可作为 SERIAL::<device> 打开；轮询模式用 MockInstrument 回复查询，
+    连续输出模式按 rate (Sa/s) 推送数值行。
+    """
+
+    def __init__(self, stream=False, rate=1000.0, field_count=1, tick=0.005):
+        from mock_visa import MockInstrument
+        self.stream = stream
+        self.rate = rate
+        self.field_count = field_count
+        self.tick = tick
+        self.sent = 0
+        self._meter = MockInstrument("MOCK::SERIAL")
+        self._master, slave = os.openpty()
+        os.set_blocking(self._master, False)
+        self.device = os.ttyname(slave)
+        tty.setraw(slave)
+        os.close(slave)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _line(self):
+        value = self._meter._next_power()
+        fields = ["230.0000"] * (self.field_count - 1) + [f"{value:.4f}"]
+        return ",".join(fields) + "\r\n"
+
+    def _run(self):
+        started = time.monotonic()
+        buffer = b''
+        while self._running:
+            if self.stream:
+                due = int((time.monotonic() - started) * self.rate) - self.sent
+                if due > 0:
+                    self._write(''.join(self._line() for _ in range(due)).encode('ascii'))
+                    self.sent += due
+                time.sleep(self.tick)
+                continue
+            ready, _, _ = select.select([self._master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                buffer += os.read(self._master, 4096)
+            except OSError:
+                # 从端尚未被打开（或已关闭）时读主端返回 EIO
+                time.sleep(0.05)
+                continue
+            while b'\n' in buffer:
+                command, _, buffer = buffer.partition(b'\n')
+                reply = self._meter.query(command.decode('ascii', errors='replace'))
+                self._write(reply.encode('ascii'))
+                self.sent += 1
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view and self._running:
+            try:
+                view = view[os.write(self._master, view):]
+            except BlockingIOError:
+                time.sleep(0.001)
+            except OSError:
+                return
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+        os.close(self._master)
+
+
+def benchmark(rate, seconds=5.0, baud=115200):
+    """
+    用伪终端模拟器压测连续输出路径
+
+    Returns:
+        (每秒解析的数值个数, 丢失的数值个数, 解析错误行数)
+    """
+    sim = PtySimulator(stream=True, rate=rate).start()
+    instrument = SerialInstrument(f"{SERIAL_PREFIX}{sim.device}::baud={baud}::stream::rate={rate:g}")
+    received = 0
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < seconds:
+            _, values = instrument.read_values()
+            received += len(values)
+        elapsed = time.monotonic() - started
+        sim.stop()
+        # 取走停止前已发送的剩余数据
+        while True:
+            _, values = instrument.read_values(wait=0.1)
+            if len(values) == 0:
+                break
+            received += len(values)
+    finally:
+        instrument.close()
+    return received / elapsed, sim.sent - received, instrument.parse_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PM-Monitor 串口功率计模拟器与压测")
+    parser.add_argument('--simulate', action='store_true', help="启动伪终端模拟器并打印设备路径")
+    parser.add_argument('--benchmark', action='store_true', help="压测连续输出路径")
+    parser.add_argument('--stream', action='store_true', help="模拟器按固定速率连续输出")
+    parser.add_argument('--rate', type=float, default=1000.0, help="连续输出速率 (Sa/s)")
+    parser.add_argument('--seconds', type=float, default=5.0, help="压测时长 (s)")
+    args = parser.parse_args()
+
+    if not HAS_TERMIOS:
+        parser.error("伪终端模拟器需要 Linux / macOS")
+    if args.benchmark:
+        throughput, lost, errors = benchmark(args.rate, args.seconds)
+        print(f"速率 {args.rate:g} Sa/s：解析 {throughput:.0f} 值/s，丢失 {lost}，错误行 {errors}")
+        return
+    if args.simulate:
+        sim = PtySimulator(stream=args.stream, rate=args.rate).start()
+        options = f"::stream::rate={args.rate:g}" if args.stream else ""
+        print(f"模拟器已启动，资源：{SERIAL_PREFIX}{sim.device}{options}（Ctrl+C 退出）")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            sim.stop()
+        return
+    parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 测量会话数据库
+每次测量记录为一个会话（资源、IDN、命令、开始时间、设置），采样点批量写入 samples 表，
+(session_id, t) 上建索引以支持快速的时间范围查询和跨会话对比
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+import numpy as np
+
+import clock
+
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sessions.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resource TEXT NOT NULL,
+    idn TEXT,
+    command TEXT,
+    start_time REAL NOT NULL,
+    end_time REAL,
+    settings TEXT,
+    sample_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    t REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_session_t ON samples(session_id, t);
+CREATE TABLE IF NOT EXISTS step_results (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    profile TEXT,
+    step INTEGER NOT NULL,
+    name TEXT,
+    t_start REAL,
+    t_end REAL,
+    passed INTEGER NOT NULL,
+    detail TEXT
+);
+"""
+
+
+def connect(path=DEFAULT_DB_PATH):
+    """打开数据库（WAL 模式，允许写线程与查询并发）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SessionDB:
+    """会话查询接口"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = connect(path)
+
+    def create_session(self, resource, idn="", command="", start_time=None, settings=None):
+        """新建会话，返回会话 ID"""
+        cur = self.conn.execute(
+            "INSERT INTO sessions (resource, idn, command, start_time, settings) VALUES (?, ?, ?, ?, ?)",
+            (resource, idn, command, start_time if start_time is not None else clock.now(),
+             json.dumps(settings or {}, ensure_ascii=False))
+        )
+        self.conn.commit()
+        return cur.lastrowid
+
+    def list_sessions(self):
+        """返回全部会话（按开始时间倒序）的 dict 列表"""
+        cur = self.conn.execute(
+            "SELECT id, resource, idn, command, start_time, end_time, settings, sample_count "
+            "FROM sessions ORDER BY start_time DESC"
+        )
+        names = [d[0] for d in cur.description]
+        sessions = []
+        for row in cur.fetchall():
+            item = dict(zip(names, row))
+            item['settings'] = json.loads(item['settings'] or '{}')
+            sessions.append(item)
+        return sessions
+
+    def query_range(self, session_id, t0=None, t1=None, bucket=None):
+        """
+        查询会话在 [t0, t1] 内的数据
+
+        Args:
+            session_id: 会话 ID
+            t0, t1: 时间范围 (s，相对会话开始)，None 表示不限
+            bucket: 聚合桶宽度 (s)，给定时在数据库内按桶求平均/最小/最大
+
+        Returns:
+            bucket 为 None 时返回 (t, value)，否则返回 (t, mean, min, max)，均为 numpy 数组
+        """
+        t0 = -1e300 if t0 is None else t0
+        t1 = 1e300 if t1 is None else t1
+        if bucket:
+            rows = self.conn.execute(
+                "SELECT MIN(t), AVG(value), MIN(value), MAX(value) FROM samples "
+                "WHERE session_id = ? AND t BETWEEN ? AND ? "
+                "GROUP BY CAST(t / ? AS INTEGER) ORDER BY 1",
+                (session_id, t0, t1, bucket)
+            ).fetchall()
+            cols = np.array(rows, dtype=np.float64).reshape(-1, 4)
+            return cols[:, 0], cols[:, 1], cols[:, 2], cols[:, 3]
+
+        rows = self.conn.execute(
+            "SELECT t, value FROM samples WHERE session_id = ? AND t BETWEEN ? AND ? ORDER BY t",
+            (session_id, t0, t1)
+        ).fetchall()
+        cols = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return cols[:, 0], cols[:, 1]
+
+    def iter_samples(self, session_id, chunk_rows=65536):
+        """按时间顺序分块读取会话数据，逐块产出 (t, value) 数组"""
+        cur = self.conn.execute(
+            "SELECT t, value FROM samples WHERE session_id = ? ORDER BY t", (session_id,)
+        )
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            cols = np.array(rows, dtype=np.float64)
+            yield cols[:, 0], cols[:, 1]
+
+    def time_span(self, session_id):
+        """会话数据的 (最早, 最晚) 时间，无数据时为 (None, None)"""
+        return self.conn.execute(
+            "SELECT MIN(t), MAX(t) FROM samples WHERE session_id = ?", (session_id,)
+        ).fetchone()
+
+    def add_step_results(self, session_id, profile, results):
+        """记录测试配置的步骤结果（results 为 profiles.results_metadata() 的输出）"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO step_results (session_id, profile, step, name, t_start, t_end, passed, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(session_id, profile, r['step'], r['name'], r['t_start'], r['t_end'], int(r['passed']),
+                  json.dumps({k: r[k] for k in ('stats', 'replies', 'failures')}, ensure_ascii=False))
+                 for r in results]
+            )
+
+    def step_results(self, session_id):
+        """会话的步骤结果 dict 列表"""
+        cur = self.conn.execute(
+            "SELECT profile, step, name, t_start, t_end, passed, detail FROM step_results "
+            "WHERE session_id = ? ORDER BY rowid", (session_id,)
+        )
+        results = []
+        for profile, step, name, t_start, t_end, passed, detail in cur.fetchall():
+            item = {'profile': profile, 'step': step, 'name': name,
+                    't_start': t_start, 't_end': t_end, 'passed': bool(passed)}
+            item.update(json.loads(detail or '{}'))
+            results.append(item)
+        return results
+
+    def delete_session(self, session_id):
+        """删除会话及其数据"""
+        self.conn.execute("DELETE FROM step_results WHERE session_id = ?", (session_id,))
+        self.conn.execute("DELETE FROM samples WHERE session_id = ?", (session_id,))
+        self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self.conn.commit()
+
+    def close(self):
+        """关闭连接"""
+        self.conn.close()
+
+
+class SessionWriter(threading.Thread):
+    """
+    会话写入线程
+
+    采集端调用 put() 仅做入队；写线程攒批后在单个事务内 executemany，
+    达到 batch_size 行或距上次提交超过 flush_interval 秒时提交。
+    写入失败时线程结束并记录 error，之后 put() 不再入队，由调用方检查 error 并结束会话。
+    """
+
+    _STOP = object()
+    _FLUSH = object()
+
+    def __init__(self, session_id, path=DEFAULT_DB_PATH, batch_size=2000, flush_interval=1.0, compressor=None):
+        super().__init__(name=f"SessionWriter-{session_id}", daemon=True)
+        self.session_id = session_id
+        self.path = path
+        self.compressor = compressor    # compression.Compressor，为 None 时逐点记录
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.written = 0
+        self.error = None
+
+    def put(self, t, value):
+        """写入一个采样点（非阻塞）；启用压缩时只入队需要保存的点；写入已失败时丢弃"""
+        if self.error is not None:
+            return
+        if self.compressor is None:
+            self.queue.put((t, value))
+            return
+        for point in self.compressor.add(t, value):
+            self.queue.put(point)
+
+    def flush(self):
+        """请求尽快提交已入队的数据"""
+        self.queue.put(self._FLUSH)
+
+    def stop(self, end_time=None):
+        """提交剩余数据、记录结束时间并结束线程"""
+        if self.compressor is not None:
+            for point in self.compressor.flush():
+                self.queue.put(point)
+        self.queue.put((self._STOP, end_time if end_time is not None else clock.now()))
+        self.join()
+
+    def run(self):
+        conn = None
+        batch = []
+        last_commit = clock.monotonic()
+        end_time = None
+        try:
+            conn = connect(self.path)
+            while True:
+                timeout = max(0.0, self.flush_interval - (clock.monotonic() - last_commit))
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = self._FLUSH
+
+                if isinstance(item, tuple) and item[0] is self._STOP:
+                    end_time = item[1]
+                    break
+                if item is not self._FLUSH:
+                    batch.append((self.session_id,) + item)
+                    if (len(batch) < self.batch_size
+                            and clock.monotonic() - last_commit < self.flush_interval):
+                        continue
+
+                if batch:
+                    self._commit(conn, batch)
+                    batch = []
+                last_commit = clock.monotonic()
+
+            if batch:
+                self._commit(conn, batch)
+            conn.execute("UPDATE sessions SET end_time = ? WHERE id = ?", (end_time, self.session_id))
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            self.error = e
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit(self, conn, batch):
+        """单事务批量写入"""
+        with conn:
+            conn.executemany("INSERT INTO samples (session_id, t, value) VALUES (?, ?, ?)", batch)
+            conn.execute(
+                "UPDATE sessions SET sample_count = sample_count + ? WHERE id = ?",
+                (len(batch), self.session_id)
+            )
+        self.written += len(batch)
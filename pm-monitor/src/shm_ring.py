@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存环形缓冲区
+单生产者/单消费者（SPSC）的无锁样本传输：生产者先登记将要写到的序号，再写数据槽，最后发布写序号；
+消费者按自己的读序号取数，并在拷贝后按登记的序号复查，发现已被（或正在被）覆盖的数据
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# 头部：写序号、容量、魔数、停止标志、登记序号（正在写入的批次结束处）
+_HEADER_WORDS = 5
+_HEADER_BYTES = _HEADER_WORDS * 8
+_MAGIC = 0x504D52494E47   # "PMRING"
+
+
+def _attach(name):
+    """附加到已存在的共享内存（由创建方负责释放）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 没有 track 参数；子进程与创建方共用同一个 resource_tracker，
+        # 重复登记不会产生新条目，释放仍由创建方的 unlink() 完成
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedRing:
+    """共享内存中的 (t, value) 环形缓冲区"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((_HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        if owner:
+            capacity = (shm.size - _HEADER_BYTES) // 16
+            self._header[:] = (0, capacity, _MAGIC, 0, 0)
+        elif int(self._header[2]) != _MAGIC:
+            raise ValueError(f"共享内存 {shm.name} 不是样本环形缓冲区")
+        self.capacity = int(self._header[1])
+        self._t = np.ndarray((self.capacity,), dtype=np.float64, buffer=shm.buf, offset=_HEADER_BYTES)
+        self._v = np.ndarray((self.capacity,), dtype=np.float64, buffer=shm.buf,
+                             offset=_HEADER_BYTES + 8 * self.capacity)
+
+    @classmethod
+    def create(cls, capacity=65536):
+        """创建新的环形缓冲区（创建方负责 unlink）"""
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + 16 * int(capacity))
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """按名称附加"""
+        return cls(_attach(name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_seq(self):
+        """已写入的样本总数"""
+        return int(self._header[0])
+
+    def request_stop(self):
+        """消费者：请求生产者退出（不使用锁或信号量，生产者被强杀也不会卡住）"""
+        self._header[3] = 1
+
+    @property
+    def stop_requested(self):
+        return int(self._header[3]) != 0
+
+    def write(self, t, value):
+        """生产者：写入一个样本（先登记，再写数据，最后发布序号）"""
+        seq = int(self._header[0])
+        self._header[4] = seq + 1
+        i = seq % self.capacity
+        self._t[i] = t
+        self._v[i] = value
+        self._header[0] = seq + 1
+
+    def write_many(self, times, values):
+        """
+        生产者：写入一批样本，整批写完后一次发布序号
+        （超过容量时只保存最新的部分，序号仍按整批递增，消费者据此计入丢失数）
+        """
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        count = len(times)
+        if count == 0:
+            return
+        keep = min(count, self.capacity)
+        seq = int(self._header[0])
+        self._header[4] = seq + count
+        idx = np.arange(seq + count - keep, seq + count) % self.capacity
+        self._t[idx] = times[-keep:]
+        self._v[idx] = values[-keep:]
+        self._header[0] = seq + count
+
+    def read(self, read_seq, max_items=None):
+        """
+        消费者：读取 read_seq 之后的新样本
+
+        Returns:
+            (times, values, new_read_seq, lost)：lost 为因生产者追上而丢失的样本数
+        """
+        write_seq = int(self._header[0])
+        if write_seq <= read_seq:
+            return np.zeros(0), np.zeros(0), read_seq, 0
+
+        lost = 0
+        if write_seq - read_seq > self.capacity:
+            lost = write_seq - read_seq - self.capacity
+            read_seq = write_seq - self.capacity
+        if max_items is not None and write_seq - read_seq > max_items:
+            write_seq = read_seq + max_items
+
+        idx = np.arange(read_seq, write_seq) % self.capacity
+        times = self._t[idx]
+        values = self._v[idx]
+
+        # 拷贝期间生产者可能已绕回覆盖（或正在覆盖）最旧的槽，按登记序号丢弃这一部分
+        overwritten = int(self._header[4]) - self.capacity - read_seq
+        if overwritten > 0:
+            overwritten = min(overwritten, len(idx))
+            times = times[overwritten:]
+            values = values[overwritten:]
+            lost += overwritten
+        return times, values, write_seq, lost
+
+    def close(self):
+        """解除映射；创建方同时释放共享内存"""
+        self._header = self._t = self._v = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
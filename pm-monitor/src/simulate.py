@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+虚拟时钟长时间模拟
+在 offscreen Qt 平台上以虚拟时间运行完整的主窗口与模拟仪器：采集线程由 clock.VirtualClock 按虚拟时间驱动，
+界面每隔 flush_interval（虚拟秒）收到一批样本并刷新显示，24 小时的会话几十秒内完成。
+用于检查缓冲区回绕、汇总层、按小时能量、时间显示等长时间行为，并报告吞吐：
+
+    python src/simulate.py --hours 24 --interval 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import clock
+
+
+def _suppress_dialogs(dialogs):
+    """模拟期间把消息框改为记录到 dialogs（offscreen 下模态对话框会阻塞），返回恢复函数"""
+    from PyQt5.QtWidgets import QMessageBox
+
+    saved = {name: getattr(QMessageBox, name) for name in ('information', 'warning', 'critical')}
+
+    def record(name):
+        def show(parent, title, text, *args, **kwargs):
+            dialogs.append((name, title, text))
+            return QMessageBox.Ok
+        return staticmethod(show)
+
+    for name in saved:
+        setattr(QMessageBox, name, record(name))
+
+    def restore():
+        for name, method in saved.items():
+            setattr(QMessageBox, name, staticmethod(method))
+    return restore
+
+
+def simulate(hours=24.0, interval_ms=100, resource="MOCK::PowerMeter::1", flush_interval=10.0, progress=None,
+             step=3600.0):
+    """
+    以虚拟时间运行一次测量会话
+
+    Args:
+        hours: 模拟时长（小时）
+        interval_ms: 采样间隔
+        flush_interval: 界面接收样本与刷新的虚拟间隔 (s)
+        progress: 每模拟 step 秒调用 progress(虚拟秒, 实际耗时秒, 主窗口)
+
+    Returns:
+        dict：样本数、实际耗时、加速比、吞吐，以及会话结束时的界面与存储状态
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from main_window import PMMonitorMainWindow
+
+    dialogs = []
+    restore_dialogs = _suppress_dialogs(dialogs)
+    virtual = clock.install(clock.VirtualClock(flush_interval=flush_interval))
+    try:
+        window = PMMonitorMainWindow()
+        window.combo_visa_resources.setEditText(resource)
+        window.connect_visa_device()
+        window.spin_sample_rate.setValue(interval_ms)
+        window.start_measurement()
+        if not window.is_measuring:
+            raise RuntimeError(f"无法开始测量: {dialogs[-1] if dialogs else resource}")
+
+        duration = hours * 3600.0
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        while virtual.now < duration:
+            virtual.run_until(min(virtual.now + step, duration))
+            app.processEvents()
+            if progress is not None:
+                progress(virtual.now, time.perf_counter() - wall_start, window)
+        window.stop_measurement()
+        app.processEvents()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        store = window.rollup_store
+        result = {
+            'simulated_s': duration,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'speedup': duration / wall if wall > 0 else 0.0,
+            'samples': window.sample_count,
+            'samples_per_s': window.sample_count / wall if wall > 0 else 0.0,
+            'tasks': virtual.executed,
+            'elapsed_label': window.lbl_time_value.text(),
+            'window_samples': len(window.data_buffer),
+            'raw_samples': len(store.raw),
+            'raw_dropped': store.raw.dropped,
+            'rollup_buckets': {f"{tier.width:g}s": len(tier.series) for tier in store.tiers},
+            'energy_wh': window.energy.total_wh,
+            'dialogs': dialogs,
+        }
+        window.close()
+    finally:
+        clock.install(clock.SystemClock())
+        restore_dialogs()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PM-Monitor 虚拟时钟长时间模拟与吞吐测试")
+    parser.add_argument('--hours', type=float, default=24.0, help="模拟时长（小时）")
+    parser.add_argument('--interval', type=int, default=100, help="采样间隔 (ms)")
+    parser.add_argument('--resource', default="MOCK::PowerMeter::1", help="模拟仪器资源")
+    parser.add_argument('--flush', type=float, default=10.0, help="界面刷新的虚拟间隔 (s)")
+    args = parser.parse_args()
+
+    def progress(simulated, wall, window):
+        print(f"  {simulated / 3600:5.1f} h  ({wall:.1f} s)", flush=True)
+
+    result = simulate(args.hours, args.interval, args.resource, args.flush, progress)
+    print(f"模拟 {result['simulated_s'] / 3600:g} h，耗时 {result['wall_s']:.1f} s（CPU {result['cpu_s']:.1f} s），"
+          f"加速 {result['speedup']:.0f}x")
+    print(f"样本 {result['samples']}，吞吐 {result['samples_per_s']:.0f} 样本/s，调度任务 {result['tasks']}")
+    print(f"时间显示 {result['elapsed_label']}，实时窗口 {result['window_samples']} 点，"
+          f"原始存储 {result['raw_samples']} 点（淘汰 {result['raw_dropped']}）")
+    print("汇总层: " + "，".join(f"{k} {v} 桶" for k, v in result['rollup_buckets'].items()))
+    print(f"能量 {result['energy_wh']:.3f} Wh")
+
+
+if __name__ == '__main__':
+    main()
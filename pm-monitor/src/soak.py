@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浸泡测试（内存剖析与泄漏检查）
+在虚拟时钟下（见 simulate.py）以高采样率长时间驱动模拟仪器与完整主窗口，定期记录：
+    - 进程 RSS 与 tracemalloc 跟踪的 Python 分配
+    - 缓冲区、曲线点数、标签等各部件的大小
+预热之后的部件大小应保持不变、内存应持平；增长超过阈值时判为失败，并列出与基线相比增长最多的分配位置。
+结果写入 JSON 报告（含版本信息），便于不同版本之间对比：
+
+    python src/soak.py --hours 1 --interval 1 --report logs/soak.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import simulate
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+
+MB = 1024 * 1024
+
+# 部件大小允许的增长：基线 × (1 + SIZE_TOLERANCE) + SIZE_SLACK
+# （标签文本长度会随计数位数等略有变化）
+SIZE_TOLERANCE = 0.1
+SIZE_SLACK = 8
+
+TOP_ALLOCATIONS = 10
+
+
+def rss_bytes():
+    """当前进程的常驻内存 (bytes)，无法获取时为 None"""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def version_info():
+    """报告中的版本信息：git 提交（可用时）、Python 与平台"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=root,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'psutil': HAS_PSUTIL,
+    }
+
+
+def component_sizes(window):
+    """
+    主窗口各部件的大小：缓冲区样本数、曲线点数、标签数与文本长度，以及会话事件数
+
+    buffer.* / curve.* / label.* 预热后应保持不变（环形存储以容量为上限，见 component_limits）；
+    events.* 随事件增长，检查不超过保留上限（没有上限时与其他部件一样不得持续增长）
+    """
+    import pyqtgraph as pg
+    from PyQt5.QtWidgets import QLabel
+
+    sizes = {
+        'buffer.data': len(window.data_buffer),
+        'buffer.time': len(window.time_buffer),
+        'buffer.window_quantiles': len(window.window_quantiles),
+        'buffer.window_histogram': len(window.window_histogram),
+        'buffer.derived': sum(len(b) for b in window.derived_buffers.values()),
+        'buffer.rollup_raw': len(window.rollup_store.raw),
+    }
+    for tier in window.rollup_store.tiers:
+        sizes[f"buffer.rollup_{tier.width:g}s"] = len(tier.series)
+    for name, item in sorted(vars(window).items()):
+        if isinstance(item, pg.PlotDataItem):
+            sizes[f"curve.{name}"] = 0 if item.xData is None else len(item.xData)
+    sizes['curve.plot_items'] = len(window.plot_widget.getPlotItem().items)
+    labels = window.findChildren(QLabel)
+    sizes['label.count'] = len(labels)
+    sizes['label.text'] = sum(len(label.text()) for label in labels)
+    sizes['events.capture'] = len(window.capture_events)
+    sizes['events.detection'] = len(window.detection_events)
+    return sizes
+
+
+def component_limits(window):
+    """按容量预分配的环形存储与定长事件队列：填满之前会增长，只检查不超过容量"""
+    store = window.rollup_store
+    limits = {'buffer.rollup_raw': store.raw.capacity}
+    for tier in store.tiers:
+        limits[f"buffer.rollup_{tier.width:g}s"] = tier.series.capacity
+    limits['events.capture'] = window.capture_events.maxlen
+    limits['events.detection'] = window.detection_events.maxlen
+    return limits
+
+
+# 不计入增长排行的分配位置（tracemalloc 自身与导入机制）
+_IGNORED_FILES = frozenset((tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                            '<frozen importlib._bootstrap_external>'))
+
+
+def top_growth(snapshot, baseline, limit=TOP_ALLOCATIONS):
+    """
+    与基线快照相比增长最多的分配位置
+
+    先按行比较再剔除忽略的位置：Snapshot.filter_traces() 逐条过滤全部分配记录（数十万条），
+    比较后的统计只有几千条
+    """
+    top = []
+    for stat in snapshot.compare_to(baseline, 'lineno'):
+        frame = stat.traceback[0]
+        if frame.filename in _IGNORED_FILES:
+            continue
+        top.append({
+            'location': f"{frame.filename}:{frame.lineno}",
+            'size_diff_kb': stat.size_diff / 1024,
+            'count_diff': stat.count_diff,
+            'size_kb': stat.size / 1024,
+        })
+        if len(top) >= limit:
+            break
+    return top
+
+
+def check_sizes(baseline, final, limits):
+    """返回超出允许增长（或容量）的部件：[(名称, 基线, 结束)]"""
+    grown = []
+    for name, value in final.items():
+        if name not in baseline:
+            continue
+        limit = limits.get(name)
+        if limit is not None:
+            if value > limit:
+                grown.append((name, baseline[name], value))
+        elif value > baseline[name] * (1 + SIZE_TOLERANCE) + SIZE_SLACK:
+            grown.append((name, baseline[name], value))
+    return grown
+
+
+def soak(hours=1.0, interval_ms=1, sample_minutes=5.0, warmup=0.25, threshold_mb=10.0, rss_threshold_mb=50.0,
+         resource="MOCK::PowerMeter::1", flush_interval=1.0, progress=None):
+    """
+    运行一次浸泡测试
+
+    Args:
+        hours: 模拟时长（小时）
+        interval_ms: 采样间隔（越小压力越大）
+        sample_minutes: 记录内存与部件大小的虚拟间隔（分钟）
+        warmup: 预热占总时长的比例，预热结束时的记录作为基线
+        threshold_mb: tracemalloc 跟踪内存相对基线的允许增长 (MB)
+        rss_threshold_mb: RSS 相对基线的允许增长 (MB)
+        progress: 每次记录后调用 progress(记录)
+
+    Returns:
+        报告 dict，'passed' 为是否通过，'failures' 为失败原因
+    """
+    warmup_s = hours * 3600.0 * warmup
+    samples = []
+    state = {'baseline': None, 'snapshot': None, 'limits': {}}
+    started = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    def record(simulated, wall, window):
+        traced, peak = tracemalloc.get_traced_memory()
+        rss = rss_bytes()
+        entry = {
+            'simulated_s': simulated,
+            'wall_s': wall,
+            'samples': window.sample_count,
+            'traced_mb': traced / MB,
+            'traced_peak_mb': peak / MB,
+            'rss_mb': None if rss is None else rss / MB,
+            'sizes': component_sizes(window),
+        }
+        samples.append(entry)
+        if state['baseline'] is None and simulated >= warmup_s:
+            state['baseline'] = entry
+            state['snapshot'] = tracemalloc.take_snapshot()
+        state['limits'] = component_limits(window)
+        if progress is not None:
+            progress(entry)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        result = simulate.simulate(hours, interval_ms, resource, flush_interval, record, step=sample_minutes * 60.0)
+        final_snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    baseline = state['baseline'] or samples[0]
+    final = samples[-1]
+    traced_growth = final['traced_mb'] - baseline['traced_mb']
+    rss_growth = None
+    if final['rss_mb'] is not None and baseline['rss_mb'] is not None:
+        rss_growth = final['rss_mb'] - baseline['rss_mb']
+
+    failures = []
+    if traced_growth > threshold_mb:
+        failures.append(f"Python 分配增长 {traced_growth:.2f} MB，超过阈值 {threshold_mb:g} MB")
+    if rss_growth is not None and rss_growth > rss_threshold_mb:
+        failures.append(f"RSS 增长 {rss_growth:.2f} MB，超过阈值 {rss_threshold_mb:g} MB")
+    for name, before, after in check_sizes(baseline['sizes'], final['sizes'], state['limits']):
+        failures.append(f"{name} 从 {before} 增长到 {after}")
+
+    top = [] if state['snapshot'] is None else top_growth(final_snapshot, state['snapshot'])
+
+    result = dict(result, dialogs=[list(d) for d in result['dialogs']])
+    return {
+        'version': version_info(),
+        'started': started,
+        'parameters': {
+            'hours': hours,
+            'interval_ms': interval_ms,
+            'sample_minutes': sample_minutes,
+            'warmup': warmup,
+            'threshold_mb': threshold_mb,
+            'rss_threshold_mb': rss_threshold_mb,
+            'resource': resource,
+            'flush_interval': flush_interval,
+        },
+        'simulation': result,
+        'baseline_s': baseline['simulated_s'],
+        'traced_growth_mb': traced_growth,
+        'rss_growth_mb': rss_growth,
+        'limits': state['limits'],
+        'samples': samples,
+        'top_allocations': top,
+        'failures': failures,
+        'passed': not failures,
+    }
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PM-Monitor 浸泡测试：内存剖析与泄漏检查")
+    parser.add_argument('--hours', type=float, default=1.0, help="模拟时长（小时）")
+    parser.add_argument('--interval', type=int, default=1, help="采样间隔 (ms)")
+    parser.add_argument('--sample-minutes', type=float, default=5.0, help="记录间隔（虚拟分钟）")
+    parser.add_argument('--warmup', type=float, default=0.25, help="预热占总时长的比例")
+    parser.add_argument('--threshold-mb', type=float, default=10.0, help="Python 分配允许增长 (MB)")
+    parser.add_argument('--rss-threshold-mb', type=float, default=50.0, help="RSS 允许增长 (MB)")
+    parser.add_argument('--resource', default="MOCK::PowerMeter::1", help="模拟仪器资源")
+    parser.add_argument('--report', default=None, help="报告路径（默认 logs/soak_<时间>.json）")
+    args = parser.parse_args()
+
+    def progress(entry):
+        rss = "-" if entry['rss_mb'] is None else f"{entry['rss_mb']:.1f}"
+        print(f"  {entry['simulated_s'] / 3600:6.2f} h  样本 {entry['samples']}  "
+              f"Python {entry['traced_mb']:.2f} MB  RSS {rss} MB  ({entry['wall_s']:.1f} s)", flush=True)
+
+    report = soak(args.hours, args.interval, args.sample_minutes, args.warmup, args.threshold_mb,
+                  args.rss_threshold_mb, args.resource, progress=progress)
+    path = args.report or os.path.join('logs', time.strftime('soak_%Y%m%d_%H%M%S.json'))
+    write_report(report, path)
+
+    rss = "-" if report['rss_growth_mb'] is None else f"{report['rss_growth_mb']:+.2f}"
+    print(f"基线 {report['baseline_s'] / 3600:.2f} h 起：Python {report['traced_growth_mb']:+.2f} MB，RSS {rss} MB")
+    if report['passed']:
+        print(f"通过，报告: {path}")
+        return 0
+    for failure in report['failures']:
+        print(f"失败: {failure}")
+    print("增长最多的分配:")
+    for stat in report['top_allocations']:
+        print(f"  {stat['size_diff_kb']:+10.1f} KB  {stat['count_diff']:+7d}  {stat['location']}")
+    print(f"报告: {path}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
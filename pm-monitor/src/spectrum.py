@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+功率信号频谱分析
+对环形缓冲区数据做 Welch 功率谱密度估计（numpy 实现），用于识别工频/开关纹波；
+计算在独立线程中进行，只保留最新一次请求，界面线程不等待
+"""
+
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+# 采样间隔超过中位间隔的此倍数视为采集中断（暂停 / 恢复），只分析中断后的连续段
+GAP_FACTOR = 10.0
+
+
+def resample_uniform(times, values, gap_factor=GAP_FACTOR, max_points=1 << 20):
+    """
+    把采样时间有抖动的序列线性插值到均匀网格
+
+    只使用最后一个连续段：跨越暂停间隙插值既没有意义，也会按中位间隔生成巨大的网格。
+    网格点数不超过 max_points（超出时保留最新的部分）
+
+    Returns:
+        (values, fs)：均匀采样值与采样率 (Hz)；数据不足时 fs 为 0
+    """
+    t = np.asarray(times, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64)
+    if len(t) < 4:
+        return v, 0.0
+    diffs = np.diff(t)
+    dt = float(np.median(diffs))
+    if dt <= 0:
+        return v, 0.0
+    gaps = np.flatnonzero(diffs > gap_factor * dt)
+    if len(gaps):
+        t = t[gaps[-1] + 1:]
+        v = v[gaps[-1] + 1:]
+        if len(t) < 4:
+            return v, 0.0
+        dt = float(np.median(np.diff(t)))
+        if dt <= 0:
+            return v, 0.0
+    n = min(int((t[-1] - t[0]) / dt + 1e-6) + 1, int(max_points))
+    grid = t[-1] - dt * np.arange(n - 1, -1, -1)
+    return np.interp(grid, t, v), 1.0 / dt
+
+
+def welch_psd(values, fs, nperseg=256, overlap=0.5):
+    """
+    Welch 功率谱密度（Hann 窗，去均值，单边谱）
+
+    Args:
+        values: 均匀采样序列
+        fs: 采样率 (Hz)
+        nperseg: 每段长度（超过数据长度时取数据长度）
+        overlap: 段重叠比例
+
+    Returns:
+        (freqs, psd)：频率 (Hz) 与功率谱密度 (W²/Hz)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    nperseg = min(nperseg, len(x))
+    if nperseg < 4 or fs <= 0:
+        return np.zeros(0), np.zeros(0)
+
+    step = max(1, int(nperseg * (1 - overlap)))
+    starts = np.arange(0, len(x) - nperseg + 1, step)
+    # 所有分段一次性组成二维数组，向量化做 FFT
+    segments = x[starts[:, None] + np.arange(nperseg)]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+
+    window = np.hanning(nperseg)
+    spectra = np.fft.rfft(segments * window, axis=1)
+    psd = (np.abs(spectra) ** 2).mean(axis=0) / (fs * (window ** 2).sum())
+    # 单边谱：除直流和奈奎斯特频点外乘 2
+    if nperseg % 2 == 0:
+        psd[1:-1] *= 2
+    else:
+        psd[1:] *= 2
+    return np.fft.rfftfreq(nperseg, 1.0 / fs), psd
+
+
+def dominant_frequency(freqs, psd):
+    """功率谱中除直流外的最大峰频率 (Hz)；没有时返回 None"""
+    if len(psd) < 2:
+        return None
+    return float(freqs[1 + int(np.argmax(psd[1:]))])
+
+
+class SpectrumWorker(QThread):
+    """
+    频谱计算线程
+
+    submit() 只替换待算数据并唤醒线程；计算期间到达的多次请求只保留最新一次。
+    """
+
+    result_ready = pyqtSignal(object, object, object)   # freqs, psd, 峰值频率
+
+    def __init__(self, nperseg=256, parent=None):
+        super().__init__(parent)
+        self.nperseg = nperseg
+        self._cond = threading.Condition()
+        self._job = None
+        self._running = False
+        self.busy = False
+
+    def submit(self, times, values):
+        """提交一次计算（times、values 应为拷贝）"""
+        with self._cond:
+            self._job = (times, values)
+            self._cond.notify()
+
+    def run(self):
+        self._running = True
+        while True:
+            with self._cond:
+                while self._job is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                times, values = self._job
+                self._job = None
+                self.busy = True
+
+            try:
+                uniform, fs = resample_uniform(times, values)
+                freqs, psd = welch_psd(uniform, fs, self.nperseg)
+                self.result_ready.emit(freqs, psd, dominant_frequency(freqs, psd))
+            except Exception as e:
+                print(f"频谱计算错误: {e}")
+            finally:
+                self.busy = False
+
+    def stop(self):
+        """停止线程"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
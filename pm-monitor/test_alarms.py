@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报警引擎测试
+持续时间 / 回差判定，以及测量中重置数据（时间轴回到零点）后规则状态随之清除；
+停止时不等待慢速输出，外部命令按参数列表执行、不经过 shell
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from acquisition import AcquisitionWorker
+from alarms import AlarmEngine, AlarmEvent, CommandSink, ThresholdRule, make_hook
+
+
+def feed(worker, t0, t1, value, step=0.1):
+    """按 step 逐点送入 [t0, t1) 的恒定值，返回产生的事件"""
+    n = int(round((t1 - t0) / step))
+    for i in range(n):
+        worker.process_sample(t0 + i * step, value)
+    events, worker._events = worker._events, []
+    worker._samples = []
+    return events
+
+
+def test_duration_and_hysteresis():
+    """超限持续 duration 秒后触发，回落到回差以下才恢复"""
+    worker = AcquisitionWorker(None, 'MEAS:POW?', 100, 0.0)
+    worker.add_stage(AlarmEngine([ThresholdRule("上限", 60.0, hysteresis=2.0, duration=1.0)]))
+    assert feed(worker, 0.0, 0.95, 65.0) == []
+    events = feed(worker, 0.95, 1.1, 65.0, step=0.05)
+    assert [e.kind for e in events] == ['raise'] and abs(events[0].t - 1.0) < 1e-9
+    assert feed(worker, 1.1, 2.0, 59.0) == []
+    assert [e.kind for e in feed(worker, 2.0, 2.1, 57.0)] == ['clear']
+    print("✓ 持续时间与回差判定正确")
+
+
+def test_reset_while_overloaded():
+    """超限进行中重置：规则从新时间零点重新计时，不沿用旧的起始时刻"""
+    engine = AlarmEngine([ThresholdRule("上限", 60.0, duration=2.0)])
+    worker = AcquisitionWorker(None, 'MEAS:POW?', 100, 0.0)
+    worker.add_stage(engine)
+    assert feed(worker, 100.0, 101.0, 65.0) == []
+
+    worker.reset_stage(engine)
+    assert feed(worker, 0.0, 1.95, 65.0, step=0.05) == []
+    events = feed(worker, 1.95, 2.1, 65.0, step=0.05)
+    assert [e.kind for e in events] == ['raise'] and abs(events[0].t - 2.0) < 1e-9
+    print("✓ 重置后超限持续时间从新零点计算")
+
+
+def test_close_does_not_block():
+    """close() 立即返回，慢速输出在后台分发完毕；之后的事件由新的分发线程处理"""
+    delivered = []
+    release = threading.Event()
+
+    def slow_sink(event, context):
+        release.wait(5)
+        delivered.append(event.t)
+
+    engine = AlarmEngine([ThresholdRule("上限", 60.0)], [slow_sink])
+    engine.process(0.0, 65.0)
+    engine.process(0.1, 50.0)
+    started = time.monotonic()
+    assert engine.close() is False
+    assert time.monotonic() - started < 0.1
+    assert engine.close() is True    # 已关闭时直接返回
+
+    engine.process(0.2, 65.0)
+    release.set()
+    assert engine.close(timeout=5.0) is True
+    deadline = time.monotonic() + 5
+    while len(delivered) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(delivered) == [0.0, 0.1, 0.2]
+    print("✓ 停止时不等待慢速输出，剩余事件在后台分发")
+
+
+def test_command_sink_argv():
+    """命令按参数列表执行：引号内空格保留，shell 元字符不生效，事件内容经环境变量传入"""
+    if os.name == 'nt':
+        print("- 命令钩子测试需要 POSIX，跳过")
+        return
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, 'out dir')
+        os.mkdir(out)
+        marker = os.path.join(d, 'injected')
+        script = os.path.join(d, 'hook.py')
+        with open(script, 'w', encoding='utf-8') as f:
+            f.write("import os, sys\n"
+                    "path = os.path.join(sys.argv[1], 'args')\n"
+                    "with open(path + '.tmp', 'w') as f:\n"
+                    "    f.write('|'.join(sys.argv[2:]) + '\\n' + os.environ['PM_ALARM_KIND'])\n"
+                    "os.replace(path + '.tmp', path)\n")
+        sink = make_hook(f"{sys.executable} {script} '{out}' '; touch {marker}' $HOME")
+        assert isinstance(sink, CommandSink) and len(sink.argv) == 5
+        sink(AlarmEvent(1.0, 65.0, "上限", 'raise', "上限: 65"), {'resource': 'MOCK'})
+        path = os.path.join(out, 'args')
+        deadline = time.monotonic() + 10
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with open(path) as f:
+            assert f.read() == f"; touch {marker}|$HOME\nraise"
+        assert not os.path.exists(marker)
+    try:
+        make_hook("notify 'unterminated")
+        assert False, "引号不配对应报错"
+    except ValueError:
+        pass
+    print("✓ 命令钩子按参数列表执行")
+
+
+if __name__ == '__main__':
+    test_duration_and_hysteresis()
+    test_reset_while_overloaded()
+    test_close_does_not_block()
+    test_command_sink_argv()
+    print("\n全部通过")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享总线调度测试
+按资源分组到 GPIB / ASRL 总线，轮询与优先级调度在总线饱和时的分配，以及经 INTFC 会话的组触发。
+调度循环在虚拟时钟下逐步调用（模拟仪器的总线传输耗时推进虚拟时间），结果确定
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import clock
+from bus_scheduler import (SCHEDULE_PRIORITY, SCHEDULE_ROUND_ROBIN, BusMember, BusScheduler, bus_key,
+                           group_by_bus, open_group_trigger)
+from drivers import SingleQuery
+from mock_visa import MockInstrument, MockResourceManager
+
+
+def make_members(bus, count, interval, trigger_fetch=None):
+    return [BusMember(i, MockInstrument(f"MOCK::{bus}::{10 + i}"), SingleQuery('MEAS:POW?'), interval,
+                      priority=i, trigger_fetch=trigger_fetch)
+            for i in range(count)]
+
+
+def run_scheduler(scheduler, seconds):
+    """按 run() 的逻辑在虚拟时间内调度 seconds 秒，返回 通道 -> [(t, value), ...]"""
+    virtual = clock.install(clock.VirtualClock(epoch=0.0))
+    try:
+        scheduler.start_time = 0.0
+        for member in scheduler.members:
+            member.next_due = 0.0
+        if scheduler.trigger is not None:
+            scheduler.members[0].interval = max(m.interval for m in scheduler.members)
+        received = {}
+        scheduler.channel_samples.connect(lambda ch, samples: received.setdefault(ch, []).extend(samples))
+        poll = scheduler._poll_triggered if scheduler.trigger is not None else scheduler._poll
+        while virtual.now < seconds:
+            count, wake = poll(virtual.now)
+            if not count:
+                virtual.sleep(max(wake - virtual.now, 1e-6))
+        scheduler.flush()
+        return received
+    finally:
+        clock.install(clock.SystemClock())
+
+
+def test_grouping():
+    """GPIB / ASRL 资源按总线分组，LAN / USB 各自独立"""
+    assert bus_key("GPIB0::12::INSTR") == 'GPIB0'
+    assert bus_key("GPIB::5::INSTR") == 'GPIB0'
+    assert bus_key("gpib1::3::instr") == 'GPIB1'
+    assert bus_key("ASRL3::INSTR") == 'ASRL3'
+    assert bus_key("MOCK::GPIB0::12") == 'GPIB0'
+    assert bus_key("TCPIP0::192.168.1.5::INSTR") is None
+    assert bus_key("USB0::0x0957::0x2C18::MY1234::INSTR") is None
+    resources = ["GPIB0::12::INSTR", "TCPIP0::10.0.0.2::INSTR", "ASRL3::INSTR", "GPIB0::13::INSTR",
+                 "ASRL4::INSTR", "ASRL3::INSTR", "MOCK::PowerMeter::1"]
+    buses, parallel = group_by_bus(resources)
+    assert buses == {'GPIB0': [0, 3], 'ASRL3': [2, 5], 'ASRL4': [4]}
+    assert parallel == [1, 6]
+    print("✓ 按总线分组正确")
+
+
+def test_round_robin_order():
+    """全部到期时按固定顺序轮流服务，不到期的跳过"""
+    scheduler = BusScheduler('GPIB0', make_members('GPIB0', 3, 0.0), 0.0, SCHEDULE_ROUND_ROBIN)
+    order = [scheduler._next_member(0.0).channel for _ in range(7)]
+    assert order == [0, 1, 2, 0, 1, 2, 0]
+    scheduler.members[2].next_due = 10.0
+    assert [scheduler._next_member(0.0).channel for _ in range(4)] == [1, 0, 1, 0]
+    for member in scheduler.members:
+        member.next_due = 10.0
+    assert scheduler._next_member(0.0) is None
+    print("✓ 轮询顺序正确")
+
+
+def test_saturated_bus():
+    """总线饱和时：轮询各表等比例降速；优先级模式先满足高优先级"""
+    # 每次事务 2 ms（总线上限 500 Sa/s），三台各要求 250 Sa/s
+    counts = {}
+    for mode in (SCHEDULE_ROUND_ROBIN, SCHEDULE_PRIORITY):
+        scheduler = BusScheduler('GPIB0', make_members('GPIB0', 3, 0.004), 0.0, mode)
+        received = run_scheduler(scheduler, 2.0)
+        counts[mode] = [len(received.get(ch, [])) for ch in range(3)]
+        for samples in received.values():
+            assert all(b[0] > a[0] for a, b in zip(samples, samples[1:]))
+    total = sum(counts[SCHEDULE_ROUND_ROBIN])
+    assert 950 <= total <= 1001
+    assert max(counts[SCHEDULE_ROUND_ROBIN]) - min(counts[SCHEDULE_ROUND_ROBIN]) <= 2
+    high, mid, low = counts[SCHEDULE_PRIORITY]
+    assert high >= 495 and mid >= 495 and low <= 10, counts
+    print(f"✓ 饱和总线：轮询 {counts[SCHEDULE_ROUND_ROBIN]}，优先级 {counts[SCHEDULE_PRIORITY]}")
+
+
+def test_group_trigger():
+    """GPIB 组触发：一次 GET 后逐台读取，各表同一时刻；ASRL 不支持组触发"""
+    rm = MockResourceManager()
+    assert open_group_trigger(rm, 'ASRL3') is None
+    trigger = open_group_trigger(rm, 'GPIB0')
+    assert trigger is not None and trigger.resource_name == 'GPIB0::INTFC'
+
+    # 有成员不支持组触发时不使用
+    members = make_members('GPIB0', 3, 0.05, trigger_fetch='FETC?')
+    members[1].trigger_fetch = None
+    assert not BusScheduler('GPIB0', members, 0.0, trigger=trigger).group_triggered
+
+    members = make_members('GPIB0', 3, 0.05, trigger_fetch='FETC?')
+    members[2].interval = 0.1
+    scheduler = BusScheduler('GPIB0', members, 0.0, SCHEDULE_PRIORITY, trigger=trigger)
+    assert scheduler.group_triggered and scheduler.instruments[-1] is trigger
+    received = run_scheduler(scheduler, 1.0)
+    times = [[t for t, _ in received[ch]] for ch in range(3)]
+    assert times[0] == times[1] == times[2]
+    # 按最慢仪器的周期整体触发
+    assert 9 <= len(times[0]) <= 11
+    assert all(abs((b - a) - 0.1) < 0.01 for a, b in zip(times[0], times[0][1:]))
+    print(f"✓ 组触发 {len(times[0])} 次，三台时间戳一致")
+
+
+if __name__ == '__main__':
+    test_grouping()
+    test_round_robin_order()
+    test_saturated_bus()
+    test_group_trigger()
+    print("\n全部通过")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+瞬态事件捕获测试
+预触发 / 后触发样本、抑制时间，以及捕获进行中重置
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from capture import TRIGGER_RISING, TriggerCapture
+
+
+def run(capture, times, values):
+    events = []
+    for t, v in zip(times, values):
+        events.extend(capture.process(t, v) or [])
+    return events
+
+
+def test_pre_post_samples():
+    """上升沿触发保存 N 个预触发与 M 个后触发样本，按时间顺序"""
+    capture = TriggerCapture(TRIGGER_RISING, level=60.0, pre_samples=10, post_samples=20, holdoff=5.0)
+    t = np.arange(200) * 0.1
+    v = np.where((t >= 5.0) & (t < 6.0), 70.0, 50.0)
+    v[(t >= 8.0) & (t < 8.5)] = 70.0    # 抑制时间内，不触发
+    v[t >= 15.0] = 70.0
+    events = run(capture, t, v)
+    assert [e.index for e in events] == [1, 2]
+    first = events[0]
+    assert first.pre_count == 10 and len(first.times) == 30
+    assert abs(first.trigger_time - 5.0) < 1e-9
+    assert first.values[first.pre_count] == 70.0 and first.values[first.pre_count - 1] == 50.0
+    assert np.all(np.diff(first.times) > 0)
+    assert abs(events[1].trigger_time - 15.0) < 1e-9
+    print("✓ 预触发 / 后触发样本与抑制时间正确")
+
+
+def test_reset_during_capture():
+    """捕获进行中重置：丢弃未完成的捕获与旧的预触发样本，编号重新开始"""
+    capture = TriggerCapture(TRIGGER_RISING, level=60.0, pre_samples=5, post_samples=50)
+    run(capture, [0.0, 0.1, 0.2], [50.0, 50.0, 70.0])
+    capture.reset()
+    events = run(capture, np.arange(100) * 0.1, [70.0] * 100)
+    assert events == []
+    events = run(capture, [10.0, 10.1] + list(10.2 + np.arange(60) * 0.1), [50.0, 50.0] + [70.0] * 60)
+    assert len(events) == 1 and events[0].index == 1
+    assert events[0].times[0] >= 9.6    # 预触发样本都来自重置之后
+    print("✓ 捕获进行中重置后重新开始")
+
+
+if __name__ == '__main__':
+    test_pre_post_samples()
+    test_reset_during_capture()
+    print("\n全部通过")
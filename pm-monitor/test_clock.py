@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+虚拟时钟测试
+本地采集线程按虚拟时间取样，时间戳与采样间隔一致；不能按虚拟时间驱动的线程被拒绝
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import clock
+from acquisition import AcquisitionWorker, ProcessAcquisitionWorker, RemoteAcquisitionWorker, ReplayWorker
+from bus_scheduler import BusScheduler
+
+
+class ConstantInstrument:
+    def query(self, command):
+        return "50.0"
+
+
+def test_virtual_worker():
+    """采集线程由调度器按虚拟时间驱动，样本时间为虚拟时间"""
+    virtual = clock.install(clock.VirtualClock(epoch=1000.0))
+    try:
+        worker = AcquisitionWorker(ConstantInstrument(), 'MEAS:POW?', 100, clock.now())
+        batches = []
+        worker.samples_ready.connect(batches.append)
+        clock.start_worker(worker)
+        virtual.run_for(10.0)
+        worker._running = False
+        virtual.run_for(1.0)
+        times = [t for batch in batches for t, _ in batch]
+        assert len(times) == 101
+        assert all(abs(t - 0.1 * i) < 1e-9 for i, t in enumerate(times))
+    finally:
+        clock.install(clock.SystemClock())
+    print("✓ 虚拟时钟下按 100 ms 间隔取样")
+
+
+def test_rejects_unsupported_workers():
+    """总线调度、回放、采集进程与远程订阅线程不能交给虚拟时钟"""
+    for cls in (ProcessAcquisitionWorker, RemoteAcquisitionWorker, ReplayWorker, BusScheduler):
+        assert cls.virtual_clock is False
+    virtual = clock.VirtualClock()
+    try:
+        virtual.start_worker(BusScheduler('GPIB0', [], 0.0))
+        assert False, "应拒绝总线调度线程"
+    except ValueError:
+        pass
+    assert virtual._tasks == []
+    print("✓ 不支持的采集线程被拒绝")
+
+
+if __name__ == '__main__':
+    test_virtual_worker()
+    test_rejects_unsupported_workers()
+    print("\n全部通过")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有损有界压缩测试
+两种算法由保存点重建的误差不超过容差，稳态信号有可观的压缩比，逐点接口与整段接口一致
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from compression import COMPRESSION_METHODS, METHOD_DEADBAND, METHOD_SWINGING_DOOR, Compressor, compress, reconstruct
+
+
+def signals():
+    rng = np.random.default_rng(7)
+    t = np.cumsum(rng.uniform(0.05, 0.15, 20000))
+    steady = 50 + rng.normal(0, 0.02, len(t))
+    steps = np.where((t % 300) < 150, 20.0, 80.0) + rng.normal(0, 0.05, len(t))
+    ramp = 10 + 0.01 * t + 2 * np.sin(t / 30) + rng.normal(0, 0.2, len(t))
+    return t, {'稳态': steady, '阶跃': steps, '斜坡': ramp}
+
+
+def test_error_within_tolerance():
+    """重建误差 ≤ 容差，首末点保留，保存点数值与原始样本之差 ≤ 容差"""
+    t, data = signals()
+    for method in COMPRESSION_METHODS:
+        for tolerance in (0.05, 0.5):
+            for name, v in data.items():
+                indices, kept = compress(t, v, method, tolerance)
+                assert indices[0] == 0 and indices[-1] == len(t) - 1
+                assert np.all(np.diff(indices) > 0)
+                assert np.max(np.abs(kept - v[indices])) <= tolerance + 1e-9
+                error = np.max(np.abs(reconstruct(t[indices], kept, t, method) - v))
+                assert error <= tolerance + 1e-9, (method, tolerance, name, error)
+        print(f"✓ {method} 重建误差不超过容差")
+
+
+def test_ratio():
+    """噪声低于容差的稳态段只保存首末两点；缓变信号上旋转门比死区保存更少的点"""
+    t, data = signals()
+    for method in COMPRESSION_METHODS:
+        assert len(compress(t, data['稳态'], method, 0.1)[0]) == 2
+    counts = {m: len(compress(t, data['斜坡'], m, 0.5)[0]) for m in COMPRESSION_METHODS}
+    assert counts[METHOD_SWINGING_DOOR] < counts[METHOD_DEADBAND] < len(t) / 5
+    print(f"✓ 斜坡压缩比 死区 {len(t) / counts[METHOD_DEADBAND]:.0f}x，"
+          f"旋转门 {len(t) / counts[METHOD_SWINGING_DOOR]:.0f}x")
+
+
+def test_streaming_matches_batch():
+    """逐点 add() / flush() 与 compress() 保存相同的点，零容差时为无损"""
+    t, data = signals()
+    v = data['阶跃']
+    compressor = Compressor(METHOD_SWINGING_DOOR, 0.2)
+    points = []
+    for ti, vi in zip(t.tolist(), v.tolist()):
+        points.extend(compressor.add(ti, vi))
+    points.extend(compressor.flush())
+    indices, kept = compress(t, v, METHOD_SWINGING_DOOR, 0.2)
+    assert [p[0] for p in points] == t[indices].tolist() and [p[1] for p in points] == kept.tolist()
+    assert compressor.kept == len(points) and compressor.ratio == len(t) / len(points)
+
+    indices, kept = compress(t[:500], v[:500], METHOD_DEADBAND, 0.0)
+    assert np.array_equal(reconstruct(t[indices], kept, t[:500], METHOD_DEADBAND), v[:500])
+    try:
+        Compressor(tolerance=-1)
+        assert False, "负容差应报错"
+    except ValueError:
+        pass
+    print("✓ 逐点接口与整段接口一致")
+
+
+if __name__ == '__main__':
+    test_error_within_tolerance()
+    test_ratio()
+    test_streaming_matches_batch()
+    print("\n全部通过")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+仪表盘测试（offscreen）
+全部磁贴由一个共享帧定时器刷新：独立连接与共享总线的仪表都在帧中重绘，
+没有新数据、滚动区域外或窗口最小化时不重绘
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv[:1])
+
+from dashboard import FRAME_INTERVAL_MS, DashboardDialog
+from multimeter import close_workers
+
+
+def count_refreshes(dialog):
+    """包装 render_frame 与各磁贴的 refresh()，记录帧数与每个磁贴的重绘次数"""
+    frames = [0]
+    drawn = [0] * len(dialog.tiles)
+    render = dialog.render_frame
+
+    def counted_render():
+        frames[0] += 1
+        render()
+
+    for i, tile in enumerate(dialog.tiles):
+        def counted(refresh=tile.refresh, i=i):
+            result = refresh()
+            drawn[i] += result
+            return result
+        tile.refresh = counted
+    dialog.timer.timeout.disconnect()
+    dialog.timer.timeout.connect(counted_render)
+    return frames, drawn
+
+
+def wait(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def start(resources, size=(1100, 720)):
+    dialog = DashboardDialog()
+    dialog.chk_opengl.setChecked(False)
+    dialog.edit_resources.setPlainText("\n".join(resources))
+    dialog.spin_interval.setValue(20)
+    dialog.resize(*size)
+    dialog.show()
+    app.processEvents()
+    dialog.start()
+    assert dialog.workers, dialog.lbl_status.text()
+    return dialog
+
+
+def test_shared_timer_drives_all_tiles():
+    """独立连接与 GPIB 总线上的仪表由同一个帧定时器重绘，叠加总图同步更新"""
+    resources = ["MOCK::PowerMeter::1", "MOCK::PowerMeter::2", "MOCK::GPIB0::12", "MOCK::GPIB0::13"]
+    dialog = start(resources)
+    try:
+        assert len(dialog.workers) == 3    # 两个独立线程 + 一个总线调度线程
+        timers = [t for t in dialog.findChildren(QTimer) if t.isActive()]
+        assert timers == [dialog.timer] and dialog.timer.interval() == FRAME_INTERVAL_MS
+        dialog.chk_overlay.setChecked(True)
+        frames, drawn = count_refreshes(dialog)
+        wait(1.5)
+        assert frames[0] >= 10, frames
+        assert all(n >= 5 for n in drawn), drawn
+        for tile, curve in zip(dialog.tiles, dialog.overlay_curves):
+            assert tile.lbl_value.text().endswith(" W") and "Sa/s" in tile.lbl_stats.text()
+            assert 0 < len(curve.getData()[0]) <= tile._count
+        assert dialog.lbl_frame.text().startswith("每帧")
+
+        # 采集停止后没有新数据：帧照常到来，但不再重绘
+        close_workers(dialog.workers)
+        dialog.workers = []
+        wait(0.2)
+        before, count = list(drawn), frames[0]
+        wait(0.5)
+        assert drawn == before and frames[0] > count, (before, drawn)
+
+        # 窗口不可见（最小化或隐藏）时整帧跳过，重新显示后补画
+        for tile in dialog.tiles:
+            tile.append([(100.0, 1.0)])
+        dialog.hide()
+        wait(0.3)
+        assert drawn == before, (before, drawn)
+        dialog.show()
+        wait(0.3)
+        assert all(n == b + 1 for n, b in zip(drawn, before)), (before, drawn)
+    finally:
+        dialog.stop()
+        dialog.close()
+    print(f"✓ 共享帧定时器 {frames[0]} 帧，磁贴重绘 {drawn}")
+
+
+def test_hidden_tiles_not_redrawn():
+    """滚动区域外的磁贴不重绘，滚动到可见后重绘"""
+    resources = [f"MOCK::PowerMeter::{i}" for i in range(1, 17)]
+    dialog = start(resources, size=(700, 300))
+    try:
+        frames, drawn = count_refreshes(dialog)
+        wait(1.0)
+        shown = [tile.is_shown() for tile in dialog.tiles]
+        assert any(shown) and not all(shown), shown
+        assert all(n > 0 for n, s in zip(drawn, shown) if s), drawn
+        assert all(n == 0 for n, s in zip(drawn, shown) if not s), drawn
+
+        last = dialog.tiles[-1]
+        dialog.tile_area.ensureWidgetVisible(last)
+        wait(0.5)
+        assert last.is_shown() and drawn[-1] > 0, drawn
+    finally:
+        dialog.stop()
+        dialog.close()
+    print(f"✓ 不可见的磁贴不重绘（可见 {sum(shown)}/{len(shown)}）")
+
+
+if __name__ == '__main__':
+    test_shared_timer_drives_all_tiles()
+    test_hidden_tiles_not_redrawn()
+    print("\n全部通过")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+变化点与离群点检测测试
+阶段跳变的检出时刻、离群点、平稳信号不误报，以及重置后重新学习
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from detection import ChangeDetector, DetectionEvent, detection_column
+
+
+def run(detector, times, values):
+    events = []
+    for t, v in zip(times, values):
+        events.extend(detector.process(t, v))
+    return events
+
+
+def noisy(n, level, seed=0):
+    return level + np.random.default_rng(seed).normal(0, 0.2, n)
+
+
+def test_step_onset():
+    """均值阶跃：检出一次上移，起点为跳变时刻"""
+    t = np.arange(4000) * 0.1
+    v = noisy(len(t), 50.0)
+    v[t >= 200.0] += 5.0
+    events = run(ChangeDetector(window=200, z_threshold=0, detect_outliers=False), t, v)
+    assert [e.kind for e in events] == ['shift_up']
+    assert abs(events[0].t - 200.0) <= 0.2
+    print(f"✓ 阶跃检出，起点 {events[0].t:.1f} s")
+
+
+def test_outlier_and_quiet():
+    """平稳信号不误报，单点尖峰报告为离群点"""
+    t = np.arange(5000) * 0.1
+    v = noisy(len(t), 50.0, seed=1)
+    assert run(ChangeDetector(), t, v) == []
+    v[3000] = 60.0
+    events = run(ChangeDetector(), t, v)
+    assert [(e.kind, e.t) for e in events] == [('outlier', t[3000])]
+    print("✓ 平稳信号无误报，尖峰为离群点")
+
+
+def test_reset_relearns():
+    """重置后从新的电平学习，不沿用旧统计"""
+    detector = ChangeDetector(window=100)
+    run(detector, np.arange(500) * 0.1, noisy(500, 50.0))
+    detector.reset()
+    assert detector.page_hinkley.count == 0 and len(detector.outliers._values) == 0
+    events = run(detector, np.arange(500) * 0.1, noisy(500, 80.0, seed=2))
+    assert events == []
+    print("✓ 重置后在新电平上无误报")
+
+
+def test_detection_column():
+    """导出列标记在事件所在行"""
+    times = np.arange(10) * 1.0
+    assert not detection_column(times, []).any()
+    column = detection_column(times, [DetectionEvent(3.5, 0, 'shift_down', ''), DetectionEvent(20, 0, 'outlier', '')])
+    assert column[4] == -1 and column[9] == 2 and np.count_nonzero(column) == 2
+    print("✓ 导出事件列正确")
+
+
+if __name__ == '__main__':
+    test_step_onset()
+    test_outlier_and_quiet()
+    test_reset_relearns()
+    test_detection_column()
+    print("\n全部通过")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+驱动注册表测试
+按 *IDN? 匹配型号与通用驱动后备、采集方式逐级试读后备、静态查询缓存在写入后失效
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import drivers
+from drivers import (GENERIC_DRIVER, STRATEGY_ARRAY, STRATEGY_BINARY, STRATEGY_SINGLE, CachedInstrument,
+                     Driver, acquisition_strategy, connect_driver, find_driver, register_driver)
+from mock_visa import MockInstrument
+
+
+class NoBinaryInstrument(MockInstrument):
+    """固件不支持二进制块读取"""
+
+    def query_binary_values(self, command, **kwargs):
+        raise ValueError("未知命令")
+
+
+class SingleOnlyInstrument(NoBinaryInstrument):
+    """只支持单次查询：数组读取返回无法解析的回复"""
+
+    def query(self, command):
+        if command.strip().upper().lstrip(':') == 'FETC:ARR?':
+            return "-113,\"Undefined header\"\n"
+        return super().query(command)
+
+
+class CountingInstrument(MockInstrument):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.queries = []
+
+    def query(self, command):
+        self.queries.append(command)
+        return super().query(command)
+
+
+def test_idn_matching():
+    """按型号匹配，未知型号使用通用驱动，后注册的驱动优先"""
+    assert find_driver("FLUKE,N4K,123,1.0").name == "Fluke"
+    assert find_driver("KEITHLEY INSTRUMENTS INC.,MODEL 2280S-32-6,4,1.0").name == "Keithley"
+    assert find_driver("YOKOGAWA,WT310E,C2,F1.01").name == "YOKOGAWA WT"
+    assert find_driver("ACME,PM9000,0,1.0") is GENERIC_DRIVER
+    driver, cached = connect_driver(MockInstrument("MOCK::PowerMeter::1"))
+    assert driver.name == "模拟功率计" and isinstance(cached, CachedInstrument)
+
+    special = register_driver(Driver("Fluke 特殊固件", r'FLUKE,N4K', 'MEAS:POW?', max_rate=50))
+    try:
+        assert find_driver("FLUKE,N4K,123,1.0") is special
+        assert find_driver("FLUKE,1760,1,1.0").name == "Fluke"
+        assert special.min_interval_ms == 20
+    finally:
+        drivers._DRIVERS.remove(special)
+    print("✓ IDN 匹配与通用驱动后备正确")
+
+
+def test_strategy_fallback():
+    """二进制块 → 数组读取 → 单次查询逐级后备，选出的方式可以读数"""
+    for instrument, kind in ((MockInstrument("MOCK::A"), STRATEGY_BINARY),
+                             (NoBinaryInstrument("MOCK::B"), STRATEGY_ARRAY),
+                             (SingleOnlyInstrument("MOCK::C"), STRATEGY_SINGLE)):
+        driver, cached = connect_driver(instrument)
+        strategy = acquisition_strategy(driver, cached, 'MEAS:POW?', 10)
+        assert strategy.kind == kind, (type(instrument).__name__, strategy.kind)
+        assert strategy not in driver.strategies    # 返回副本，原型不被修改
+        if kind == STRATEGY_SINGLE:
+            assert 30.0 < strategy.read(cached)[0] < 70.0
+        else:
+            # 仪器采样率按采样间隔设置
+            assert cached.query('SENS:RATE?').strip() == '100'
+            assert abs(strategy.sample_period - 0.01) < 1e-12
+
+    driver, cached = connect_driver(MockInstrument("MOCK::D"))
+    manual = acquisition_strategy(driver, cached, 'FETC?', 100)
+    assert manual.kind == STRATEGY_SINGLE and manual.command == 'FETC?'
+    assert acquisition_strategy(GENERIC_DRIVER, cached, 'MEAS:POW?', 100).kind == STRATEGY_SINGLE
+    print("✓ 采集方式逐级后备正确")
+
+
+def test_batch_timestamps():
+    """批量读数按采样周期倒推时间，跨批次保持单调"""
+    strategy = drivers.ArrayFetch('FETC:ARR?')
+    strategy.sample_period = 0.1
+    first = strategy.timestamps(5, 1.0)
+    assert [round(t, 9) for t in first] == [0.6, 0.7, 0.8, 0.9, 1.0]
+    second = strategy.timestamps(5, 1.2)    # 读取延迟抖动：不早于上一批之后
+    assert second[0] > first[-1] and all(b > a for a, b in zip(second, second[1:]))
+    print("✓ 批量读数时间单调")
+
+
+def test_cache_invalidation():
+    """静态查询只问一次；write() 或设置命令后缓存失效，读到新值"""
+    raw = CountingInstrument("MOCK::E")
+    cached = CachedInstrument(raw, ['*IDN?', 'SENS:RATE?'])
+    for _ in range(3):
+        assert cached.query('SENS:RATE?').strip() == '10'
+        assert cached.query(':sens:rate?').strip() == '10'
+    assert raw.queries.count('SENS:RATE?') == 1
+
+    cached.write('SENS:RATE 200')
+    assert cached.query('SENS:RATE?').strip() == '200'
+    cached.query('SENS:RATE 50')    # 以 query 发送的设置命令同样使缓存失效
+    assert cached.query('SENS:RATE?').strip() == '50'
+    cached.query('MEAS:POW?')
+    assert cached.query('SENS:RATE?').strip() == '50'
+    assert raw.queries.count('SENS:RATE?') == 3
+
+    cached.timeout = 1234
+    assert raw.timeout == 1234 and cached.resource_name == "MOCK::E"
+    print("✓ 静态查询缓存在写入后失效")
+
+
+if __name__ == '__main__':
+    test_idn_matching()
+    test_strategy_fallback()
+    test_batch_timestamps()
+    test_cache_invalidation()
+    print("\n全部通过")
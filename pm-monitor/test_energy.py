@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+能量积分测试
+梯形积分与解析值对比，数据缺口不积分，跨整点拆分，标记区段
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from energy import EnergyIntegrator
+
+
+def test_ramp_exact():
+    """线性功率下梯形积分为精确值，不均匀采样也一样"""
+    rng = np.random.default_rng(5)
+    t = np.concatenate([[0.0], np.sort(rng.uniform(0, 7200, 5000)), [7200.0]])
+    integrator = EnergyIntegrator(max_gap=60.0)
+    for ti in t:
+        integrator.add(ti, 10.0 + ti / 360.0)
+    # P = 10 + t/360，0..7200 s 积分 = 72000 + 72000 J = 40 Wh
+    assert math.isclose(integrator.total_wh, 40.0, rel_tol=1e-9)
+    intervals = integrator.interval_wh()
+    assert [start for start, _ in intervals] == [0.0, 3600.0]
+    # 第一小时 36000 + 18000 J = 15 Wh，第二小时 25 Wh
+    assert math.isclose(intervals[0][1], 15.0, rel_tol=1e-9)
+    assert math.isclose(intervals[1][1], 25.0, rel_tol=1e-9)
+    assert math.isclose(integrator.average_power, 20.0, rel_tol=1e-9)
+    print("✓ 线性功率积分与按小时拆分为精确值")
+
+
+def test_gaps_and_reconnect():
+    """超过 max_gap 的缺口与 break_segment() 不跨越积分"""
+    integrator = EnergyIntegrator(max_gap=5.0)
+    for t in range(0, 11):
+        integrator.add(float(t), 100.0)
+    for t in range(30, 41):
+        integrator.add(float(t), 100.0)
+    integrator.break_segment()
+    for t in range(41, 52):
+        integrator.add(float(t), 100.0)
+    assert integrator.gap_count == 1 and integrator.gap_time == 20.0
+    assert math.isclose(integrator.total_wh, 3000.0 / 3600.0)
+    assert integrator.covered_time == 30.0
+    integrator.reset()
+    assert integrator.total_wh == 0.0 and integrator.interval_wh() == []
+    print("✓ 数据缺口与重新连接不积分")
+
+
+def test_marked_segments():
+    """标记区段只累计区段内的能量，开始新区段会结束旧区段"""
+    integrator = EnergyIntegrator()
+    integrator.add(0.0, 50.0)
+    integrator.begin_mark("待机", 0.0)
+    for t in range(1, 361):
+        integrator.add(float(t), 50.0)
+    integrator.begin_mark("满载", 360.0)
+    for t in range(361, 721):
+        integrator.add(float(t), 200.0)
+    assert integrator.marking
+    segment = integrator.end_mark(720.0)
+    assert not integrator.marking and integrator.end_mark(800.0) is None
+    first, second = integrator.segments
+    assert first.name == "待机" and math.isclose(first.energy_wh, 5.0)
+    # 第一个点从 50 W 线性过渡到 200 W
+    assert second == segment and math.isclose(second.energy_wh, (125.0 + 359 * 200.0) / 3600.0)
+    summary = integrator.summary()
+    assert [s['name'] for s in summary['energy_segments']] == ["待机", "满载"]
+    print("✓ 标记区段能量正确")
+
+
+if __name__ == '__main__':
+    test_ramp_exact()
+    test_gaps_and_reconnect()
+    test_marked_segments()
+    print("\n全部通过")
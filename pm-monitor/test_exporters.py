@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据导出测试
+各格式写入后读回，检查列与元数据；附加列名与基本列冲突时不覆盖数据；
+CSV 注释行保存分位数与能量摘要
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import exporters
+from energy import EnergyIntegrator
+
+
+def sample_data(n=1000):
+    t = np.arange(n) * 0.1
+    p = 50 + np.sin(t)
+    return t, p
+
+
+def test_colliding_extra_names():
+    """与基本列 / metadata 同名的附加列加后缀，基本列保持原值"""
+    t, p = sample_data()
+    extra = {'power_w': p * 2, 'metadata': p * 3, 'eff': p / 100}
+    columns = exporters.compute_columns(t, p, extra)
+    assert list(columns) == ['time_s', 'power_w', 'avg_w', 'rms_w', 'power_w_1', 'metadata_1', 'eff']
+    assert np.array_equal(columns['power_w'], p)
+    assert np.array_equal(columns['power_w_1'], p * 2)
+    assert exporters.column_name('time_s', {'time_s_1'}) == 'time_s_2'
+    print("✓ 冲突的附加列名加后缀，不覆盖基本列")
+
+
+def test_round_trip():
+    """可用的格式写入后读回一致"""
+    t, p = sample_data(200000)
+    extra = {'power_w': p * 2, 'metadata': p + 1}
+    metadata = {'idn': 'MOCK', 'interval_ms': 100, 'steps': [1, 2]}
+    with tempfile.TemporaryDirectory() as d:
+        for fmt in exporters.available_formats():
+            filename = os.path.join(d, 'out' + exporters.EXTENSIONS[fmt])
+            rows = exporters.export(filename, fmt, t, p, metadata, extra)
+            assert rows == len(t)
+            if fmt == 'npz':
+                with np.load(filename) as f:
+                    assert np.array_equal(f['power_w'], p)
+                    assert np.array_equal(f['power_w_1'], p * 2)
+                    assert np.array_equal(f['metadata_1'], p + 1)
+                    assert json.loads(str(f['metadata']))['idn'] == 'MOCK'
+            elif fmt == 'csv':
+                assert exporters.read_csv_metadata(filename) == metadata
+                with open(filename, encoding='utf-8') as f:
+                    header = [line for line in f if not line.startswith('#')][0].strip()
+                assert header.endswith(',power_w_1,metadata_1')
+                table = np.loadtxt(filename, delimiter=',', skiprows=len(metadata) + 1)
+                assert len(table) == len(t)
+                assert np.allclose(table[:, 1], p, atol=1e-4)
+            elif fmt in ('parquet', 'arrow'):
+                import pyarrow.feather as feather
+                import pyarrow.parquet as pq
+                table = pq.read_table(filename) if fmt == 'parquet' else feather.read_table(filename)
+                assert np.array_equal(table.column('power_w').to_numpy(), p)
+                assert np.array_equal(table.column('power_w_1').to_numpy(), p * 2)
+                assert table.schema.metadata[b'idn'] == b'MOCK'
+            elif fmt == 'hdf5':
+                import h5py
+                with h5py.File(filename, 'r') as f:
+                    assert np.array_equal(f['power_w'][:], p)
+                    assert f.attrs['interval_ms'] == 100
+            print(f"✓ {fmt} 写入 {rows} 行并读回一致")
+
+
+def test_csv_statistics_header():
+    """CSV 表头之前的 # 注释行保存分位数摘要，表头与数据行格式不变"""
+    t, p = sample_data(100)
+    metadata = {'idn': 'FLUKE,N4K,1,1.0', 'window_p50_w': 50.1, 'window_p95_w': 53.2,
+                'session_p50_w': 50.0, 'session_p99_w': 54.9}
+    with tempfile.TemporaryDirectory() as d:
+        filename = os.path.join(d, 'out.csv')
+        exporters.export(filename, 'csv', t, p, metadata)
+        with open(filename, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert lines[:5] == ['# idn: "FLUKE,N4K,1,1.0"', '# window_p50_w: 50.1', '# window_p95_w: 53.2',
+                             '# session_p50_w: 50.0', '# session_p99_w: 54.9']
+        assert lines[5] == exporters.CSV_HEADER.strip() and len(lines) == 106
+        assert exporters.read_csv_metadata(filename) == metadata
+        # 没有元数据时与原格式相同
+        exporters.export(filename, 'csv', t, p, {})
+        with open(filename, encoding='utf-8') as f:
+            assert f.readline() == exporters.CSV_HEADER
+        assert exporters.read_csv_metadata(filename) == {}
+    print("✓ CSV 注释行保存分位数摘要")
+
+
+def test_csv_energy_summary():
+    """能量摘要（总能量、每小时能量、标记区段）写入 CSV 注释行并原样读回"""
+    t = np.arange(0, 7200.0, 1.0)
+    p = np.full(len(t), 100.0)
+    energy = EnergyIntegrator()
+    for i, (ti, pi) in enumerate(zip(t, p)):
+        if i == 600:
+            energy.begin_mark("负载", ti)
+        if i == 2400:
+            energy.end_mark(ti)
+        energy.add(ti, pi)
+    summary = energy.summary()
+    with tempfile.TemporaryDirectory() as d:
+        filename = os.path.join(d, 'out.csv')
+        exporters.export(filename, 'csv', t, p, dict({'idn': 'MOCK'}, **summary))
+        metadata = exporters.read_csv_metadata(filename)
+    assert abs(metadata['energy_wh'] - 100.0 * 7199 / 3600) < 1e-6
+    assert metadata['energy_avg_power_w'] == 100.0
+    assert [wh for _, wh in metadata['energy_intervals_wh']] == [100.0, round(100.0 * 3599 / 3600, 6)]
+    (segment,) = metadata['energy_segments']
+    assert segment['name'] == "负载" and abs(segment['energy_wh'] - 50.0) < 1e-6
+    assert metadata['energy_segments'] == summary['energy_segments']
+    print(f"✓ CSV 注释行保存能量摘要（{metadata['energy_wh']:.3f} Wh）")
+
+
+if __name__ == '__main__':
+    test_colliding_extra_names()
+    test_round_trip()
+    test_csv_statistics_header()
+    test_csv_energy_summary()
+    print("\n全部通过")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+派生通道表达式测试
+逐批计算与整段计算一致，ema 与逐点递推一致，长间隔与 NaN 输入不会使通道永久变为 NaN
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from expressions import DerivedChannel, ExpressionError, evaluate_all, parse_definitions
+
+
+def ema_reference(times, values, tau):
+    """逐点递推的指数滑动平均"""
+    y = []
+    for i, (t, x) in enumerate(zip(times, values)):
+        if i == 0:
+            y.append(x)
+        else:
+            a = math.exp(-(t - times[i - 1]) / tau)
+            y.append(a * y[-1] + (1 - a) * x)
+    return np.array(y)
+
+
+def batched(channel, times, values, sizes):
+    """按给定批大小逐批计算"""
+    out = []
+    start = 0
+    for size in sizes:
+        out.append(channel.evaluate(times[start:start + size], {'P': values[start:start + size]}))
+        start += size
+    out.append(channel.evaluate(times[start:], {'P': values[start:]}))
+    return np.concatenate(out)
+
+
+def sample_data(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.uniform(0.05, 0.2, n))
+    return t, 50 + 5 * np.sin(t / 10) + rng.normal(0, 1, n)
+
+
+def test_incremental_matches_batch():
+    """ema / mean / 组合表达式逐批计算与整段计算一致，ema 与逐点递推一致"""
+    t, p = sample_data()
+    sizes = [1, 7, 100, 3, 1000, 250]
+    for expression in ("ema(P, 5)", "mean(P, 1.0)", "ema(P, 2) - mean(P * 2, 10) / 2", "P * 0.98 + t"):
+        whole = DerivedChannel('X', expression, ['P']).evaluate(t, {'P': p})
+        parts = batched(DerivedChannel('X', expression, ['P']), t, p, sizes)
+        assert np.allclose(whole, parts, rtol=1e-9, atol=1e-9), expression
+    assert np.allclose(DerivedChannel('X', 'ema(P, 5)', ['P']).evaluate(t, {'P': p}), ema_reference(t, p, 5.0))
+    window = np.array([p[(t > ti - 1.0) & (t <= ti)].mean() for ti in t])
+    assert np.allclose(DerivedChannel('X', 'mean(P, 1.0)', ['P']).evaluate(t, {'P': p}), window)
+    print("✓ 逐批与整段计算一致，ema / mean 与直接计算一致")
+
+
+def test_ema_long_gap():
+    """一步间隔远大于时间常数（暂停 4000 s）后从当前样本重新开始，不产生 NaN"""
+    channel = DerivedChannel('X', 'ema(P, 5)', ['P'])
+    channel.evaluate(np.arange(10.0), {'P': np.full(10, 50.0)})
+    y = channel.evaluate(np.array([4010.0, 4011.0]), {'P': np.array([80.0, 80.0])})
+    assert np.all(np.isfinite(y)) and y[0] == 80.0
+    y = channel.evaluate(np.array([4012.0]), {'P': np.array([60.0])})
+    assert math.isfinite(y[0]) and 60.0 < y[0] < 80.0
+
+    t = np.concatenate((np.arange(100.0), 5000 + np.arange(100.0)))
+    p = np.concatenate((np.full(100, 50.0), np.full(100, 70.0)))
+    whole = DerivedChannel('X', 'ema(P, 5)', ['P']).evaluate(t, {'P': p})
+    assert np.all(np.isfinite(whole)) and whole[100] == 70.0
+    assert np.allclose(whole, ema_reference(t, p, 5.0))
+    print("✓ 长间隔后 ema 重新开始，结果有限")
+
+
+def test_nan_input():
+    """NaN 输入对应输出 NaN，之后的有效样本恢复正常（不被 NaN 永久污染）"""
+    t, p = sample_data(1000)
+    q = p.copy()
+    q[:20] = np.nan         # 对齐通道首个样本到达之前
+    q[500] = np.nan
+    for expression in ("ema(P, 5)", "mean(P, 1.0)"):
+        y = batched(DerivedChannel('X', expression, ['P']), t, q, [10, 15, 300])
+        assert np.all(np.isnan(y[:20]))
+        if expression.startswith('ema'):
+            assert np.isnan(y[500])     # mean 的窗口内还有其他有效样本
+        valid = np.isfinite(q)
+        assert np.all(np.isfinite(y[valid])), expression
+        expected = DerivedChannel('X', expression, ['P']).evaluate(t[valid], {'P': q[valid]})
+        assert np.allclose(y[valid], expected), expression
+    print("✓ NaN 输入被跳过，派生通道随后恢复")
+
+
+def test_parse_errors():
+    """未知通道 / 函数、重复名称、非常数参数报错"""
+    for text in ("X = Q * 2", "X = foo(P)", "X = P\nX = P", "X = ema(P, P)", "X = __import__('os')"):
+        try:
+            parse_definitions(text, ['P'])
+        except ExpressionError:
+            continue
+        raise AssertionError(f"应报错: {text}")
+    derived = parse_definitions("# 注释\nEff = P / 100\nS = mean(P, 2)", ['P'])
+    assert [d.name for d in derived] == ['Eff', 'S']
+    t, p = sample_data(100)
+    result = evaluate_all(derived, t, {'P': p})
+    assert np.allclose(result['Eff'], p / 100)
+    # 编译结果被缓存复用：再次计算时状态已清除，结果相同
+    again = evaluate_all(derived, t, {'P': p})
+    assert all(np.array_equal(result[name], again[name]) for name in result)
+    print("✓ 解析错误检查与 evaluate_all 正确")
+
+
+if __name__ == '__main__':
+    test_incremental_matches_batch()
+    test_ema_long_gap()
+    test_nan_input()
+    test_parse_errors()
+    print("\n全部通过")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑动窗口直方图测试
+按主窗口的方式驱动（样本进出窗口 + 每次刷新检查是否重建），
+计数与整窗重新统计一致，只在分布变化时重建，恒定信号不会每次刷新都重建
+"""
+
+import collections
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from histogram import SlidingHistogram
+
+
+def drive(hist, values, window=1000, check=None):
+    """逐点加入 / 移出窗口，每个样本后像界面刷新一样检查重建"""
+    buffer = collections.deque()
+    for i, x in enumerate(values):
+        buffer.append(x)
+        hist.add(x)
+        if len(buffer) > window:
+            hist.remove(buffer.popleft())
+        if hist.needs_rebin():
+            hist.rebin(list(buffer))
+        if check is not None and i % 500 == 0:
+            check(hist, np.array(buffer))
+    return np.array(buffer)
+
+
+def recount(hist, values):
+    """与整窗重新统计对比"""
+    index = np.floor((values - hist.lo) * (hist.bins / (hist.hi - hist.lo))).astype(np.int64)
+    inside = (index >= 0) & (index < hist.bins)
+    assert hist.counts == np.bincount(index[inside], minlength=hist.bins).tolist()
+    assert hist.underflow == int((index < 0).sum()) and hist.overflow == int((index >= hist.bins).sum())
+    assert hist.count == len(values)
+
+
+def test_counts_match_recount():
+    """电平变化的信号：计数始终与整窗重新统计一致，重建次数很少"""
+    rng = np.random.default_rng(0)
+    values = np.concatenate([level + rng.normal(0, 1, 30000) for level in (50.0, 80.0, 20.0, 20.5)])
+    hist = SlidingHistogram()
+    window = drive(hist, values, check=recount)
+    recount(hist, window)
+    assert 3 <= hist.rebins <= 20, hist.rebins
+    print(f"✓ 计数与整窗统计一致（{len(values)} 点，重建 {hist.rebins} 次）")
+
+
+def test_flat_signal_does_not_rebin_every_refresh():
+    """恒定 / 近似恒定信号只重建一次"""
+    for values in (np.full(3000, 50.0), 50.0 + np.tile([0.0, 1e-9], 1500)):
+        hist = SlidingHistogram()
+        drive(hist, values)
+        assert hist.rebins == 1, hist.rebins
+        assert sum(hist.counts) == 1000
+    # 宽分布之后变为恒定：窗口完全变为恒定后不再重建
+    rng = np.random.default_rng(1)
+    hist = SlidingHistogram()
+    values = np.concatenate((50 + rng.normal(0, 5, 3000), np.full(3000, 50.0)))
+    buffer = drive(hist, values)
+    rebins = hist.rebins
+    for _ in range(3000):
+        hist.remove(50.0)
+        hist.add(50.0)
+        if hist.needs_rebin():
+            hist.rebin(buffer)
+    assert hist.rebins == rebins, (rebins, hist.rebins)
+    print("✓ 恒定信号不再每次刷新都重建")
+
+
+def test_non_finite_values_ignored():
+    """NaN / inf 读数不报错、不计数，进出窗口后计数与有限样本的整窗统计一致"""
+    rng = np.random.default_rng(2)
+    values = 50 + rng.normal(0, 1, 5000)
+    values[::37] = np.nan
+    values[5::101] = np.inf
+    values[7::211] = -np.inf
+
+    def check(h, w):
+        if h.lo is not None:
+            recount(h, w[np.isfinite(w)])
+
+    hist = SlidingHistogram()
+    window = drive(hist, values, check=check)
+    finite = window[np.isfinite(window)]
+    recount(hist, finite)
+    assert hist.count == len(finite) == sum(hist.counts) + hist.underflow + hist.overflow
+    # 窗口内全是 NaN 时没有分箱范围
+    hist = SlidingHistogram()
+    drive(hist, np.full(100, np.nan))
+    assert hist.count == 0 and hist.lo is None and not hist.needs_rebin()
+    print("✓ NaN / inf 读数被忽略")
+
+
+if __name__ == '__main__':
+    test_counts_match_recount()
+    test_flat_signal_does_not_rebin_every_refresh()
+    test_non_finite_values_ignored()
+    print("\n全部通过")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试配置引擎测试
+复合 SCPI 消息的合并与长度限制、步骤测量窗口的上下限判定，
+以及主窗口在配置执行完毕后按 stop_when_done 停止测量（虚拟时钟 + 模拟仪器）
+"""
+
+import os
+import sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import clock
+import profiles
+from profiles import MAX_MESSAGE_LENGTH, ProfileDone, ProfileRunner, StepResult, batch_commands, send_commands
+
+
+class RecordingInstrument:
+    """记录下发的消息；查询按消息中的查询命令个数回复"""
+
+    def __init__(self):
+        self.messages = []
+
+    def write(self, message):
+        self.messages.append(('write', message))
+
+    def query(self, message):
+        self.messages.append(('query', message))
+        return ';'.join(f"R{i}" for i, part in enumerate(message.split(';')) if part.endswith('?')) + '\n'
+
+
+def test_batch_commands():
+    """合并为分号分隔的复合消息，补根路径冒号，按长度上限拆分并统计查询个数"""
+    messages = batch_commands(["*RST", "CONF:POW", " ", ":SENS:RATE 10", "POW:RANG?", "*OPC?"])
+    assert messages == [("*RST;:CONF:POW;:SENS:RATE 10;:POW:RANG?;*OPC?", 2)]
+    assert batch_commands([]) == [] and batch_commands(["", "  "]) == []
+
+    commands = [f"LOAD:LEV {i}" for i in range(100)] + ["MEAS:POW?"]
+    messages = batch_commands(commands)
+    assert len(messages) > 1
+    assert all(len(message) <= MAX_MESSAGE_LENGTH for message, _ in messages)
+    assert ';'.join(message for message, _ in messages).split(';') == [':' + c for c in commands]
+    assert [q for _, q in messages] == [0] * (len(messages) - 1) + [1]
+
+    # 恰好达到上限时不拆分；单条超长命令单独成为一条消息
+    assert batch_commands(["A" * 9, "B" * 9], max_length=21) == [(":" + "A" * 9 + ";:" + "B" * 9, 0)]
+    assert len(batch_commands(["A" * 9, "B" * 9], max_length=20)) == 2
+    assert batch_commands(["X" * 50, "Y?"], max_length=20) == [(":" + "X" * 50, 0), (":Y?", 1)]
+    print("✓ 复合消息合并与长度限制正确")
+
+
+def test_send_commands():
+    """合并下发时只有含查询的消息用 query，回复按顺序拆分；不合并时逐条下发"""
+    instrument = RecordingInstrument()
+    replies = send_commands(instrument, ["LOAD:ON", "POW:RANG?", "CURR?"])
+    assert instrument.messages == [('query', ":LOAD:ON;:POW:RANG?;:CURR?")] and replies == ["R1", "R2"]
+
+    instrument = RecordingInstrument()
+    assert send_commands(instrument, ["LOAD:ON", "LOAD:LEV 50"]) == []
+    assert instrument.messages == [('write', ":LOAD:ON;:LOAD:LEV 50")]
+
+    instrument = RecordingInstrument()
+    replies = send_commands(instrument, ["LOAD:ON", "POW:RANG?"], batch=False)
+    assert instrument.messages == [('write', "LOAD:ON"), ('query', "POW:RANG?")] and replies == ["R0"]
+    print("✓ 命令下发与回复拆分正确")
+
+
+def test_validate_profile():
+    """补全默认字段；缺少步骤、未知统计量或限值格式错误时报错"""
+    profile = profiles.validate_profile({'steps': [{'wait': 3}, {'measure': 2}]}, default_name="p")
+    assert profile['name'] == "p" and profile['batch'] and profile['stop_when_done']
+    assert profile['steps'][0]['settle'] == 3.0 and profile['steps'][0]['measure'] == 0.0
+    assert profile['steps'][1]['name'] == "步骤 2"
+    for bad in ({}, {'steps': []}, {'steps': ["x"]}, {'steps': [{'limits': {'median': [0, 1]}}]},
+                {'steps': [{'limits': {'mean': [1]}}]}):
+        try:
+            profiles.validate_profile(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print("✓ 配置校验正确")
+
+
+def run_profile(profile, samples):
+    """按采集线程的顺序调用 control / process，samples 为 (t, value)；返回事件与下发的消息"""
+    runner = ProfileRunner(profiles.validate_profile(profile))
+    instrument = RecordingInstrument()
+    events = []
+    for t, value in samples:
+        runner.control(instrument, t)
+        events.extend(runner.process(t, value) or [])
+        if runner.done:
+            break
+    return runner, events, instrument.messages
+
+
+def test_step_evaluation():
+    """测量窗口统计按上下限判定，等待稳定期间的读数不计入；全部完成时给出总结果"""
+    profile = {
+        'name': "阶跃",
+        'setup': ["*RST"],
+        'steps': [
+            {'name': "空载", 'write': ["LOAD:OFF"], 'settle': 1, 'measure': 2, 'limits': {'mean': [None, 5.0]}},
+            {'name': "半载", 'write': ["LOAD:LEV 50"], 'query': ["POW:RANG?"], 'settle': 1, 'measure': 2,
+             'limits': {'mean': [45, 55], 'max': [None, 60]}},
+            {'name': "冷却", 'wait': 1},
+            {'name': "无窗口", 'limits': {'mean': [0, 1]}},
+        ],
+    }
+    # 0.1 s 一个读数：空载 2 W（稳定期间 100 W 不计入），半载 50 W 中间一个 65 W 尖峰
+    samples = []
+    for i in range(200):
+        t = round(i * 0.1, 1)
+        if t < 1.0:
+            value = 100.0
+        elif t < 3.1:
+            value = 2.0
+        else:
+            value = 65.0 if t == 5.0 else 50.0
+        samples.append((t, value))
+    runner, events, messages = run_profile(profile, samples)
+
+    results = [e for e in events if isinstance(e, StepResult)]
+    assert [r.name for r in results] == ["空载", "半载", "冷却", "无窗口"]
+    empty, half, cool, no_window = results
+    assert empty.passed and empty.stats['mean'] == 2.0 and empty.stats['count'] == 21
+    assert not half.passed and half.failures == ["max=65 > 60"] and half.replies == {"POW:RANG?": "R1"}
+    assert 45 <= half.stats['mean'] <= 55
+    assert cool.passed and cool.stats == {'count': 0} and cool.t_end - cool.t_start >= 1.0
+    assert not no_window.passed and no_window.failures == ["mean 无数据"]
+    assert isinstance(events[-1], ProfileDone) and not events[-1].passed and runner.done
+    assert messages[:2] == [('write', "*RST"), ('write', ":LOAD:OFF")]
+    assert ('query', ":LOAD:LEV 50;:POW:RANG?") in messages
+
+    metadata = profiles.results_metadata(results)
+    assert [m['step'] for m in metadata] == [1, 2, 3, 4] and metadata[1]['failures'] == ["max=65 > 60"]
+    print("✓ 步骤判定正确（1 通过、2 不通过、3 通过、4 无数据）")
+
+
+_app = None
+
+
+def run_window(profile, seconds):
+    """在虚拟时间内用模拟仪器运行主窗口，返回 (主窗口, 对话框记录)"""
+    global _app
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    # QApplication 须一直保留，被回收时主窗口的控件随之销毁
+    _app = app = QApplication.instance() or QApplication(sys.argv[:1])
+    from main_window import PMMonitorMainWindow
+
+    dialogs = []
+    saved = {name: getattr(QMessageBox, name) for name in ('information', 'warning', 'critical')}
+    for name in saved:
+        setattr(QMessageBox, name, staticmethod(lambda *args, name=name: dialogs.append((name,) + args[1:3])))
+    virtual = clock.install(clock.VirtualClock(flush_interval=0.5))
+    try:
+        window = PMMonitorMainWindow()
+        window.combo_visa_resources.setEditText("MOCK::PowerMeter::1")
+        window.connect_visa_device()
+        window.spin_sample_rate.setValue(100)
+        window.chk_record_db.setChecked(False)
+        window.profile = profiles.validate_profile(profile)
+        window.start_measurement()
+        assert window.is_measuring, dialogs
+        while virtual.now < seconds and window.is_measuring:
+            virtual.run_for(0.5)
+            app.processEvents()
+        return window, dialogs
+    finally:
+        clock.install(clock.SystemClock())
+        for name, method in saved.items():
+            setattr(QMessageBox, name, staticmethod(method))
+
+
+def test_stop_when_done():
+    """配置执行完毕：stop_when_done 为真时停止测量，否则继续连续测量"""
+    profile = {'name': "短测", 'steps': [{'name': "测量", 'settle': 0.5, 'measure': 2,
+                                          'limits': {'mean': [0, 1000]}}]}
+    window, dialogs = run_window(dict(profile), 10.0)
+    assert not window.is_measuring and [r.passed for r in window.profile_results] == [True]
+    assert "全部通过" in window.lbl_profile_status.text()
+    assert window.sample_count < 50, window.sample_count
+    window.close()
+
+    window, dialogs = run_window(dict(profile, stop_when_done=False), 10.0)
+    try:
+        assert window.is_measuring and len(window.profile_results) == 1
+        assert window.sample_count >= 95, window.sample_count
+    finally:
+        window.stop_measurement()
+        window.close()
+    assert not [d for d in dialogs if d[0] != 'information'], dialogs
+    print("✓ 配置完成后按 stop_when_done 停止测量")
+
+
+if __name__ == '__main__':
+    test_batch_commands()
+    test_send_commands()
+    test_validate_profile()
+    test_step_evaluation()
+    test_stop_when_done()
+    print("\n全部通过")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式分位数测试
+P² 估计与 numpy 精确分位数对比，滑动窗口分位数与逐窗口排序一致
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from quantiles import P2Quantile, SlidingQuantiles, StreamingQuantiles, percentile_label
+
+
+def test_p2_matches_numpy():
+    """正态与偏态分布下 P² 估计接近精确分位数"""
+    rng = np.random.default_rng(3)
+    for name, data in (('正态', rng.normal(50, 2, 50000)), ('指数', rng.exponential(5, 50000))):
+        stats = StreamingQuantiles((0.5, 0.95, 0.99))
+        for x in data:
+            stats.add(x)
+        spread = np.percentile(data, 99.9) - np.percentile(data, 0.1)
+        for p, value in stats.values().items():
+            assert abs(value - np.percentile(data, p * 100)) < 0.01 * spread, (name, p, value)
+        print(f"✓ {name}分布 P² 误差在 1% 量程内")
+
+
+def test_p2_small_counts_and_reset():
+    """前 5 个样本为精确插值，重置后重新开始"""
+    estimator = P2Quantile(0.5)
+    assert estimator.value() is None
+    for x in (5.0, 1.0, 3.0):
+        estimator.add(x)
+    assert estimator.value() == 3.0
+    estimator.reset()
+    assert estimator.count == 0 and estimator.value() is None
+    try:
+        P2Quantile(1.0)
+        assert False, "分位点越界应报错"
+    except ValueError:
+        pass
+    assert percentile_label(0.95) == 'p95' and percentile_label(0.999) == 'p99.9'
+    print("✓ 少量样本、重置与参数检查正确")
+
+
+def test_sliding_window():
+    """窗口进出后分位数与 numpy 对窗口内样本计算的结果一致（含重复值）"""
+    rng = np.random.default_rng(4)
+    data = np.round(rng.normal(50, 2, 3000), 1)
+    window = 200
+    sliding = SlidingQuantiles()
+    for i, x in enumerate(data):
+        sliding.add(x)
+        if i >= window:
+            sliding.remove(data[i - window])
+        if i % 97 == 0:
+            current = data[max(0, i - window + 1):i + 1]
+            assert len(sliding) == len(current)
+            for p in (0.0, 0.25, 0.5, 0.99, 1.0):
+                assert abs(sliding.quantile(p) - np.percentile(current, p * 100)) < 1e-9
+    sliding.clear()
+    assert sliding.median() is None
+    print("✓ 滑动窗口分位数与逐窗口计算一致")
+
+
+def test_non_finite_values_ignored():
+    """NaN / inf 读数不进入窗口：窗口不会无限增长，分位数只按有限样本计算"""
+    rng = np.random.default_rng(5)
+    data = rng.normal(50, 2, 3000)
+    data[::10] = np.nan
+    data[3::50] = np.inf
+    window = 200
+    sliding = SlidingQuantiles()
+    stats = StreamingQuantiles((0.5,))
+    for i, x in enumerate(data):
+        sliding.add(x)
+        stats.add(x)
+        if i >= window:
+            sliding.remove(data[i - window])
+    current = data[-window:]
+    current = current[np.isfinite(current)]
+    assert len(sliding) == len(current)
+    assert abs(sliding.median() - np.median(current)) < 1e-9
+    assert stats.estimators[0].count == int(np.isfinite(data).sum())
+    assert abs(stats.values()[0.5] - 50) < 0.5
+    print("✓ NaN / inf 读数被忽略，窗口大小不变")
+
+
+if __name__ == '__main__':
+    test_p2_matches_numpy()
+    test_p2_small_counts_and_reset()
+    test_sliding_window()
+    test_non_finite_values_ignored()
+    print("\n全部通过")
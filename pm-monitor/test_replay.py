@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制数据回放测试
+资源字符串解析、读取导出的 CSV、按录制时间戳取数，以及 ReplayWorker 的节奏、样本数与 ReplayFinished 事件
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import exporters
+from acquisition import ReplayWorker
+from replay import ReplayFinished, ReplayInstrument, load_recording, parse_replay_resource
+
+
+def write_csv(directory, n=300, step=0.01):
+    """按导出格式（含 # 元数据注释行）写一段录制数据，时间从 100 s 开始"""
+    path = os.path.join(directory, 'rec.csv')
+    t = 100.0 + np.arange(n) * step
+    exporters.export(path, 'csv', t, 50 + np.arange(n) * 0.01, {'idn': 'MOCK', 'session_p50_w': 51.5})
+    return path, t
+
+
+def run_worker(worker):
+    """在当前线程运行回放（信号为直接连接），返回 (样本, 事件)"""
+    samples, events = [], []
+    worker.samples_ready.connect(samples.extend)
+    worker.events_ready.connect(events.extend)
+    worker.run()
+    return samples, events
+
+
+def test_parse_resource():
+    """路径中的 :: 与盘符、速度与 fast"""
+    assert parse_replay_resource("REPLAY::/data/rec.csv") == ("/data/rec.csv", 1.0)
+    assert parse_replay_resource("REPLAY::C:\\data\\rec.pmarc::4") == ("C:\\data\\rec.pmarc", 4.0)
+    assert parse_replay_resource("replay::rec.npz::FAST") == ("rec.npz", None)
+    assert parse_replay_resource("REPLAY::a::b.csv") == ("a::b.csv", 1.0)
+    try:
+        parse_replay_resource("REPLAY::rec.csv::0")
+        assert False, "速度为 0 应报错"
+    except ValueError:
+        pass
+    print("✓ 资源字符串解析正确")
+
+
+def test_instrument():
+    """CSV 时间从 0 开始；查询按顺序返回录制值，take_until 按录制时间取数"""
+    with tempfile.TemporaryDirectory() as d:
+        path, t = write_csv(d)
+        times, values = load_recording(path)
+        assert len(times) == 300 and times[0] == 0.0 and abs(times[-1] - 2.99) < 1e-6
+        instrument = ReplayInstrument(f"REPLAY::{path}::2")
+        assert instrument.speed == 2.0 and len(instrument) == 300
+        assert instrument.query('*IDN?').startswith('REPLAY,rec.csv,300')
+        assert float(instrument.query('MEAS:POW?')) == 50.0
+        taken, _ = instrument.take_until(0.5)
+        assert len(taken) == 50 and instrument.next_time() == times[51]
+        instrument.take(1000)
+        assert instrument.exhausted and instrument.next_time() is None
+        try:
+            instrument.query('MEAS:POW?')
+            assert False, "回放结束后查询应报错"
+        except ValueError:
+            pass
+    print("✓ 回放仪器取数正确")
+
+
+def test_worker_fast_and_paced():
+    """尽快回放与 10 倍速回放：样本数完整、时间为录制时间，结束时发出 ReplayFinished"""
+    with tempfile.TemporaryDirectory() as d:
+        path, _ = write_csv(d)
+        samples, events = run_worker(ReplayWorker(ReplayInstrument(f"REPLAY::{path}::fast"), 0.0, fast_batch=64))
+        assert len(samples) == 300 and samples[0] == (0.0, 50.0)
+        assert len(events) == 1 and isinstance(events[0], ReplayFinished)
+        assert events[0].count == 300 and events[0].path == path
+
+        started = time.monotonic()
+        samples, events = run_worker(ReplayWorker(ReplayInstrument(f"REPLAY::{path}::10"), 0.0))
+        elapsed = time.monotonic() - started
+        assert len(samples) == 300 and abs(samples[-1][0] - 2.99) < 1e-6
+        assert all(b[0] > a[0] for a, b in zip(samples, samples[1:]))
+        # 2.99 s 录制按 10 倍速约 0.3 s
+        assert 0.25 <= elapsed < 1.0, elapsed
+        assert events[0].count == 300 and 0.25 <= events[0].elapsed < 1.0
+    print(f"✓ 回放线程样本完整，10 倍速耗时 {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    test_parse_resource()
+    test_instrument()
+    test_worker_fast_and_paced()
+    print("\n全部通过")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多分辨率汇总存储测试
+与逐桶暴力计算对比，覆盖环形缓冲区回绕与未关闭桶
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from rollup import RingSeries, RollupStore
+
+
+def brute_buckets(t, v, width):
+    """按桶宽度直接分组计算 (start, mean, min, max)"""
+    starts = np.floor(t / width) * width
+    result = []
+    for start in np.unique(starts):
+        x = v[starts == start]
+        result.append((start, x.mean(), x.min(), x.max()))
+    return result
+
+
+def test_ring_series_wraparound():
+    """回绕后的二分查找与切片与拷贝整列的结果一致"""
+    ring = RingSeries(10, ('t',))
+    for i in range(23):
+        ring.append(float(i))
+    full = ring.column('t')
+    assert list(full) == [float(i) for i in range(13, 23)]
+    assert ring.dropped == 13
+    for value in (0.0, 13.0, 15.5, 19.0, 20.0, 22.0, 30.0):
+        for side in ('left', 'right'):
+            assert ring.searchsorted('t', value, side) == int(np.searchsorted(full, value, side))
+    for lo in range(11):
+        for hi in range(lo, 11):
+            assert np.array_equal(ring.slice('t', lo, hi), full[lo:hi])
+    print("✓ RingSeries 回绕后查找 / 切片正确")
+
+
+def test_tiers_match_brute_force():
+    """各层结果（含未关闭桶）与直接分组计算一致，粗层不滞后"""
+    rng = np.random.default_rng(1)
+    t = np.cumsum(rng.uniform(0.05, 0.15, 40000))
+    v = 50 + rng.normal(0, 2, len(t))
+    store = RollupStore(raw_capacity=1000, tiers=((1.0, 100000), (60.0, 10000), (3600.0, 100)))
+    for ti, vi in zip(t, v):
+        store.add(ti, vi)
+
+    for k, tier in enumerate(store.tiers):
+        bt, mean, vmin, vmax, _, count = tier.select(0.0, t[-1], store._pending(k))
+        expected = brute_buckets(t, v, tier.width)
+        assert len(bt) == len(expected), (tier.width, len(bt), len(expected))
+        assert int(count.sum()) == len(t)
+        for row, (start, m, lo, hi) in zip(zip(bt, mean, vmin, vmax), expected):
+            assert row[0] == start
+            assert math.isclose(row[1], m, rel_tol=1e-9)
+            assert row[2] == lo and row[3] == hi
+    print(f"✓ 1 s / 1 min / 1 h 三层与暴力计算一致（{len(t)} 点）")
+
+
+def test_select_resolution():
+    """短范围返回原始数据，长范围选择较粗的层"""
+    store = RollupStore(raw_capacity=5000)
+    for i in range(200000):
+        store.add(i * 0.1, float(i % 100))
+    t1 = 199999 * 0.1
+    t, v, _, _, _, _, width = store.select(t1 - 100, t1)
+    assert width == 0.0 and len(t) == 1001 and t[-1] == t1
+    _, _, _, _, _, count, width = store.select(t1 - 3600, t1)
+    # 起点所在的桶整个包含在内
+    assert width == 1.0 and 36001 <= int(count.sum()) <= 36010
+    _, _, _, _, _, count, width = store.select(0.0, t1)
+    assert width == 60.0 and int(count.sum()) == 200000
+    print("✓ 按可见范围选择分辨率，汇总计数完整")
+
+
+if __name__ == '__main__':
+    test_ring_series_wraparound()
+    test_tiers_match_brute_force()
+    test_select_resolution()
+    print("\n全部通过")
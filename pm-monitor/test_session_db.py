@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话数据库写入测试
+会话开始 / 结束时间取自 clock（虚拟时钟下确定），写线程按 flush_interval 攒批提交，
+以及写入失败时记录错误、不再入队
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import clock
+from session_db import SessionDB, SessionWriter
+
+
+def committed(path, session_id):
+    """另开连接读已提交的行数（WAL 下看不到未提交的数据）"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM samples WHERE session_id = ?", (session_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_session_rows():
+    """开始 / 结束时间与样本数写入 sessions 表，数据按时间范围可查"""
+    virtual = clock.install(clock.VirtualClock(epoch=1000.0))
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            db = SessionDB(os.path.join(d, 'sessions.db'))
+            session_id = db.create_session('MOCK::PowerMeter::1', idn='MOCK', command='MEAS:POW?',
+                                           settings={'sample_interval_ms': 10})
+            writer = SessionWriter(session_id, path=db.path, batch_size=100)
+            writer.start()
+            for i in range(250):
+                writer.put(i * 0.01, 50.0 + i)
+            virtual.sleep(5.0)
+            writer.stop()
+            assert writer.error is None and writer.written == 250
+
+            (session,) = db.list_sessions()
+            assert session['start_time'] == 1000.0 and session['end_time'] == 1005.0
+            assert session['sample_count'] == 250 and session['settings'] == {'sample_interval_ms': 10}
+            t, v = db.query_range(session_id, 1.0, 1.495)
+            assert len(t) == 50 and v[0] == 150.0
+            db.close()
+    finally:
+        clock.install(clock.SystemClock())
+    print("✓ 会话开始 / 结束记录正确")
+
+
+def test_flush_interval_batching():
+    """未满 batch_size 时，距上次提交满 flush_interval（按 clock 计）才提交"""
+    virtual = clock.install(clock.VirtualClock(epoch=0.0))
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            db = SessionDB(os.path.join(d, 'sessions.db'))
+            session_id = db.create_session('MOCK::PowerMeter::1')
+            writer = SessionWriter(session_id, path=db.path, batch_size=10000, flush_interval=30.0)
+            writer.start()
+            for i in range(100):
+                writer.put(i * 0.01, 1.0)
+            time.sleep(0.2)
+            assert writer.written == 0 and committed(db.path, session_id) == 0
+
+            virtual.sleep(31.0)
+            writer.put(1.0, 2.0)
+            assert wait_for(lambda: writer.written == 101)
+            assert committed(db.path, session_id) == 101
+
+            # 达到 batch_size 立即提交
+            writer.batch_size = 50
+            for i in range(120):
+                writer.put(2.0 + i * 0.01, 3.0)
+            assert wait_for(lambda: writer.written == 201)
+            time.sleep(0.1)
+            assert writer.written == 201
+            writer.stop()
+            assert writer.written == 221 and committed(db.path, session_id) == 221
+            db.close()
+    finally:
+        clock.install(clock.SystemClock())
+    print("✓ 按 flush_interval / batch_size 攒批提交")
+
+
+def test_write_error():
+    """写入失败（会话不存在，外键约束）：记录错误、线程结束，之后的样本不再入队"""
+    with tempfile.TemporaryDirectory() as d:
+        db = SessionDB(os.path.join(d, 'sessions.db'))
+        writer = SessionWriter(999, path=db.path, batch_size=10)
+        writer.start()
+        for i in range(10):
+            writer.put(i * 0.1, 1.0)
+        assert wait_for(lambda: not writer.is_alive())
+        assert isinstance(writer.error, sqlite3.IntegrityError) and writer.written == 0
+        pending = writer.queue.qsize()
+        for i in range(100):
+            writer.put(i * 0.1, 1.0)
+        assert writer.queue.qsize() == pending
+        writer.stop()
+        assert committed(db.path, 999) == 0
+        db.close()
+
+        # 数据库无法打开同样记录为错误
+        writer = SessionWriter(1, path=os.path.join(d, 'sessions.db', 'nested.db'))
+        writer.start()
+        writer.join(5)
+        assert writer.error is not None and not writer.is_alive()
+    print("✓ 写入失败时记录错误并停止入队")
+
+
+if __name__ == '__main__':
+    test_session_rows()
+    test_flush_interval_batching()
+    test_write_error()
+    print("\n全部通过")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存环形缓冲区测试
+批量写入跨越缓冲区末尾、写满后覆盖与丢失计数、跨进程读写序号一致，
+以及采集进程的停止与共享内存释放
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from acq_process import AcquisitionProcess
+from shm_ring import SharedRing
+
+
+def test_write_many_wraps():
+    """批量写入跨越末尾时按序号回绕，读出顺序不变"""
+    ring = SharedRing.create(8)
+    try:
+        ring.write_many(np.arange(5), np.arange(5) * 10.0)
+        times, values, seq, lost = ring.read(0)
+        assert list(times) == [0, 1, 2, 3, 4] and seq == 5 and lost == 0
+        ring.write_many(np.arange(5, 11), np.arange(5, 11) * 10.0)
+        times, values, seq, lost = ring.read(seq)
+        assert list(times) == [5, 6, 7, 8, 9, 10] and list(values) == [50, 60, 70, 80, 90, 100]
+        assert seq == 11 and lost == 0
+        ring.write_many([], [])
+        assert ring.write_seq == 11
+    finally:
+        ring.close()
+    print("✓ 批量写入跨越末尾回绕正确")
+
+
+def test_overwrite_and_lost():
+    """消费者落后超过容量时只读到最新的样本，丢失数与被覆盖的样本数一致"""
+    ring = SharedRing.create(8)
+    try:
+        for i in range(20):
+            ring.write(float(i), float(i))
+        times, _, seq, lost = ring.read(0)
+        assert list(times) == list(range(12, 20)) and lost == 12 and seq == 20
+
+        # 单批超过容量：只保存最新部分，序号按整批递增
+        ring.write_many(np.arange(20, 45), np.arange(20, 45))
+        assert ring.write_seq == 45
+        times, _, seq, lost = ring.read(seq)
+        assert list(times) == list(range(37, 45)) and lost == 17
+
+        ring.write_many(np.arange(45, 50), np.arange(45, 50))
+        times, _, seq, lost = ring.read(seq, max_items=3)
+        assert list(times) == [45, 46, 47] and seq == 48 and lost == 0
+    finally:
+        ring.close()
+    print("✓ 写满覆盖与丢失计数正确")
+
+
+def _producer(name, total, batch):
+    ring = SharedRing.attach(name)
+    try:
+        rng = np.random.default_rng(0)
+        seq = 0
+        while seq < total:
+            n = min(int(rng.integers(1, batch)), total - seq)
+            data = np.arange(seq, seq + n, dtype=np.float64)
+            ring.write_many(data, data * 2)
+            seq += n
+    finally:
+        ring.close()
+
+
+def test_cross_process():
+    """子进程写、本进程读：每次读到的样本与序号连续对应，读到的 + 丢失的 = 写入总数"""
+    total = 2000000
+    ring = SharedRing.create(4096)
+    process = multiprocessing.get_context('spawn').Process(target=_producer, args=(ring.name, total, 300))
+    try:
+        process.start()
+        seq = received = lost_total = 0
+        deadline = time.monotonic() + 60
+        while seq < total and time.monotonic() < deadline:
+            times, values, new_seq, lost = ring.read(seq)
+            if len(times):
+                assert np.array_equal(times, np.arange(new_seq - len(times), new_seq))
+                assert np.array_equal(values, times * 2)
+            assert new_seq - seq == len(times) + lost
+            received += len(times)
+            lost_total += lost
+            seq = new_seq
+        process.join(10)
+        assert process.exitcode == 0
+        assert seq == total and received + lost_total == total
+    finally:
+        ring.close()
+    print(f"✓ 跨进程读取 {received} 个样本，丢失 {lost_total}，序号一致")
+
+
+def test_process_shutdown():
+    """采集进程停止后可取走剩余样本，close() 释放共享内存"""
+    proc = AcquisitionProcess('MOCK::PowerMeter::1', 'MEAS:POW?', 10, time.time())
+    proc.start()
+    name = proc.ring.name
+    try:
+        received = 0
+        deadline = time.monotonic() + 20
+        while received < 20 and time.monotonic() < deadline:
+            times, values, messages = proc.poll()
+            assert not [m for m in messages if m[0] in ('error', 'fatal')], messages
+            received += len(times)
+            time.sleep(0.05)
+        assert received >= 20 and np.all((values > 0) & (values < 100))
+        proc.stop()
+        assert not proc.alive and proc.exitcode == 0
+        assert proc.ring.stop_requested
+        times, _, _ = proc.poll()
+        assert proc.ring.write_seq == proc.read_seq
+    finally:
+        proc.close()
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        assert False, "共享内存应已释放"
+    except FileNotFoundError:
+        pass
+    print(f"✓ 采集进程正常退出（{proc.read_seq} 个样本），共享内存已释放")
+
+
+if __name__ == '__main__':
+    test_write_many_wraps()
+    test_overwrite_and_lost()
+    test_cross_process()
+    test_process_shutdown()
+    print("\n全部通过")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浸泡测试的测试
+虚拟时钟下的短时浸泡：报告结构完整、可写成 JSON，部件大小在预热后保持不变；
+内存增长阈值与部件大小容差 / 容量上限的判定
+"""
+
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import soak
+from soak import SIZE_SLACK, SIZE_TOLERANCE, check_sizes
+
+
+def test_check_sizes():
+    """容差内的增长通过；按容量预分配的存储只检查不超过容量；基线中没有的部件不检查"""
+    baseline = {'buffer.data': 1000, 'label.text': 200, 'buffer.rollup_raw': 10, 'events.capture': 0}
+    limit = int(200 * (1 + SIZE_TOLERANCE) + SIZE_SLACK)
+    final = {'buffer.data': 1000, 'label.text': limit, 'buffer.rollup_raw': 5000, 'events.capture': 64,
+             'curve.new': 10 ** 6}
+    limits = {'buffer.rollup_raw': 5000, 'events.capture': 64}
+    assert check_sizes(baseline, final, limits) == []
+
+    final = dict(final, **{'buffer.data': 1001 + int(1000 * SIZE_TOLERANCE) + SIZE_SLACK, 'label.text': limit + 1,
+                           'buffer.rollup_raw': 5001})
+    assert check_sizes(baseline, final, limits) == [
+        ('buffer.data', 1000, final['buffer.data']), ('label.text', 200, limit + 1), ('buffer.rollup_raw', 10, 5001)
+    ]
+    print("✓ 部件大小判定正确")
+
+
+def test_short_soak():
+    """2 分钟虚拟时间的浸泡：报告结构、基线位置与通过判定；阈值为负时按内存增长判为失败"""
+    report = soak.soak(hours=1 / 30, interval_ms=20, sample_minutes=1 / 6, warmup=0.25, flush_interval=1.0)
+    assert set(report) >= {'version', 'started', 'parameters', 'simulation', 'baseline_s', 'traced_growth_mb',
+                           'rss_growth_mb', 'limits', 'samples', 'top_allocations', 'failures', 'passed'}
+    assert report['passed'], report['failures']
+    assert report['parameters']['interval_ms'] == 20
+    assert abs(report['simulation']['simulated_s'] - 120.0) < 1e-9
+    assert 5900 <= report['simulation']['samples'] <= 6050, report['simulation']['samples']
+
+    samples = report['samples']
+    assert len(samples) == 12 and all(abs(s['simulated_s'] - 10.0 * (i + 1)) < 1e-6 for i, s in enumerate(samples))
+    assert abs(report['baseline_s'] - 30.0) < 1e-6
+    baseline = next(s for s in samples if s['simulated_s'] == report['baseline_s'])
+    for name in ('buffer.data', 'buffer.window_quantiles', 'curve.plot_items', 'label.count'):
+        assert samples[-1]['sizes'][name] == baseline['sizes'][name], name
+    assert report['limits']['buffer.rollup_raw'] >= samples[-1]['sizes']['buffer.rollup_raw']
+    top = report['top_allocations']
+    assert 0 < len(top) <= soak.TOP_ALLOCATIONS
+    assert all(set(stat) == {'location', 'size_diff_kb', 'count_diff', 'size_kb'} for stat in top)
+    assert not any(stat['location'].startswith(tracemalloc.__file__) for stat in top)
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'reports', 'soak.json')
+        soak.write_report(report, path)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['passed'] is True
+
+    strict = soak.soak(hours=0.005, interval_ms=20, sample_minutes=0.1, threshold_mb=-1e6, rss_threshold_mb=-1e6)
+    assert not strict['passed']
+    assert any(f.startswith("Python 分配增长") for f in strict['failures']), strict['failures']
+    if strict['rss_growth_mb'] is not None:
+        assert any(f.startswith("RSS 增长") for f in strict['failures']), strict['failures']
+    print(f"✓ 短时浸泡通过（Python {report['traced_growth_mb']:+.2f} MB），负阈值判为失败")
+
+
+if __name__ == '__main__':
+    test_check_sizes()
+    test_short_soak()
+    print("\n全部通过")
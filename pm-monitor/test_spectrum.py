@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+频谱分析测试
+已知正弦信号的 Welch 峰值频率与功率谱密度标定（积分等于方差），
+时间抖动的重采样，以及跨越暂停间隙时只分析最后一个连续段
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from spectrum import dominant_frequency, resample_uniform, welch_psd
+
+
+def test_sine_peak_and_scaling():
+    """50 Hz 正弦 + 直流：峰值在 50 Hz，PSD 积分等于交流功率 A²/2"""
+    fs, amplitude = 1000.0, 2.0
+    t = np.arange(8192) / fs
+    values = 100.0 + amplitude * np.sin(2 * np.pi * 50.0 * t)
+    freqs, psd = welch_psd(values, fs, nperseg=1000)
+    assert len(freqs) == len(psd) == 501 and freqs[-1] == fs / 2
+    assert dominant_frequency(freqs, psd) == 50.0
+    power = psd.sum() * (freqs[1] - freqs[0])
+    assert abs(power - amplitude ** 2 / 2) < 0.02 * amplitude ** 2 / 2, power
+    # 白噪声：单边谱平台为 2σ²/fs
+    rng = np.random.default_rng(0)
+    freqs, psd = welch_psd(rng.normal(0, 0.5, 200000), fs, nperseg=256)
+    assert abs(np.median(psd[1:-1]) / (2 * 0.25 / fs) - 1) < 0.1
+    assert len(welch_psd([1.0, 2.0], fs)[0]) == 0
+    print(f"✓ 正弦峰值 50 Hz，PSD 积分 {power:.3f} W²")
+
+
+def test_resample_jitter():
+    """时间抖动的采样插值到均匀网格后峰值频率不变"""
+    rng = np.random.default_rng(1)
+    t = np.arange(4000) * 0.002 + rng.uniform(-2e-4, 2e-4, 4000)
+    values = np.sin(2 * np.pi * 25.0 * t)
+    uniform, fs = resample_uniform(t, values)
+    assert abs(fs - 500.0) < 1.0 and abs(len(uniform) - 4000) <= 2
+    freqs, psd = welch_psd(uniform, fs, nperseg=500)
+    assert abs(dominant_frequency(freqs, psd) - 25.0) <= freqs[1]
+    assert resample_uniform([0.0, 1.0], [1.0, 2.0])[1] == 0.0
+    print("✓ 抖动采样重采样正确")
+
+
+def test_resample_gap():
+    """暂停一小时后恢复：只用恢复后的连续段，网格不跨越间隙"""
+    before = np.arange(1000) * 0.001
+    after = 3600.0 + np.arange(2000) * 0.001
+    t = np.concatenate((before, after))
+    values = np.concatenate((np.zeros(1000), np.sin(2 * np.pi * 100.0 * (after - 3600.0))))
+    uniform, fs = resample_uniform(t, values)
+    assert abs(fs - 1000.0) < 1e-6 and len(uniform) == 2000
+    freqs, psd = welch_psd(uniform, fs, nperseg=500)
+    assert abs(dominant_frequency(freqs, psd) - 100.0) < 1e-6
+    # 最后一段太短时不分析
+    assert resample_uniform(np.append(before, 3600.0), np.zeros(1001))[1] == 0.0
+    # 网格点数上限：保留最新部分
+    uniform, fs = resample_uniform(after, after, max_points=500)
+    assert len(uniform) == 500 and abs(uniform[-1] - after[-1]) < 1e-9
+    print("✓ 暂停间隙后只分析最后一个连续段")
+
+
+if __name__ == '__main__':
+    test_sine_peak_and_scaling()
+    test_resample_jitter()
+    test_resample_gap()
+    print("\n全部通过")
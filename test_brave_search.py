@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Brave Search 客户端测试
+用本地桩服务器代替真实接口：缓存命中、有效期与 LRU 淘汰、5xx 重试、并发查询去重与限速
+（未安装 requests 时跳过）
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from brave_search import BraveSearch, RateLimiter, ResponseCache
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+
+class StubServer:
+    """本地桩服务器：记录每次请求的 (时刻, 查询词)；查询词为 'flaky' 时第一次返回 503"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = {'flaky': 1}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)['q'][0]
+                stub.requests.append((time.monotonic(), query))
+                if stub.failures.get(query):
+                    stub.failures[query] -= 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps({'query': {'original': query}, 'web': {'results': [{'title': query * 20}]}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/search'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def client(stub, **kwargs):
+    kwargs.setdefault('rate_limit', 0)
+    return BraveSearch(api_key='test', base_url=stub.url, **kwargs)
+
+
+def test_cache_hits_and_persistence():
+    """重复查询命中缓存不再请求，新实例从磁盘恢复缓存"""
+    if not HAS_REQUESTS:
+        print("- 未安装 requests，跳过")
+        return
+    stub = StubServer()
+    with tempfile.TemporaryDirectory() as d:
+        try:
+            with client(stub, cache_dir=d) as c:
+                for _ in range(5):
+                    assert c.search('same')['query']['original'] == 'same'
+                assert len(stub.requests) == 1 and c.cache.hits == 4 and c.cache.misses == 1
+                c.search('same', use_cache=False)
+                assert len(stub.requests) == 2
+            with client(stub, cache_dir=d) as c:
+                c.search('same')
+                assert len(stub.requests) == 2 and c.cache.hits == 1
+        finally:
+            stub.close()
+    print("✓ 缓存命中与磁盘恢复")
+
+
+def test_cache_expiry_and_eviction():
+    """过期条目重新请求；超过条数 / 大小上限时淘汰最久未使用的条目"""
+    if not HAS_REQUESTS:
+        print("- 未安装 requests，跳过")
+        return
+    with tempfile.TemporaryDirectory() as d:
+        cache = ResponseCache(os.path.join(d, 'entries'), ttl=0.2, max_entries=3)
+        for i in range(4):
+            cache.put(str(i), {'i': i})
+            if i == 2:
+                assert cache.get('0') == {'i': 0}    # 0 变为最近使用，淘汰 1
+        assert len(cache) == 3 and cache.get('1') is None and cache.get('0') == {'i': 0}
+        assert len(os.listdir(cache.directory)) == 3
+        time.sleep(0.3)
+        assert cache.get('0') is None and len(cache) == 2
+
+        cache = ResponseCache(os.path.join(d, 'bytes'), max_bytes=200)
+        for i in range(5):
+            cache.put(str(i), {'text': 'x' * 60})
+        entry_size = next(iter(cache._index.values()))
+        assert cache._bytes <= 200 and len(cache) == 200 // entry_size
+        cache.clear()
+        assert len(cache) == 0 and cache._bytes == 0 and os.listdir(cache.directory) == []
+    print("✓ 有效期与 LRU 淘汰")
+
+
+def test_retry_and_errors():
+    """5xx 自动重试后成功；连接失败返回 error，不写入缓存"""
+    if not HAS_REQUESTS:
+        print("- 未安装 requests，跳过")
+        return
+    stub = StubServer()
+    try:
+        with client(stub, cache_dir=None) as c:
+            assert c.search('flaky')['query']['original'] == 'flaky'
+            assert [q for _, q in stub.requests] == ['flaky', 'flaky']
+    finally:
+        stub.close()
+    with tempfile.TemporaryDirectory() as d:
+        with BraveSearch(api_key='test', base_url='http://127.0.0.1:1/search', cache_dir=d,
+                         retries=0, rate_limit=0) as c:
+            assert 'error' in c.search('offline')
+            assert len(c.cache) == 0
+    print("✓ 5xx 重试与连接错误")
+
+
+def test_search_many_and_rate_limit():
+    """并发查询按输入顺序返回、相同查询只请求一次，请求间隔受限速约束"""
+    if not HAS_REQUESTS:
+        print("- 未安装 requests，跳过")
+        return
+    stub = StubServer()
+    try:
+        with client(stub, cache_dir=None, rate_limit=20, max_workers=4) as c:
+            queries = [f'q{i}' for i in range(10)] + ['q3', 'q0']
+            results = c.search_many(queries)
+        assert [r['query']['original'] for r in results] == queries
+        times = sorted(t for t, _ in stub.requests)
+        assert len(times) == 10
+        rate = (len(times) - 1) / (times[-1] - times[0])
+        assert rate < 20 * 1.2, rate
+    finally:
+        stub.close()
+
+    limiter = RateLimiter(50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        limiter.wait()
+    elapsed = time.monotonic() - start
+    assert 0.15 <= elapsed < 0.5, elapsed    # 5 次突发，其余 10 次按 50/s
+    print(f"✓ 并发查询去重与限速（实测 {rate:.1f} 次/s）")
+
+
+if __name__ == '__main__':
+    test_cache_hits_and_persistence()
+    test_cache_expiry_and_eviction()
+    test_retry_and_errors()
+    test_search_many_and_rate_limit()
+    print("\n全部通过")